@@ -1,7 +1,9 @@
 # pages/2_🤖_Job_Matcher.py
 
 import streamlit as st
-from utils import analyze_match
+from concurrent.futures import ThreadPoolExecutor
+from utils import analyze_match, stream_cover_letter
+from utils import split_sections, fingerprint, score_section, combine_section_results, SECTION_WEIGHTS
 import json
 
 st.set_page_config(
@@ -43,6 +45,31 @@ def get_resume_text_from_state():
         return "\n".join(lines)
     return ""
 
+# --- SECTION-LEVEL MATCHING ---
+# Each section is scored on its own and memoized on (section, fingerprint of its text, fingerprint
+# of the JD) by utils.score_section, so re-analyzing after editing one bullet only re-scores the
+# section that changed.
+def analyze_match_by_section(resume_text, jd_text):
+    """Returns (analysis result, number of sections re-scored, number of sections scored)."""
+    sections = split_sections(resume_text)
+    if not any(name in SECTION_WEIGHTS for name in sections):
+        # No recognisable headings: score the whole resume in one call
+        return analyze_match(resume_text, jd_text), None, None
+    jd_fingerprint = fingerprint(jd_text)
+    keys = {name: (name, fingerprint(text), jd_fingerprint) for name, text in sections.items()}
+    scored_keys = st.session_state.setdefault("scored_section_keys", set())
+    changed = [name for name, key in keys.items() if key not in scored_keys and name in SECTION_WEIGHTS]
+
+    # Each section is scored once; changed sections run concurrently, unchanged ones are memo hits.
+    # The worker threads make no Streamlit calls.
+    with ThreadPoolExecutor(max_workers=max(1, len(changed))) as executor:
+        results = dict(zip(sections, executor.map(lambda name: score_section(name, sections[name], jd_text), sections)))
+    for name, result in results.items():
+        if "error" not in result:
+            scored_keys.add(keys[name])
+    scored = sum(1 for name in sections if name in SECTION_WEIGHTS)
+    return combine_section_results(results, jd_text), len(changed), scored
+
 # --- UI LAYOUT ---
 col1, col2 = st.columns(2, gap="large")
 
@@ -59,8 +86,9 @@ if st.button("Analyze Match", type="primary", use_container_width=True):
     if 'cover_letter' in st.session_state: del st.session_state.cover_letter
     if resume_text.strip() and jd_text.strip():
         with st.spinner("AI is analyzing the match... This may take a moment."):
-            analysis_result = analyze_match(resume_text, jd_text)
+            analysis_result, rescored, total = analyze_match_by_section(resume_text, jd_text)
             st.session_state.analysis_result = analysis_result
+            st.session_state.rescored_sections = (rescored, total)
     else:
         st.warning("Please paste both your resume and the job description.")
 
@@ -73,8 +101,15 @@ if 'analysis_result' in st.session_state:
         st.error(f"An error occurred: {result['error']}")
     else:
         st.metric(label="**Match Score**", value=f"{result.get('match_score', 0)}%")
+        rescored, total = st.session_state.get('rescored_sections', (None, None))
+        if total:
+            st.caption(f"Re-scored {rescored} of {total} sections; unchanged sections reused their previous scores.")
         st.markdown("##### Summary")
         st.write(result.get('summary', 'No summary provided.'))
+        if result.get('sections'):
+            with st.expander("Score by section"):
+                for name, section in result['sections'].items():
+                    st.progress(section['score'] / 100, text=f"{name.capitalize()}: {section['score']}%")
         tab1, tab2, tab3 = st.tabs(["✅ Matching Keywords", "❌ Missing Keywords", "📝 Tailoring Suggestions"])
         with tab1:
             st.markdown("##### Keywords from the job description found in your resume:")
@@ -88,11 +123,11 @@ if 'analysis_result' in st.session_state:
         st.divider()
         st.subheader("Next Step: Generate Cover Letter")
         if st.button("✍️ Generate AI Cover Letter", use_container_width=True):
-            with st.spinner("AI is writing your cover letter..."):
-                user_name = st.session_state.get('username', '')
-                if user_name == "Guest": user_name = "the candidate"
-                cover_letter = generate_cover_letter(resume_text, jd_text, user_name)
-                st.session_state.cover_letter = cover_letter
+            user_name = st.session_state.get('username', '')
+            if user_name == "Guest": user_name = "the candidate"
+            # Render tokens as they arrive instead of a spinner, then rerun to show the editable copy
+            st.session_state.cover_letter = st.write_stream(stream_cover_letter(resume_text, jd_text, user_name))
+            st.rerun()
 
 if 'cover_letter' in st.session_state:
     st.divider()
@@ -0,0 +1,146 @@
+# async_llm.py
+# Non-blocking counterparts of the helpers in utils.py, for the async server.
+# Every LLM call goes through the same llm_scheduler and llm_router as the sync path (coalescing,
+# RPM/TPM budgets, priorities, retries, circuit breakers, Gemini failover). Those block, so each
+# call runs on a dedicated pool of LLM_ASYNC_THREADS threads and the event loop only awaits it;
+# the provider clients keep their own pooled connections.
+import os
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_cache import llm_cache, make_cache_key
+from utils import (
+    llm_router, llm_scheduler, provider_for_choice,
+    JSON_SYSTEM_PROMPT, COVER_LETTER_SYSTEM_PROMPT, JSON_PARAMS, COVER_LETTER_PARAMS,
+    MATCH_MAX_TOKENS, MATCH_SCHEMA, CRITIQUE_SCHEMA, RESUME_SCHEMA, with_keywords, use_section_parsing,
+    json_result, cacheable,
+    build_resume_parser_prompt, build_match_prompt, build_cover_letter_prompt, build_critique_prompt,
+)
+from keywords import compare_keywords
+from metrics import timed_stage
+from compaction import compact_inputs
+from section_parser import build_section_tasks, merge_section_results
+
+# Most LLM calls one process keeps in flight; the scheduler's budgets still decide how many
+# actually reach each provider
+LLM_ASYNC_THREADS = int(os.getenv("LLM_ASYNC_THREADS", "256"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+
+
+def get_llm_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_ASYNC_THREADS, thread_name_prefix="async-llm")
+        return _executor
+
+
+async def aclose_clients():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def provider_stats():
+    return {"in_flight": _in_flight, "threads": LLM_ASYNC_THREADS, **llm_router.stats(),
+            "scheduler": llm_scheduler.stats()}
+
+
+async def complete(system_prompt, prompt, params, provider=None):
+    """Single chat completion through the scheduler and router; `provider` is only a preference."""
+    global _in_flight
+    # The copied context carries the llm_priority of the calling request into the thread
+    context = contextvars.copy_context()
+    _in_flight += 1
+    try:
+        with timed_stage("llm_call"):
+            return await asyncio.get_running_loop().run_in_executor(
+                get_llm_executor(), context.run, llm_scheduler.complete, system_prompt, prompt, params, provider)
+    finally:
+        _in_flight -= 1
+
+
+async def _cached(cache_key, compute, use_cache=True, should_store=None):
+    # Same cache (and keys) as the sync helpers; disk reads/writes go to a thread
+    if not use_cache or not llm_cache.enabled:
+        llm_cache.record_bypass()
+        return await compute()
+    value = await asyncio.to_thread(llm_cache.get, cache_key)
+    if value is not None:
+        return value
+    value = await compute()
+    if should_store is None or should_store(value):
+        await asyncio.to_thread(llm_cache.set, cache_key, value)
+    return value
+
+
+# --- AI Helper Function (for JSON response) ---
+async def agenerate_llama_json(prompt, use_cache=True, max_tokens=None, provider=None, schema=None):
+    params = JSON_PARAMS if max_tokens is None else {**JSON_PARAMS, "max_tokens": max_tokens}
+    cache_key = make_cache_key(llm_router.model_for(provider), JSON_SYSTEM_PROMPT, prompt, **params)
+
+    async def call_llama():
+        try:
+            result_text = await complete(JSON_SYSTEM_PROMPT, prompt, params, provider)
+        except Exception as e:
+            print(f"Error calling Llama (JSON, async): {e}")
+            return {"error": "Failed to get a valid JSON response from the AI."}
+        with timed_stage("json_parse"):
+            return json_result(result_text, schema)
+
+    return await _cached(cache_key, call_llama, use_cache=use_cache, should_store=cacheable)
+
+
+async def aprocess_resume_text(resume_text, model_choice, use_cache=True, mode="auto"):
+    if not resume_text.strip():
+        return {"error": "Could not extract any text."}
+    provider = provider_for_choice(model_choice)
+    tasks = build_section_tasks(resume_text) if use_section_parsing(resume_text, mode) else None
+    if tasks is not None:
+        results = await asyncio.gather(*(agenerate_llama_json(prompt, use_cache=use_cache, max_tokens=max_tokens,
+                                                              provider=provider)
+                                         for _name, prompt, max_tokens in tasks))
+        return merge_section_results({name: result for (name, _p, _m), result in zip(tasks, results)})
+    resume_text, _ = compact_inputs("aprocess_resume_text", resume_text)
+    return await agenerate_llama_json(build_resume_parser_prompt(resume_text), use_cache=use_cache,
+                                      provider=provider, schema=RESUME_SCHEMA)
+
+
+async def aanalyze_match(resume_text, jd_text, use_cache=True):
+    keywords = compare_keywords(resume_text, jd_text)
+    resume_text, jd_text = compact_inputs("aanalyze_match", resume_text, jd_text)
+    prompt = build_match_prompt(resume_text, jd_text, keywords)
+    result = await agenerate_llama_json(prompt, use_cache=use_cache, max_tokens=MATCH_MAX_TOKENS,
+                                        schema=MATCH_SCHEMA)
+    return with_keywords(result, keywords)
+
+
+async def acritique_resume(resume_text, use_cache=True):
+    resume_text, _ = compact_inputs("acritique_resume", resume_text)
+    return await agenerate_llama_json(build_critique_prompt(resume_text), use_cache=use_cache,
+                                      schema=CRITIQUE_SCHEMA)
+
+
+async def agenerate_cover_letter(resume_text, jd_text, user_name, use_cache=True):
+    resume_text, jd_text = compact_inputs("agenerate_cover_letter", resume_text, jd_text)
+    prompt = build_cover_letter_prompt(resume_text, jd_text, user_name)
+    cache_key = make_cache_key(llm_router.model_for(), COVER_LETTER_SYSTEM_PROMPT, prompt, **COVER_LETTER_PARAMS)
+
+    async def call_llama():
+        try:
+            return await complete(COVER_LETTER_SYSTEM_PROMPT, prompt, COVER_LETTER_PARAMS)
+        except Exception as e:
+            print(f"Error calling Llama for Cover Letter (async): {e}")
+            return None
+
+    cover_letter = await _cached(cache_key, call_llama, use_cache=use_cache)
+    if cover_letter is None:
+        return "Sorry, an error occurred while generating the cover letter."
+    return cover_letter
@@ -0,0 +1,237 @@
+# async_server.py
+# Async serving mode: same routes and JSON contracts as local_server.py, but LLM calls (through
+# the same scheduler and provider router) are awaited instead of tying up a worker for the
+# whole round trip.
+# Run with:  hypercorn async_server:app --bind 0.0.0.0:5000
+# (or `python async_server.py` for local development)
+import asyncio
+
+from quart import Quart, request, jsonify, g, Response
+from quart_cors import cors
+
+from llm_cache import llm_cache
+from utils import PARSE_MODES
+from extraction_cache import extraction_cache
+from extraction import extract_file_text, UnsupportedFileType, DocumentTooLarge, SUPPORTED_EXTENSIONS
+from uploads import UPLOAD_MAX_BYTES, too_large_message
+from job_queue import job_queue, async_requested
+from async_llm import (
+    aprocess_resume_text, aanalyze_match, agenerate_cover_letter, acritique_resume,
+    aclose_clients, provider_stats,
+)
+from metrics import begin_request, end_request, timed_stage, render_metrics, PROMETHEUS_CONTENT_TYPE
+from metrics import begin_request_memory, end_request_memory
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")
+# Larger request bodies are refused with 413 before they are read
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES
+
+
+@app.errorhandler(413)
+async def upload_too_large(e):
+    return jsonify({"error": too_large_message(UPLOAD_MAX_BYTES)}), 413
+
+
+@app.before_serving
+async def resume_background_jobs():
+    await asyncio.to_thread(job_queue.start)
+
+
+@app.after_serving
+async def close_llm_clients():
+    await aclose_clients()
+
+
+@app.route("/")
+async def home():
+    return jsonify({"message": "✅ Local AI server running successfully (async mode)."})
+
+
+def metrics_route():
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+@app.before_request
+async def start_request_metrics():
+    g.metrics_start = begin_request(metrics_route())
+    g.memory_token = begin_request_memory()
+    if request.mimetype == "multipart/form-data":
+        with timed_stage("upload_read"):
+            await request.files
+
+
+@app.after_request
+async def record_request_metrics(response):
+    if "metrics_start" in g:
+        end_request(metrics_route(), request.method, response.status_code, g.metrics_start)
+        memory = end_request_memory(metrics_route(), g.pop("memory_token", None))
+        if memory is not None:
+            response.headers["X-Peak-RSS-MB"] = f"{memory['rss_peak_bytes'] / (1024 * 1024):.1f}"
+            response.headers["X-RSS-Growth-MB"] = f"{(memory['rss_peak_bytes'] - memory['rss_start_bytes']) / (1024 * 1024):.1f}"
+    return response
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route("/api/cache-stats", methods=["GET"])
+async def cache_stats():
+    return jsonify({"llm": llm_cache.stats(), "extraction": extraction_cache.stats(), "providers": provider_stats(),
+                    "jobs": job_queue.stats()})
+
+
+def caching_enabled():
+    # Clients can force fresh extraction and LLM calls with "Cache-Control: no-cache"
+    return "no-cache" not in request.headers.get("Cache-Control", "").lower()
+
+
+async def submit_job(kind, uploaded_file, form, params):
+    """Queue a background job for the upload: 202 with its status URL, or 400 for a non-local callback_url."""
+    try:
+        job = await asyncio.to_thread(job_queue.submit, kind, uploaded_file.filename, uploaded_file.stream, params,
+                                      form.get("callback_url"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(job), 202, {"Location": job["status_url"]}
+
+
+async def extract_upload(uploaded_file, allowed=SUPPORTED_EXTENSIONS):
+    # PDF parsing/OCR are blocking, so extraction runs in a thread
+    return await asyncio.to_thread(extract_file_text, uploaded_file.filename, uploaded_file.stream, allowed,
+                                   caching_enabled())
+
+
+@app.route("/aiResumeParser", methods=["POST"])
+async def ai_resume_parser():
+    try:
+        files = await request.files
+        if "file" not in files:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        form = await request.form
+        uploaded_file = files["file"]
+        model_choice = form.get("model_choice", "Llama 3.1")
+        parse_mode = form.get("parse_mode", "auto")
+        if parse_mode not in PARSE_MODES:
+            return jsonify({"error": f"Unknown parse_mode. Use one of: {', '.join(PARSE_MODES)}"}), 400
+        if async_requested(form.get("async"), request.headers.get("Prefer")):
+            return await submit_job("parse", uploaded_file, form, {"model_choice": model_choice, "parse_mode": parse_mode,
+                                                                   "use_cache": caching_enabled()})
+
+        try:
+            raw_text, extraction = await extract_upload(uploaded_file)
+        except UnsupportedFileType:
+            return jsonify({"error": "Unsupported file type."}), 400
+        except DocumentTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+
+        if raw_text is None or len(raw_text.strip()) < 20:
+            return jsonify({"error": "Could not extract any text."}), 400
+
+        result = await aprocess_resume_text(raw_text, model_choice, use_cache=caching_enabled(), mode=parse_mode)
+
+        if "resumeData" in result and result["resumeData"].get("fullName"):
+            return jsonify({**result, "extraction": extraction})
+        else:
+            print("--- AI failed to parse, returning error ---")
+            return jsonify({"error": "The AI could not understand this resume. It may be too corrupted or unreadable."}), 400
+
+    except Exception as e:
+        print(f"Error in /aiResumeParser: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/aiJobMatcher", methods=["POST"])
+async def ai_job_matcher():
+    try:
+        data = await request.get_json()
+        resume_text = data.get("resume") or data.get("resume_text", "")
+        jd_text = data.get("job_description") or data.get("jd_text", "")
+        if not resume_text or not jd_text:
+            return jsonify({"error": "Missing resume or job description"}), 400
+        result = await aanalyze_match(resume_text, jd_text, use_cache=caching_enabled())
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/aiCoverLetter", methods=["POST"])
+async def ai_cover_letter():
+    try:
+        data = await request.get_json()
+        resume_text = data.get("resume") or data.get("resume_text", "")
+        jd_text = data.get("job_description") or data.get("jd_text", "")
+        user_name = data.get("user_name", "the candidate")
+        if not resume_text or not jd_text:
+            return jsonify({"error": "Missing resume or job description"}), 400
+        result = await agenerate_cover_letter(resume_text, jd_text, user_name, use_cache=caching_enabled())
+        return jsonify({"cover_letter": result})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/extract-text", methods=["POST"])
+async def extract_resume_text():
+    files = await request.files
+    if 'resumeFile' not in files:
+        return jsonify({"error": "No file part"}), 400
+    file = files['resumeFile']
+    if file.filename == '':
+        return jsonify({"error": "No selected file"}), 400
+
+    try:
+        text, extraction = await extract_upload(file, allowed=('.pdf', '.docx'))
+        if text is None or len(text.strip()) == 0:
+            return jsonify({"error": "Could not extract any text from this file."}), 500
+        return jsonify({"text": text, "extraction": extraction})
+    except UnsupportedFileType:
+        return jsonify({"error": "Unsupported file type. Please upload a .pdf or .docx"}), 400
+    except DocumentTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except Exception as e:
+        print(f"Server error: {e}")
+        return jsonify({"error": "An internal error occurred"}), 500
+
+
+@app.route("/api/critique-resume", methods=["POST"])
+async def ai_resume_critique():
+    try:
+        files = await request.files
+        if "file" not in files:
+            return jsonify({"error": "No file uploaded"}), 400
+
+        uploaded_file = files["file"]
+        form = await request.form
+        if async_requested(form.get("async"), request.headers.get("Prefer")):
+            return await submit_job("critique", uploaded_file, form, {"use_cache": caching_enabled()})
+        try:
+            raw_text, extraction = await extract_upload(uploaded_file)
+        except UnsupportedFileType:
+            return jsonify({"error": "Unsupported file type."}), 400
+        except DocumentTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+
+        if raw_text is None or len(raw_text.strip()) < 20:
+            return jsonify({"error": "Could not extract any text."}), 400
+
+        result = await acritique_resume(raw_text, use_cache=caching_enabled())
+        return jsonify({**result, "extraction": extraction})
+
+    except Exception as e:
+        print(f"Error in /api/critique-resume: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+async def get_job(job_id):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job_id"}), 404
+    return jsonify(job)
+
+
+if __name__ == "__main__":
+    app.run(debug=True, port=5000)
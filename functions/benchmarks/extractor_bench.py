@@ -0,0 +1,134 @@
+# extractor_bench.py
+# Benchmarks the shared single-pass extractors (text_extractors.py) against the libraries the
+# project used before: python-docx and docx2txt for DOCX, PyPDF2 (or pypdf) and pdfplumber for
+# PDF. Generates large documents with the corpus helpers, then reports the median time, the
+# peak Python heap (tracemalloc; PDFium's native memory is not included) and the characters
+# each extractor returned. Libraries that are not installed are skipped.
+#
+#   python extractor_bench.py                                   # 10 and 100 page documents
+#   python extractor_bench.py --pages 40,400 --runs 5 --output extractors.json
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+from make_corpus import make_resume_lines, write_text_pdf, write_docx
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FUNCTIONS_DIR)
+
+from text_extractors import docx_text, pdf_text
+
+
+# --- Extractors ---
+def python_docx_text(path):
+    # What extraction.py did before: body paragraphs only
+    import docx
+    return "\n".join(paragraph.text for paragraph in docx.Document(path).paragraphs)
+
+
+def docx2txt_text(path):
+    import docx2txt
+    return docx2txt.process(path)
+
+
+def pypdf_text(path):
+    try:
+        from PyPDF2 import PdfReader
+    except ImportError:
+        from pypdf import PdfReader
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def pdfplumber_text(path):
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+EXTRACTORS = {
+    "docx": {"shared": docx_text, "python-docx": python_docx_text, "docx2txt": docx2txt_text},
+    "pdf": {"shared": pdf_text, "PyPDF2": pypdf_text, "pdfplumber": pdfplumber_text},
+}
+
+
+# --- Measurement ---
+def measure(extract, path, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = extract(path)
+        times.append(time.perf_counter() - start)
+    # Memory is measured on a separate run so tracing does not slow the timed ones
+    tracemalloc.start()
+    extract(path)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds_median": round(statistics.median(times), 4), "seconds_min": round(min(times), 4),
+            "py_peak_mb": round(peak / (1024 * 1024), 1), "chars": len(text)}
+
+
+def make_documents(work_dir, page_counts, seed):
+    rng = random.Random(seed)
+    documents = []
+    for pages in page_counts:
+        lines = make_resume_lines(rng, pages)
+        pdf_path = os.path.join(work_dir, f"large_{pages}p.pdf")
+        docx_path = os.path.join(work_dir, f"large_{pages}p.docx")
+        write_text_pdf(pdf_path, lines)
+        write_docx(docx_path, lines, rng)
+        documents += [("pdf", pages, pdf_path), ("docx", pages, docx_path)]
+    return documents
+
+
+def run(work_dir, page_counts, runs, seed):
+    rows = []
+    for kind, pages, path in make_documents(work_dir, page_counts, seed):
+        for name, extract in EXTRACTORS[kind].items():
+            row = {"kind": kind, "pages": pages, "bytes": os.path.getsize(path), "extractor": name}
+            try:
+                row.update(measure(extract, path, runs))
+            except ImportError as e:
+                row["skipped"] = f"not installed ({e.name})"
+            rows.append(row)
+            print_row(row)
+    return rows
+
+
+def print_row(row):
+    label = f"{row['kind']:>4} {row['pages']:>4}p  {row['extractor']:<12}"
+    if "skipped" in row:
+        print(f"{label} skipped: {row['skipped']}")
+        return
+    print(f"{label} {row['seconds_median']:>8.4f}s median (min {row['seconds_min']:.4f}s)  "
+          f"{row['py_peak_mb']:>7.1f} MB py peak  {row['chars']:>9} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared single-pass extractors vs python-docx, docx2txt, PyPDF2 and pdfplumber.")
+    parser.add_argument("--pages", default="10,100", help="comma-separated page counts of the generated documents")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--work-dir", help="keep the generated documents here (default: a temporary directory)")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    page_counts = [int(p) for p in args.pages.split(",") if p.strip()]
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        rows = run(args.work_dir, page_counts, args.runs, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            rows = run(work_dir, page_counts, args.runs, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
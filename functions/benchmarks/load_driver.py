@@ -0,0 +1,318 @@
+# load_driver.py
+# Offline load test for the local server.
+# Starts the stub LLM (stub_llm_server.py) and local_server.py pointed at it, then drives
+# /aiResumeParser, /api/extract-text, /aiJobMatcher and /aiCoverLetter at each concurrency
+# level. Reports p50/p95/p99 latency, throughput and peak server RSS per scenario, plus
+# per-stage timings scraped from the server's /metrics.
+#
+#   python make_corpus.py --out corpus
+#   python load_driver.py --corpus corpus --concurrency 1,4,16 --requests 40 --output results.json
+# Use --server http://host:port to drive an already running server instead (RSS is then not sampled).
+import os
+import re
+import math
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stub_llm_server import start_stub_server
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("parse", "extract", "match", "cover_letter")
+RSS_SAMPLE_SECONDS = 0.05
+METRIC_LINE = re.compile(r'^resume_stage_seconds_(bucket|sum|count)\{(.*)\} ([0-9.e+-]+|\+Inf)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# --- 1. Server processes ---
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_server(llm_base_url, port):
+    """Run local_server.py without the debug reloader, so the PID we sample is the real server."""
+    env = {**os.environ, "LLM_BASE_URL": llm_base_url, "OPENAI_API_KEY": "bench", "GEMINI_API_KEY": ""}
+    code = f"import local_server; local_server.app.run(port={port}, threaded=True)"
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=FUNCTIONS_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("local_server exited during startup")
+        try:
+            requests.get(base_url + "/", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("local_server did not start within 60s")
+
+
+def _proc_rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _proc_children(pid):
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(c) for c in f.read().split()]
+    except OSError:
+        pass
+    return children
+
+
+def tree_rss_bytes(pid):
+    """RSS of the server plus its children (the OCR worker processes)."""
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+    except ImportError:
+        pending, total = [pid], 0
+        while pending:
+            current = pending.pop()
+            total += _proc_rss_bytes(current)
+            pending += _proc_children(current)
+        return total
+    except Exception:
+        return 0
+
+
+class RssSampler:
+    def __init__(self, pid):
+        self.pid = pid
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss_bytes(self.pid))
+            self._stop.wait(RSS_SAMPLE_SECONDS)
+
+    def __enter__(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+# --- 2. Requests ---
+def load_corpus(corpus_dir):
+    files = sorted(f for f in os.listdir(corpus_dir) if f.endswith((".pdf", ".docx", ".txt")))
+    with open(os.path.join(corpus_dir, "jds.json"), encoding="utf-8") as f:
+        jds = json.load(f)
+    texts = []
+    for name in files:
+        if name.endswith(".txt"):
+            with open(os.path.join(corpus_dir, name), encoding="utf-8") as f:
+                texts.append(f.read())
+    return files, texts, jds
+
+
+def make_request(scenario, i, corpus_dir, files, texts, jds):
+    """(path, requests kwargs, label) for the i-th request of a scenario, cycling through the corpus."""
+    if scenario == "parse":
+        name = files[i % len(files)]
+        return "/aiResumeParser", {"files": {"file": (name, _read(corpus_dir, name))}}, name
+    if scenario == "extract":
+        binaries = [f for f in files if not f.endswith(".txt")]
+        name = binaries[i % len(binaries)]
+        return "/api/extract-text", {"files": {"resumeFile": (name, _read(corpus_dir, name))}}, name
+    payload = {"resume": texts[i % len(texts)], "job_description": jds[i % len(jds)], "user_name": "Bench Candidate"}
+    path = "/aiJobMatcher" if scenario == "match" else "/aiCoverLetter"
+    return path, {"json": payload}, f"text{i % len(texts)}"
+
+
+def _read(corpus_dir, name):
+    with open(os.path.join(corpus_dir, name), "rb") as f:
+        return f.read()
+
+
+def run_scenario(base_url, scenario, concurrency, total, corpus, headers):
+    corpus_dir, files, texts, jds = corpus
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+
+    def one(i):
+        path, kwargs, label = make_request(scenario, i, corpus_dir, files, texts, jds)
+        start = time.perf_counter()
+        try:
+            response = session.post(base_url + path, headers=headers, timeout=600, **kwargs)
+            ok = response.status_code < 500
+            status = response.status_code
+        except requests.RequestException as e:
+            ok, status = False, type(e).__name__
+        return time.perf_counter() - start, ok, status, label
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+# --- 3. Reporting ---
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def scrape_stages(base_url):
+    """{stage: {"sum", "count", "buckets": {le: cumulative}}} summed over routes and extraction paths."""
+    stages = defaultdict(lambda: {"sum": 0.0, "count": 0, "buckets": defaultdict(int)})
+    try:
+        body = requests.get(base_url + "/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    for line in body.splitlines():
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        kind, labels, value = match.groups()
+        labels = dict(LABEL.findall(labels))
+        entry = stages[labels.get("stage", "?")]
+        if kind == "bucket":
+            entry["buckets"][labels["le"]] += int(float(value))
+        elif kind == "sum":
+            entry["sum"] += float(value)
+        else:
+            entry["count"] += int(float(value))
+    return stages
+
+
+def stage_deltas(before, after):
+    """Per-stage count, mean and bucket-resolution p95 for what happened between two scrapes."""
+    report = {}
+    for stage, entry in after.items():
+        prior = before.get(stage, {"sum": 0.0, "count": 0, "buckets": {}})
+        count = entry["count"] - prior["count"]
+        if count <= 0:
+            continue
+        buckets = sorted(((float(le), cumulative - prior["buckets"].get(le, 0)) for le, cumulative in entry["buckets"].items()))
+        p95 = next((le for le, cumulative in buckets if cumulative >= 0.95 * count), None)
+        report[stage] = {
+            "count": count,
+            "mean_seconds": round((entry["sum"] - prior["sum"]) / count, 4),
+            "p95_le_seconds": p95,
+        }
+    return report
+
+
+def summarize(scenario, concurrency, results, elapsed, peak_rss, stages):
+    latencies = sorted(seconds for seconds, ok, _status, _label in results if ok)
+    errors = defaultdict(int)
+    for _seconds, ok, status, _label in results:
+        if not ok:
+            errors[str(status)] += 1
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": dict(errors),
+        "p50_seconds": _round(percentile(latencies, 0.50)),
+        "p95_seconds": _round(percentile(latencies, 0.95)),
+        "p99_seconds": _round(percentile(latencies, 0.99)),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss else None,
+        "stages": stages,
+    }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def print_summary(row):
+    errors = sum(row["errors"].values())
+    print(f"{row['scenario']:<13} c={row['concurrency']:<3} n={row['requests']:<4} err={errors:<3} "
+          f"p50={row['p50_seconds']}s p95={row['p95_seconds']}s p99={row['p99_seconds']}s "
+          f"rps={row['throughput_rps']} peak_rss={row['peak_rss_mb']}MB")
+    for stage, entry in sorted(row["stages"].items()):
+        print(f"    {stage:<18} n={entry['count']:<5} mean={entry['mean_seconds']}s p95<={entry['p95_le_seconds']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the local server against a stub LLM.")
+    parser.add_argument("--corpus", default="corpus")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=20, help="requests per scenario and concurrency level")
+    parser.add_argument("--server", help="drive an already running server instead of starting one")
+    parser.add_argument("--stub-latency", type=float, default=0.3)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--cached", action="store_true", help="allow extraction/LLM cache hits")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",")]
+    files, texts, jds = load_corpus(args.corpus)
+    corpus = (args.corpus, files, texts, jds)
+    headers = {} if args.cached else {"Cache-Control": "no-cache"}
+
+    stub = process = None
+    if args.server:
+        base_url = args.server.rstrip("/")
+    else:
+        stub, llm_base_url = start_stub_server(latency=args.stub_latency,
+                                               tokens_per_second=args.stub_tokens_per_second)
+        process, base_url = start_local_server(llm_base_url, free_port())
+        print(f"--- Stub LLM at {llm_base_url}, local_server at {base_url} (pid {process.pid}) ---")
+
+    rows = []
+    try:
+        for scenario in scenarios:
+            for concurrency in levels:
+                before = scrape_stages(base_url)
+                with RssSampler(process.pid if process else None) as sampler:
+                    results, elapsed = run_scenario(base_url, scenario, concurrency, args.requests, corpus, headers)
+                row = summarize(scenario, concurrency, results, elapsed, sampler.peak,
+                                stage_deltas(before, scrape_stages(base_url)))
+                print_summary(row)
+                rows.append(row)
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+        if stub:
+            stub.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+        print(f"--- Results written to {args.output} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# make_corpus.py
+# Generates a reproducible benchmark corpus: text PDFs, scanned (image-only) PDFs of 1-10 pages,
+# DOCX files with tables, plain TXT resumes, and a jds.json of job descriptions.
+# The same --seed always produces the same documents.
+#
+#   python make_corpus.py --out corpus --count 5
+import os
+import json
+import random
+import argparse
+
+import docx
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+FIRST_NAMES = ["Alex", "Priya", "Jordan", "Wei", "Maria", "Sam", "Aisha", "Lucas", "Chen", "Fatima"]
+LAST_NAMES = ["Patel", "Nguyen", "Garcia", "Smith", "Kumar", "Okafor", "Rossi", "Kim", "Silva", "Cohen"]
+ROLES = ["Software Engineer", "Data Analyst", "Backend Developer", "ML Engineer", "DevOps Engineer", "Product Designer"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Analytics", "Hooli"]
+SKILLS = ["Python", "JavaScript", "TypeScript", "React", "Node.js", "SQL", "PostgreSQL", "AWS", "Docker",
+          "Kubernetes", "Terraform", "Pandas", "TensorFlow", "Tableau", "Power BI", "Git", "Flask", "Django"]
+VERBS = ["Built", "Led", "Designed", "Reduced", "Automated", "Migrated", "Improved", "Launched", "Scaled"]
+OBJECTS = ["the billing pipeline", "a customer analytics dashboard", "the CI/CD workflow", "our search service",
+           "the data warehouse", "an internal admin tool", "the onboarding flow", "a fraud detection model"]
+RESULTS = ["cutting latency by {n}%", "saving ${n}k per year", "raising conversion by {n}%",
+           "reducing incidents by {n}%", "serving {n}k daily users"]
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter in PDF points
+LINES_PER_PAGE = 48
+
+
+def make_resume_lines(rng, pages):
+    """Resume text long enough to fill roughly `pages` pages."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    role = rng.choice(ROLES)
+    lines = [name, f"{role} | {name.split()[0].lower()}@example.com | 555-01{rng.randint(10, 99)}", "",
+             "Summary", f"{role} with {rng.randint(2, 12)} years of experience shipping production systems.", "",
+             "Skills", ", ".join(rng.sample(SKILLS, 8)), "", "Experience"]
+    while len(lines) < pages * LINES_PER_PAGE - 8:
+        lines += [f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({rng.randint(2012, 2020)} - {rng.randint(2021, 2025)})"]
+        for _ in range(rng.randint(3, 5)):
+            result = rng.choice(RESULTS).format(n=rng.randint(10, 90))
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}, {result}.")
+        lines.append("")
+    lines += ["Education", f"B.Sc. Computer Science - State University ({rng.randint(2008, 2018)})"]
+    return lines
+
+
+def make_job_description(rng):
+    role = rng.choice(ROLES)
+    must = rng.sample(SKILLS, 5)
+    return (f"{role}\nAbout the role\nWe are hiring a {role} to join {rng.choice(COMPANIES)}.\n\n"
+            f"Requirements\n" + "\n".join(f"- Experience with {skill}" for skill in must) +
+            "\n\nBenefits\n- Health insurance\n- Remote-friendly\n\n"
+            "We are an equal opportunity employer and value diversity.")
+
+
+def _pdf_escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+def write_text_pdf(path, lines):
+    """Minimal text PDF (Helvetica, one content stream per page) without any PDF library."""
+    pages = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        stream = b"BT /F1 11 Tf 14 TL 50 750 Td " + b"".join(b"(" + _pdf_escape(l) + b") Tj T* " for l in page_lines) + b"ET"
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                       b"/Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, content_id))
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_scanned_pdf(path, lines, rng, dpi=150):
+    """Image-only PDF: each page is rendered to a slightly rotated, blurred bitmap, like a scan."""
+    font = ImageFont.load_default()
+    scale = dpi / 72
+    images = []
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        image = Image.new("L", (int(PAGE_WIDTH * scale), int(PAGE_HEIGHT * scale)), 255)
+        draw = ImageDraw.Draw(image)
+        y = 50 * scale
+        for line in lines[start:start + LINES_PER_PAGE]:
+            draw.text((50 * scale, y), line, fill=0, font=font)
+            y += 14 * scale
+        image = image.rotate(rng.uniform(-0.8, 0.8), fillcolor=255).filter(ImageFilter.GaussianBlur(0.6))
+        images.append(image)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+
+
+def write_docx(path, lines, rng):
+    """DOCX with a header, headings, bullet paragraphs and a skills table."""
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = lines[0]
+    document.add_heading(lines[0], level=1)
+    document.add_paragraph(lines[1])
+    table = document.add_table(rows=1, cols=3)
+    table.rows[0].cells[0].text, table.rows[0].cells[1].text, table.rows[0].cells[2].text = "Skill", "Years", "Level"
+    for skill in rng.sample(SKILLS, 6):
+        row = table.add_row().cells
+        row[0].text, row[1].text, row[2].text = skill, str(rng.randint(1, 8)), rng.choice(["Advanced", "Expert"])
+    for line in lines[2:]:
+        if line in ("Summary", "Skills", "Experience", "Education"):
+            document.add_heading(line, level=2)
+        elif line:
+            document.add_paragraph(line)
+    document.save(path)
+
+
+def write_txt(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def make_corpus(out_dir, count=3, seed=7, max_pages=10):
+    """Write the corpus into out_dir and return a manifest of what was written."""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = []
+    for i in range(count):
+        pages = 1 + (i * (max_pages - 1)) // max(1, count - 1) if count > 1 else 1
+        lines = make_resume_lines(rng, pages)
+        files = {
+            f"text_{i}_{pages}p.pdf": lambda p: write_text_pdf(p, lines),
+            f"scanned_{i}_{pages}p.pdf": lambda p: write_scanned_pdf(p, lines, rng),
+            f"resume_{i}.docx": lambda p: write_docx(p, lines, rng),
+            f"resume_{i}.txt": lambda p: write_txt(p, lines),
+        }
+        for filename, write in files.items():
+            path = os.path.join(out_dir, filename)
+            write(path)
+            manifest.append({"file": filename, "pages": pages, "bytes": os.path.getsize(path)})
+    jds = [make_job_description(rng) for _ in range(max(3, count))]
+    with open(os.path.join(out_dir, "jds.json"), "w", encoding="utf-8") as f:
+        json.dump(jds, f, indent=2)
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the benchmark document corpus.")
+    parser.add_argument("--out", default="corpus")
+    parser.add_argument("--count", type=int, default=3, help="documents per type (page counts spread over 1..max)")
+    parser.add_argument("--max-pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    manifest = make_corpus(args.out, args.count, args.seed, args.max_pages)
+    print(f"--- Wrote {len(manifest)} documents to {args.out} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# startup_report.py
+# Cold-start report: imports each entry module in a fresh interpreter with `python -X importtime`
+# and prints the total import time, the slowest modules, and whether any of the heavy
+# OCR/LLM libraries were loaded at startup (they should only load on first use).
+#
+#   python startup_report.py                      # local_server, async_server, utils, Streamlit utils
+#   python startup_report.py --entry local_server --runs 5 --output startup.json
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(FUNCTIONS_DIR)
+
+# entry name -> (module to import, working directory)
+ENTRIES = {
+    "local_server": ("local_server", FUNCTIONS_DIR),
+    "async_server": ("async_server", FUNCTIONS_DIR),
+    "utils": ("utils", FUNCTIONS_DIR),
+    "streamlit_utils": ("utils", ROOT_DIR),
+}
+HEAVY_MODULES = ("cv2", "numpy", "pytesseract", "pdf2image", "pdfplumber", "docx", "docx2txt", "PyPDF2",
+                 "openai", "google.generativeai", "tiktoken", "httpx")
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(module, cwd):
+    """One fresh-interpreter import. Returns {module: (self_us, cumulative_us)} and the wall time."""
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "startup-report")}
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                            capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _indent, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return modules, float(result.stdout.strip().splitlines()[-1])
+
+
+def report(entry, runs=3, top=15):
+    module, cwd = ENTRIES[entry]
+    walls = []
+    modules = {}
+    for _ in range(runs):
+        modules, wall = measure(module, cwd)
+        walls.append(wall)
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        "entry": entry,
+        "runs": runs,
+        "import_seconds_median": round(statistics.median(walls), 4),
+        "import_seconds_min": round(min(walls), 4),
+        "modules_imported": len(modules),
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in modules],
+        "slowest": [{"module": name, "cumulative_ms": round(cum / 1000, 1), "self_ms": round(own / 1000, 1)}
+                    for name, (own, cum) in slowest[:top]],
+    }
+
+
+def print_report(row):
+    heavy = ", ".join(row["heavy_modules_loaded"]) or "none"
+    print(f"{row['entry']}: import {row['import_seconds_median']}s median (min {row['import_seconds_min']}s, "
+          f"{row['runs']} runs), {row['modules_imported']} modules, heavy modules at startup: {heavy}")
+    for item in row["slowest"]:
+        print(f"    {item['cumulative_ms']:>9.1f} ms cumulative {item['self_ms']:>8.1f} ms self  {item['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time breakdown of the server entry points.")
+    parser.add_argument("--entry", action="append", choices=sorted(ENTRIES), help="repeatable; default: all")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for entry in args.entry or list(ENTRIES):
+        try:
+            row = report(entry, args.runs, args.top)
+        except RuntimeError as e:
+            print(f"--- {entry}: {e} ---")
+            continue
+        print_report(row)
+        rows.append(row)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
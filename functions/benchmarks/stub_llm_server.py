@@ -0,0 +1,163 @@
+# stub_llm_server.py
+# Local OpenAI-compatible chat completions server for offline benchmarks.
+# Answers POST /v1/chat/completions (plain and stream=True) with canned but schema-valid
+# replies for each prompt type, after a configurable first-token latency and at a configurable
+# token rate, so latency numbers measure this project rather than Groq.
+#
+#   python stub_llm_server.py --port 8089 --latency 0.4 --tokens-per-second 300
+#   LLM_BASE_URL=http://127.0.0.1:8089/v1 python local_server.py
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+STREAM_CHUNK_TOKENS = 8
+
+PARSER_REPLY = {
+    "analysis": {
+        "detectedRole": "Software Engineer",
+        "missingSkills": [{"id": "missingSkill1", "name": "Kubernetes", "category": "Tool"}],
+    },
+    "resumeData": {
+        "fullName": "Bench Candidate", "email": "bench@example.com", "phone": "555-0100", "location": "Remote",
+        "summary": "Engineer who cut API latency by 40% across three services.",
+        "skills": [{"id": "skill1", "name": "Python", "category": "Language"}],
+        "experiences": [{
+            "id": "exp1", "title": "Software Engineer", "company": "Acme", "startDate": "2020", "endDate": "Present",
+            "achievements": [{"id": "exp1-a1", "description": "Reduced p95 latency by 40% by adding caching."}],
+        }],
+        "education": [], "projects": [], "certifications": [], "languages": [],
+    },
+}
+HEADER_REPLY = {"fullName": "Bench Candidate", "email": "bench@example.com", "phone": "555-0100",
+                "location": "Remote", "summary": "Engineer who cut API latency by 40% across three services."}
+MATCH_REPLY = {"match_score": 72, "summary": "Solid overlap on the core stack.",
+               "tailoring_suggestions": ["Quantify the impact of the AWS migration."]}
+CRITIQUE_REPLY = {"overall_feedback": "Clear structure; add metrics.", "summary_suggestions": ["Lead with impact."],
+                  "experience_suggestions": ["Quantify each bullet."], "skills_suggestions": ["Group by category."]}
+COVER_LETTER_PARAGRAPH = ("I am excited to apply for this role. In my current position I led the migration of our "
+                          "core services, cutting latency by 40% while keeping costs flat. ")
+
+
+def canned_reply(messages, params):
+    """Pick a reply that satisfies whichever prompt this is."""
+    prompt = messages[-1]["content"] if messages else ""
+    if (params.get("response_format") or {}).get("type") != "json_object":
+        return (COVER_LETTER_PARAGRAPH * 6).strip()
+    if "match_score" in prompt:
+        return json.dumps(MATCH_REPLY)
+    if "overall_feedback" in prompt:
+        return json.dumps(CRITIQUE_REPLY)
+    if '"resumeData"' in prompt:
+        return json.dumps(PARSER_REPLY)
+    if '"fullName"' in prompt:
+        return json.dumps(HEADER_REPLY)
+    return "{}"
+
+
+class StubConfig:
+    latency = 0.3
+    jitter = 0.1
+    tokens_per_second = 300.0
+    failure_rate = 0.0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if random.random() < StubConfig.failure_rate:
+            self._send_json(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+            return
+
+        text = canned_reply(request.get("messages", []), request)
+        max_chars = int(request.get("max_tokens") or 4000) * CHARS_PER_TOKEN
+        text = text[:max_chars]
+        completion_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        prompt_tokens = sum(len(m.get("content", "")) for m in request.get("messages", [])) // CHARS_PER_TOKEN
+        time.sleep(max(0.0, StubConfig.latency + random.uniform(-StubConfig.jitter, StubConfig.jitter)))
+
+        base = {"id": "chatcmpl-stub", "created": int(time.time()), "model": request.get("model", "stub")}
+        if request.get("stream"):
+            self._stream(base, text)
+            return
+        time.sleep(completion_tokens / StubConfig.tokens_per_second)
+        self._send_json(200, {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    def _stream(self, base, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        step = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        for i in range(0, len(text), step):
+            piece = text[i:i + step]
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(STREAM_CHUNK_TOKENS / StubConfig.tokens_per_second)
+        final = {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def start_stub_server(port=0, latency=0.3, jitter=0.1, tokens_per_second=300.0, failure_rate=0.0):
+    """Start the stub in a background thread. Returns (server, base_url)."""
+    StubConfig.latency = latency
+    StubConfig.jitter = min(jitter, latency)
+    StubConfig.tokens_per_second = tokens_per_second
+    StubConfig.failure_rate = failure_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM for benchmarks.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds of random latency")
+    parser.add_argument("--tokens-per-second", type=float, default=300.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.port, args.latency, args.jitter, args.tokens_per_second,
+                                         args.failure_rate)
+    print(f"--- Stub LLM listening on {base_url} ---")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# compaction.py
+# Shrinks extracted resume / JD text before it goes into a prompt: normalizes whitespace, drops
+# OCR noise and repeated page headers/footers, strips JD boilerplate (EEO statements, benefits
+# lists), and enforces a per-section token budget. Input tokens drive both latency and cost.
+import os
+import re
+import math
+import threading
+
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "3000"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "1500"))
+CHARS_PER_TOKEN = 4
+
+# A short line seen this many times, roughly a page apart, is a page header/footer
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MIN_GAP = 20
+REPEATED_LINE_MAX_CHARS = 80
+
+# "Page 2", "Page 2 of 3", "2 of 3", "- 2 -"
+PAGE_NUMBER_LINE = re.compile(r"^\s*(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s+of\s+\d+|-\s*\d+\s*-)\s*$", re.IGNORECASE)
+# A bare number is only a page number when it counts up from page to page: "2", ..., "3", ...
+BARE_NUMBER_LINE = re.compile(r"^\s*(\d{1,3})\s*$")
+# A line without any letter or digit is OCR speckle, e.g. "| ~ .", "=—", "'"
+HAS_ALNUM = re.compile(r"[^\W_]")
+
+# A JD paragraph containing one of these is the EEO/legal statement
+EEO_ANCHORS = re.compile(r"equal (employment )?opportunity|\bEEO\b|regardless of race", re.IGNORECASE)
+# Legal lines, only stripped inside or right after an EEO paragraph
+BOILERPLATE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"equal (employment )?opportunity",
+    r"(without regard|regardless) (to|of) (race|color|religion|sex|gender|age|national origin)",
+    r"\b(race|color|religion|sex(ual orientation)?|gender identity|national origin|veteran status|disability)\b.*\b(protected|status|characteristic)",
+    r"reasonable accommodations?",
+    r"\be-?verify\b",
+    r"\bEEO\b",
+    r"affirmative action",
+    r"(background|drug) (check|screening)",
+    r"privacy (notice|policy)",
+    r"recruitment agencies|unsolicited resumes",
+)]
+BOILERPLATE_HEADINGS = re.compile(
+    r"^\s*(benefits|perks|perks (and|&) benefits|what we offer|why join us|our benefits|compensation (and|&) benefits"
+    r"|equal opportunity( employer)?|eeo statement|about us|about the company|life at \w+)\s*:?\s*$",
+    re.IGNORECASE,
+)
+HEADING_LINE = re.compile(r"^\s*[A-Z][A-Za-z &/,'-]{2,60}:?\s*$")
+
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """The cl100k tokenizer, loaded on first use; None when tiktoken is unavailable."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # tiktoken is optional; fall back to a character estimate
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize_whitespace(text):
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\f", "\n").replace(" ", " ")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.split("\n")]
+    text = "\n".join(line for line in lines if not line or HAS_ALNUM.search(line))
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def page_number_lines(lines):
+    """Indexes of bare numbers that count up roughly a page apart, e.g. "2" ... "3" ... "4".
+
+    A lone number elsewhere (a year, a GPA, a team size) is content and is kept.
+    """
+    runs = []  # [(index, value), ...] counting up
+    for i, line in enumerate(lines):
+        match = BARE_NUMBER_LINE.match(line)
+        if not match:
+            continue
+        value = int(match.group(1))
+        for run in runs:
+            last_index, last_value = run[-1]
+            if last_value == value - 1 and i - last_index >= REPEATED_LINE_MIN_GAP:
+                run.append((i, value))
+                break
+        else:
+            runs.append([(i, value)])
+    return {i for run in runs if len(run) >= 2 for i, _value in run}
+
+
+def remove_repeated_lines(text):
+    """Drop page numbers, and keep only the first copy of page headers/footers.
+
+    A header/footer is a short line that recurs at least REPEATED_LINE_MIN_COUNT times, always
+    at least REPEATED_LINE_MIN_GAP lines apart (about a page), so a job title that repeats in
+    consecutive roles is left alone.
+    """
+    lines = text.split("\n")
+    positions = {}
+    for i, line in enumerate(lines):
+        if line and len(line) <= REPEATED_LINE_MAX_CHARS:
+            positions.setdefault(line, []).append(i)
+    headers = {
+        line for line, where in positions.items()
+        if len(where) >= REPEATED_LINE_MIN_COUNT
+        and min(b - a for a, b in zip(where, where[1:])) >= REPEATED_LINE_MIN_GAP
+    }
+    page_numbers = page_number_lines(lines)
+    seen = set()
+    kept = []
+    for i, line in enumerate(lines):
+        if PAGE_NUMBER_LINE.match(line) or i in page_numbers:
+            continue
+        if line in headers:
+            if line in seen:
+                continue
+            seen.add(line)
+        kept.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept))
+
+
+def strip_boilerplate(text):
+    """Remove EEO/legal paragraphs and benefits-style sections from a job description.
+
+    Legal wording is only stripped from the EEO anchor line to the end of its paragraph, and from
+    the paragraphs right after it that are legal wording throughout, so a requirement such as
+    "background check service integrations" is kept.
+    """
+    kept = []
+    skipping_section = False
+    after_eeo = False
+    for paragraph in re.split(r"\n\s*\n", text):
+        lines = paragraph.split("\n")
+        if BOILERPLATE_HEADINGS.match(lines[0]):
+            # The heading may sit alone above a list, so skip until the next heading
+            skipping_section = True
+            continue
+        if skipping_section:
+            if HEADING_LINE.match(lines[0]) and not lines[0].lstrip().startswith(("-", "*", "•")):
+                skipping_section = False
+            else:
+                continue
+        anchor = next((i for i, line in enumerate(lines) if EEO_ANCHORS.search(line)), None)
+        if anchor is not None:
+            lines = lines[:anchor]
+            after_eeo = True
+        elif after_eeo and all(any(p.search(line) for p in BOILERPLATE_PATTERNS) for line in lines if line.strip()):
+            continue
+        else:
+            after_eeo = False
+        if any(line.strip() for line in lines):
+            kept.append("\n".join(lines))
+    return "\n\n".join(kept)
+
+
+def truncate_to_budget(text, max_tokens):
+    """Keep the head of the text within max_tokens, cutting at a line boundary where possible."""
+    if max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    encoding = get_encoding()
+    if encoding is not None:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        head = text[:max_tokens * CHARS_PER_TOKEN]
+    cut = head.rfind("\n")
+    if cut > len(head) * 0.8:
+        head = head[:cut]
+    return head.rstrip() + "\n[...truncated]"
+
+
+def compact_resume(text, max_tokens=RESUME_TOKEN_BUDGET):
+    return truncate_to_budget(remove_repeated_lines(normalize_whitespace(text or "")), max_tokens)
+
+
+def compact_job_description(text, max_tokens=JD_TOKEN_BUDGET):
+    return truncate_to_budget(strip_boilerplate(remove_repeated_lines(normalize_whitespace(text or ""))), max_tokens)
+
+
+def compact_inputs(call_name, resume_text, jd_text=None):
+    """Compact the resume (and JD) for one LLM call, logging token counts before and after."""
+    before = estimate_tokens(resume_text) + estimate_tokens(jd_text)
+    resume_text = compact_resume(resume_text)
+    if jd_text is not None:
+        jd_text = compact_job_description(jd_text)
+    after = estimate_tokens(resume_text) + estimate_tokens(jd_text)
+    saved = (1 - after / before) * 100 if before else 0.0
+    print(f"--- {call_name}: input tokens {before} -> {after} after compaction ({saved:.0f}% saved) ---")
+    return resume_text, jd_text
@@ -0,0 +1,41 @@
+# document_store.py
+# Local store of extracted resume text behind opaque document IDs, so a client uploads a file
+# once and then runs parse / critique / match against the ID without re-uploading.
+import os
+import re
+import time
+import uuid
+import tempfile
+
+from llm_cache import DiskTier
+
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_documents"))
+DOCUMENT_TTL_SECONDS = int(os.getenv("DOCUMENT_TTL_SECONDS", str(24 * 3600)))
+DOCUMENT_STORE_MAX_BYTES = int(os.getenv("DOCUMENT_STORE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+DOCUMENT_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DocumentStore:
+    def __init__(self, directory=DOCUMENT_STORE_DIR, ttl_seconds=DOCUMENT_TTL_SECONDS,
+                 max_bytes=DOCUMENT_STORE_MAX_BYTES):
+        self.tier = DiskTier(directory, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+
+    def put(self, filename, text, extraction=None):
+        document_id = uuid.uuid4().hex
+        self.tier.set(document_id, {
+            "filename": filename,
+            "text": text,
+            "extraction": extraction,
+            "created": time.time(),
+        })
+        return document_id
+
+    def get(self, document_id):
+        """The stored document, or None if the ID is malformed, unknown or expired."""
+        if not document_id or not DOCUMENT_ID_PATTERN.match(document_id):
+            return None
+        return self.tier.get(document_id)
+
+
+document_store = DocumentStore()
@@ -0,0 +1,186 @@
+# extraction.py
+# Text extraction for uploaded resumes (PDF with per-page OCR fallback, DOCX, TXT).
+# Shared by the Flask server and the async server.
+# PDF text layers and DOCX XML are read in a single pass by text_extractors.py.
+import time
+import codecs
+
+from ocr_engine import (
+    ocr_pdf_stream, OCR_DPI, TESSERACT_CONFIG, OCR_ADAPTIVE, OCR_FIRST_PASS_DPI, OCR_MIN_CONFIDENCE,
+    OCR_REGION_MAX_FRACTION, MAX_PDF_PAGES, DocumentTooLarge,
+)
+from extraction_cache import extraction_cache, hash_stream, make_extraction_key
+from metrics import observe_stage, set_extraction_path, annotate_request
+from text_extractors import PdfPages, docx_text
+
+# NOTE: Ensure you have Tesseract and Poppler installed and paths are correct.
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+POPPLER_PATH = r'D:\Projects\Release-25.07.0-0\poppler-25.07.0\Library\bin'
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+# Bump whenever a change to the extractors changes their output, to invalidate cached text
+EXTRACTOR_VERSION = "5"
+TEXT_READ_CHUNK_BYTES = 64 * 1024
+
+
+class UnsupportedFileType(ValueError):
+    pass
+
+
+# ROBUST PDF EXTRACTION
+# A page whose text layer is shorter than this is treated as scanned and sent to OCR
+MIN_PAGE_TEXT_CHARS = 20
+
+def extract_text_from_pdf(file_stream):
+    text, _report = extract_text_from_pdf_with_report(file_stream)
+    return text
+
+def extract_text_from_pdf_with_report(file_stream):
+    """Per-page hybrid extraction: the text layer for text pages, OCR only for the pages it could not read.
+
+    Returns (text or None, report) where report lists the path and timing of every page.
+    """
+    start = time.perf_counter()
+    pages = {}
+    ocr_page_numbers = []
+    ocr_stages = []
+    text_layer_seconds = None
+    try:
+        with PdfPages(file_stream) as pdf:
+            annotate_request(pages=len(pdf))
+            if len(pdf) > MAX_PDF_PAGES:
+                raise DocumentTooLarge(f"The PDF has {len(pdf)} pages; the limit is {MAX_PDF_PAGES}.")
+            page_start = time.perf_counter()
+            for page_number, page_text in pdf:
+                entry = {"page": page_number, "path": "text", "seconds": round(time.perf_counter() - page_start, 4)}
+                if len(page_text.strip()) >= MIN_PAGE_TEXT_CHARS:
+                    entry["text"] = page_text
+                else:
+                    entry["path"] = "ocr"
+                    ocr_page_numbers.append(page_number)
+                pages[page_number] = entry
+                page_start = time.perf_counter()
+        text_layer_seconds = time.perf_counter() - start
+    except DocumentTooLarge:
+        raise
+    except Exception as e:
+        print(f"Reading the PDF text layer failed: {e}. Trying OCR on every page.")
+        pages = {}
+        ocr_page_numbers = None
+
+    if ocr_page_numbers is None or ocr_page_numbers:
+        print(f"--- OCR needed for pages {ocr_page_numbers or 'all'} (slower) ---")
+        try:
+            # Pages are rendered and OCR'd in a bounded worker pool, one page per task
+            for page_number, page_text, seconds, stages, quality in ocr_pdf_stream(
+                    file_stream, page_numbers=ocr_page_numbers, poppler_path=POPPLER_PATH, tesseract_cmd=TESSERACT_CMD):
+                ocr_stages.append(stages)
+                entry = pages.setdefault(page_number, {"page": page_number, "path": "ocr", "seconds": 0.0})
+                entry["seconds"] = round(entry["seconds"] + seconds, 4)
+                # DPI and mean Tesseract confidence chosen for this page
+                entry.update(quality)
+                entry["text"] = page_text
+        except DocumentTooLarge:
+            raise
+        except Exception as ocr_error:
+            print(f"--- Tesseract OCR error: {ocr_error} ---")
+    else:
+        print("--- Extracted text from the PDF text layer (fast mode) ---")
+
+    text = "".join(pages[n].pop("text", "").rstrip("\n") + "\n" for n in sorted(pages))
+    report = {
+        "pages": [pages[n] for n in sorted(pages)],
+        "text_pages": [n for n in sorted(pages) if pages[n]["path"] == "text"],
+        "ocr_pages": [n for n in sorted(pages) if pages[n]["path"] == "ocr"],
+        "total_seconds": round(time.perf_counter() - start, 4),
+    }
+    # Stages are observed once the path is known, so they carry the final extraction_path label
+    path = extraction_path(report)
+    if text_layer_seconds is not None:
+        observe_stage("pdf_text", text_layer_seconds, path)
+    for stages in ocr_stages:
+        for stage, seconds in stages.items():
+            observe_stage(stage, seconds, path)
+    if len(text.strip()) <= 20:
+        print("--- No text could be extracted from this PDF ---")
+        return None, report
+    return text, report
+
+def extract_text_from_docx(file_stream):
+    # Headers, body paragraphs, tables and text boxes; python-docx's doc.paragraphs missed all but the body
+    try:
+        return docx_text(file_stream)
+    except Exception as e:
+        print(f"Error reading DOCX: {e}")
+        return None
+
+def extraction_path(report):
+    """"text", "ocr" or "mixed" for PDFs, otherwise the report's own path ("docx", "txt")."""
+    if "path" in report:
+        return report["path"]
+    if report.get("ocr_pages"):
+        return "mixed" if report.get("text_pages") else "ocr"
+    return "text"
+
+def extraction_settings():
+    """Everything besides the file bytes that can change the extracted text."""
+    return {
+        "version": EXTRACTOR_VERSION,
+        "min_page_text_chars": MIN_PAGE_TEXT_CHARS,
+        "ocr_dpi": OCR_DPI,
+        "tesseract_config": TESSERACT_CONFIG,
+        "ocr_adaptive": OCR_ADAPTIVE,
+        "ocr_first_pass_dpi": OCR_FIRST_PASS_DPI,
+        "ocr_min_confidence": OCR_MIN_CONFIDENCE,
+        "ocr_region_max_fraction": OCR_REGION_MAX_FRACTION,
+    }
+
+def _extract(extension, file_stream):
+    if extension == '.pdf':
+        return extract_text_from_pdf_with_report(file_stream)
+    if extension == '.docx':
+        return extract_text_from_docx(file_stream), {"path": "docx"}
+    return read_text_stream(file_stream), {"path": "txt"}
+
+def read_text_stream(file_stream):
+    # Decoded chunk by chunk, so the raw bytes and the decoded text are never both held whole
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parts = []
+    file_stream.seek(0)
+    while True:
+        chunk = file_stream.read(TEXT_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+def extract_file_text(filename, file_stream, allowed=SUPPORTED_EXTENSIONS, use_cache=True):
+    """Dispatch on the file extension. Returns (text or None, extraction report).
+
+    PDF and DOCX results are cached by content hash, so re-uploading a file skips OCR.
+    """
+    extension = next((ext for ext in allowed if filename.endswith(ext)), None)
+    if extension is None:
+        raise UnsupportedFileType(filename)
+    if extension == '.txt':
+        set_extraction_path("txt")
+        return _extract(extension, file_stream)
+
+    cache_key = make_extraction_key(hash_stream(file_stream), extension, extraction_settings())
+    if use_cache:
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            set_extraction_path("cached")
+            annotate_request(pages=len(cached["extraction"].get("pages", [])) or None)
+            return cached["text"], {**cached["extraction"], "cached": True}
+    else:
+        extraction_cache.record_bypass()
+
+    text, report = _extract(extension, file_stream)
+    set_extraction_path(extraction_path(report))
+    annotate_request(pages=len(report.get("pages", [])) or None)
+    # Failed extractions are not cached so a fixed Tesseract/Poppler setup is picked up
+    if use_cache and text:
+        extraction_cache.set(cache_key, {"text": text, "extraction": report})
+    return text, {**report, "cached": False}
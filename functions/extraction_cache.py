@@ -0,0 +1,46 @@
+# extraction_cache.py
+# Disk-backed cache of extracted upload text, so the same file uploaded to /aiResumeParser,
+# /api/extract-text and /api/critique-resume is only run through text extraction/OCR once.
+# Keyed by SHA-256 of the file bytes plus the extractor version and OCR settings; evicted
+# least-recently-used under a byte budget (the same two-tier store as the LLM cache).
+import os
+import json
+import hashlib
+import tempfile
+
+from llm_cache import LLMCache
+
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_extraction_cache"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+EXTRACTION_CACHE_MEMORY_ITEMS = int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", "64"))
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "1") not in ("0", "false", "False")
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_stream(file_stream):
+    """SHA-256 of a seekable stream, read in chunks; leaves the stream at position 0."""
+    digest = hashlib.sha256()
+    file_stream.seek(0)
+    while True:
+        chunk = file_stream.read(HASH_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+    file_stream.seek(0)
+    return digest.hexdigest()
+
+
+def make_extraction_key(file_digest, extension, settings):
+    payload = json.dumps({"sha256": file_digest, "extension": extension, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# No TTL: extracted text never goes stale, it is only evicted for space
+extraction_cache = LLMCache(
+    directory=EXTRACTION_CACHE_DIR,
+    memory_items=EXTRACTION_CACHE_MEMORY_ITEMS,
+    ttl_seconds=0,
+    max_bytes=EXTRACTION_CACHE_MAX_BYTES,
+    enabled=EXTRACTION_CACHE_ENABLED,
+)
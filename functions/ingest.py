@@ -0,0 +1,271 @@
+# ingest.py
+# Bulk resume ingestion: walks a directory or a .zip of resumes, extracts text in a pool of
+# worker processes (the same extract_file_text path as the servers, so the extraction cache is
+# shared with them), parses each resume with process_resume_text at batch priority with bounded
+# concurrency, and appends one JSON line per resume to the output file.
+# Every finished resume is also appended to a checkpoint file, so re-running the same command
+# after an interruption skips what is already done. A summary of throughput, per-stage time and
+# failures is printed at the end.
+#
+#   python ingest.py resumes.zip --output resumes.jsonl
+#   python ingest.py ./resumes --extract-workers 8 --llm-concurrency 4 --summary-json summary.json
+import os
+import sys
+import json
+import time
+import zipfile
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from extraction import SUPPORTED_EXTENSIONS, extraction_path
+from uploads import UPLOAD_MAX_BYTES
+
+INGEST_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# Extractions queued per worker, so a run over thousands of files does not hold them all at once
+EXTRACT_WINDOW_PER_WORKER = 2
+PROGRESS_EVERY = 50
+MIN_TEXT_CHARS = 20
+
+
+# --- Inputs ---
+def list_inputs(source):
+    """(input id, filename, location) for every supported file; location is a path or (zip path, member)."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield f"{os.path.basename(source)}:{info.filename}", info.filename, (source, info.filename)
+        return
+    for directory, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, source), name, path
+
+
+def init_extract_worker():
+    """Worker process initializer: one OCR process per extraction worker.
+
+    The workers already run in parallel, so each OCR pool at its default size (up to 4) would
+    start up to 4x CPU count Tesseract processes.
+    """
+    import ocr_engine
+    ocr_engine.OCR_WORKERS = 1
+
+
+def extract_one(filename, location, use_cache):
+    """Worker process: (text or None, extraction report, seconds, error)."""
+    import io
+    from extraction import extract_file_text
+    start = time.perf_counter()
+    try:
+        if isinstance(location, tuple):
+            zip_path, member = location
+            with zipfile.ZipFile(zip_path) as archive:
+                if archive.getinfo(member).file_size > UPLOAD_MAX_BYTES:
+                    raise ValueError(f"File is larger than {UPLOAD_MAX_BYTES} bytes")
+                stream = io.BytesIO(archive.read(member))
+        else:
+            if os.path.getsize(location) > UPLOAD_MAX_BYTES:
+                raise ValueError(f"File is larger than {UPLOAD_MAX_BYTES} bytes")
+            stream = open(location, "rb")
+        with stream:
+            text, extraction = extract_file_text(filename.lower(), stream, use_cache=use_cache)
+        error = None if text and len(text.strip()) >= MIN_TEXT_CHARS else "Could not extract any text."
+        return text, extraction, time.perf_counter() - start, error
+    except Exception as e:
+        return None, None, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+# --- Output and checkpoint ---
+def open_output(path):
+    """Open the JSONL output for appending, dropping a line left half-written by a crash."""
+    if os.path.exists(path):
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    return open(path, "a", encoding="utf-8")
+
+
+def load_checkpoint(path):
+    """Input ID -> "ok" or "failed" for every resume a previous run finished (one "status\tid" line each)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(reversed(line.rstrip("\n").split("\t", 1)) for line in f if line.endswith("\n") and "\t" in line)
+
+
+# --- Summary ---
+def stage_summary(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+    return {"count": len(ordered), "total": round(sum(ordered), 2), "mean": round(sum(ordered) / len(ordered), 4),
+            "p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 4)}
+
+
+def print_summary(summary):
+    print(f"\n--- Ingested {summary['processed']} resumes in {summary['wall_seconds']}s "
+          f"({summary['resumes_per_second']} resumes/s); {summary['succeeded']} succeeded, "
+          f"{summary['failed']} failed, {summary['skipped']} skipped from the checkpoint ---")
+    for stage, stats in summary["stages"].items():
+        if stats["count"]:
+            print(f"    {stage:<8} n={stats['count']:<6} mean {stats['mean']}s  p50 {stats['p50']}s  "
+                  f"p95 {stats['p95']}s  max {stats['max']}s  total {stats['total']}s")
+    print(f"    extraction paths: {summary['extraction_paths']}")
+    for failure in summary["failures"]:
+        print(f"    {failure['count']:>5} x {failure['stage']}: {failure['error']}")
+
+
+# --- Run ---
+# Extraction workers are spawned and re-import this module, so utils (LLM clients) is only
+# imported in the parent
+def ingest(source, output, checkpoint=None, extract_workers=None, llm_concurrency=INGEST_LLM_CONCURRENCY,
+           model_choice="Llama 3.1", parse_mode="auto", use_cache=True, parse=True, retry_failed=False):
+    """Process every resume under `source` into `output` (JSONL). Returns the summary dict.
+
+    Resumes in the checkpoint are skipped; with retry_failed, the ones that failed are run again.
+    """
+    from scheduler import context_with_priority, BATCH
+    from utils import process_resume_text
+
+    checkpoint = checkpoint or output + ".checkpoint"
+    finished_before = load_checkpoint(checkpoint)
+    done_ids = {i for i, status in finished_before.items() if status == "ok" or not retry_failed}
+    extract_workers = extract_workers or os.cpu_count() or 1
+    counts = Counter()
+    timings = {"extract": [], "parse": []}
+    failures = Counter()
+    paths = Counter()
+    start = time.perf_counter()
+
+    def parse_one(text):
+        parse_start = time.perf_counter()
+        try:
+            result = process_resume_text(text, model_choice, use_cache=use_cache, mode=parse_mode)
+            error = None if "resumeData" in result and result["resumeData"].get("fullName") else \
+                result.get("error") or "The AI could not understand this resume."
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        return result, time.perf_counter() - parse_start, error
+
+    with open_output(output) as out, open(checkpoint, "a", encoding="utf-8") as marks, \
+            ProcessPoolExecutor(max_workers=extract_workers, mp_context=multiprocessing.get_context("spawn"),
+                                initializer=init_extract_worker) as extractors, \
+            ThreadPoolExecutor(max_workers=llm_concurrency) as parsers:
+
+        def finish(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            # The checkpoint is written after the record, so a crash in between repeats it rather than losing it
+            marks.write(f"{record['status']}\t{record['id']}\n")
+            marks.flush()
+            counts["succeeded" if record["status"] == "ok" else "failed"] += 1
+            if record["status"] != "ok":
+                failures[(record["stage"], record["error"])] += 1
+            processed = counts["succeeded"] + counts["failed"]
+            if processed % PROGRESS_EVERY == 0:
+                rate = processed / (time.perf_counter() - start)
+                print(f"--- {processed} done ({rate:.2f} resumes/s, {counts['failed']} failed) ---")
+
+        inputs = iter(list_inputs(source))
+        in_flight = {}  # future -> (stage, input id, filename, record so far)
+        running = Counter()
+        extract_window = extract_workers * EXTRACT_WINDOW_PER_WORKER
+        exhausted = False
+        while in_flight or not exhausted:
+            # Refill while neither stage is backed up
+            while not exhausted and running["extract"] < extract_window and running["parse"] < llm_concurrency * 2:
+                item = next(inputs, None)
+                if item is None:
+                    exhausted = True
+                    break
+                input_id, filename, location = item
+                if input_id in done_ids:
+                    counts["skipped"] += 1
+                    continue
+                future = extractors.submit(extract_one, filename, location, use_cache)
+                in_flight[future] = ("extract", input_id, filename, None)
+                running["extract"] += 1
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                kind, input_id, filename, record = in_flight.pop(future)
+                running[kind] -= 1
+                if kind == "extract":
+                    text, extraction, seconds, error = future.result()
+                    timings["extract"].append(seconds)
+                    record = {"id": input_id, "filename": filename, "status": "ok", "characters": len(text or ""),
+                              "extraction": extraction, "timings": {"extract": round(seconds, 4)}}
+                    if extraction:
+                        paths["cached" if extraction.get("cached") else extraction_path(extraction)] += 1
+                    if error:
+                        finish({**record, "status": "failed", "stage": "extract", "error": error})
+                    elif not parse:
+                        finish({**record, "text": text})
+                    else:
+                        parse_future = parsers.submit(context_with_priority(BATCH).run, parse_one, text)
+                        in_flight[parse_future] = ("parse", input_id, filename, record)
+                        running["parse"] += 1
+                else:
+                    result, seconds, error = future.result()
+                    timings["parse"].append(seconds)
+                    record["timings"]["parse"] = round(seconds, 4)
+                    if error:
+                        finish({**record, "status": "failed", "stage": "parse", "error": error})
+                    else:
+                        finish({**record, "result": result})
+
+    wall = time.perf_counter() - start
+    processed = counts["succeeded"] + counts["failed"]
+    return {
+        "source": source,
+        "output": output,
+        "processed": processed,
+        "succeeded": counts["succeeded"],
+        "failed": counts["failed"],
+        "skipped": counts["skipped"],
+        "wall_seconds": round(wall, 2),
+        "resumes_per_second": round(processed / wall, 3) if wall else None,
+        "stages": {stage: stage_summary(samples) for stage, samples in timings.items()},
+        "extraction_paths": dict(paths),
+        "failures": [{"stage": stage, "error": error, "count": n} for (stage, error), n in failures.most_common(20)],
+    }
+
+
+def main():
+    from utils import PARSE_MODES
+    parser = argparse.ArgumentParser(description="Extract and parse a directory or .zip of resumes into JSONL.")
+    parser.add_argument("source", help="directory (searched recursively) or .zip archive of .pdf/.docx/.txt resumes")
+    parser.add_argument("--output", default="resumes.jsonl")
+    parser.add_argument("--checkpoint", help="default: <output>.checkpoint")
+    parser.add_argument("--extract-workers", type=int, help="extraction processes, each OCRs with one process (default: CPU count)")
+    parser.add_argument("--llm-concurrency", type=int, default=INGEST_LLM_CONCURRENCY)
+    parser.add_argument("--model-choice", default="Llama 3.1")
+    parser.add_argument("--parse-mode", default="auto", choices=PARSE_MODES)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the extraction and LLM caches")
+    parser.add_argument("--retry-failed", action="store_true", help="re-run resumes that failed in a previous run")
+    parser.add_argument("--extract-only", action="store_true", help="write the extracted text instead of parsing it")
+    parser.add_argument("--summary-json", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        sys.exit(f"No such file or directory: {args.source}")
+    summary = ingest(args.source, args.output, args.checkpoint, args.extract_workers, args.llm_concurrency,
+                     args.model_choice, args.parse_mode, use_cache=not args.no_cache, parse=not args.extract_only,
+                     retry_failed=args.retry_failed)
+    print_summary(summary)
+    if args.summary_json:
+        with open(args.summary_json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# jd_index.py
+# Local index of job postings, for ranking one resume against every stored job description.
+# Each posting is kept as hashed term counts in flat CSR-style arrays (row offsets, term
+# hashes, counts) plus its skill set from keywords.py. The first query after a change turns
+# these into TF-IDF weights sorted by term (an inverted index), so a query only reads the
+# posting lists of its own terms and scores every job with one np.bincount.
+# Changes are saved to disk by a background flush JD_INDEX_SAVE_DELAY seconds after the first
+# unsaved change (and at exit), so a burst of adds or deletes rewrites the files once.
+import os
+import json
+import time
+import uuid
+import zlib
+import atexit
+import tempfile
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from prerank import tokenize
+from keywords import extract_keywords
+
+JD_INDEX_DIR = os.getenv("JD_INDEX_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_jd_index"))
+# Terms are hashed into 2**bits buckets; collisions only add a little noise to the scores
+JD_INDEX_HASH_BITS = int(os.getenv("JD_INDEX_HASH_BITS", "20"))
+# Deleted or replaced rows are dropped from the arrays once they are this share of all rows
+JD_INDEX_COMPACT_FRACTION = 0.25
+JD_INDEX_SAVE_DELAY = float(os.getenv("JD_INDEX_SAVE_DELAY", "2.0"))
+
+POSTING_FIELDS = ("title", "company", "location", "url")
+
+
+def term_hash(term, bits=JD_INDEX_HASH_BITS):
+    # crc32 rather than hash(): it is stable across processes, so a saved index stays valid
+    return zlib.crc32(term.encode("utf-8")) & ((1 << bits) - 1)
+
+
+def hashed_counts(text, bits=JD_INDEX_HASH_BITS):
+    return Counter(term_hash(term, bits) for term in tokenize(text))
+
+
+def resume_data_text(resume_data):
+    """Flatten a parsed `resumeData` object into plain text for matching."""
+    lines = [resume_data.get("summary", "")]
+    lines += [s.get("name", "") if isinstance(s, dict) else str(s) for s in resume_data.get("skills", [])]
+    for key in ("experiences", "projects"):
+        for item in resume_data.get(key, []):
+            lines += [item.get("title", ""), item.get("name", ""), item.get("description", "")]
+            lines += [a.get("description", "") for a in item.get("achievements", []) if isinstance(a, dict)]
+    for key in ("education", "certifications"):
+        for item in resume_data.get(key, []):
+            lines += [str(v) for v in item.values() if isinstance(v, str)]
+    return "\n".join(line for line in lines if line)
+
+
+class JDIndex:
+    def __init__(self, directory=JD_INDEX_DIR, hash_bits=JD_INDEX_HASH_BITS, save_delay=JD_INDEX_SAVE_DELAY):
+        self.directory = directory
+        self.hash_bits = hash_bits
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()  # one writer at a time, outside self._lock
+        self._loaded = False
+        self._dirty = False
+        self._flush_timer = None
+        self._reset()
+        atexit.register(self.flush)
+
+    def _reset(self):
+        self.postings = []      # per row: id, fields, text, skills (None once the row is deleted)
+        self.row_by_id = {}
+        self._indptr = array("q", [0])
+        self._terms = array("I")
+        self._counts = array("f")
+        self._built = None
+
+    # --- Storage ---
+    def _paths(self):
+        return os.path.join(self.directory, "postings.json"), os.path.join(self.directory, "terms.npz")
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        meta_path, arrays_path = self._paths()
+        if not (os.path.exists(meta_path) and os.path.exists(arrays_path)):
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("hash_bits") != self.hash_bits:
+                print("--- JD index was built with different JD_INDEX_HASH_BITS; starting empty ---")
+                return
+            with np.load(arrays_path) as arrays:
+                self._indptr = array("q", arrays["indptr"].tobytes())
+                self._terms = array("I", arrays["terms"].tobytes())
+                self._counts = array("f", arrays["counts"].tobytes())
+            self.postings = meta["postings"]
+            self.row_by_id = {p["id"]: row for row, p in enumerate(self.postings) if p is not None}
+            print(f"--- Loaded JD index: {len(self.row_by_id)} postings ---")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"--- Could not load the JD index ({e}); starting empty ---")
+            self._reset()
+
+    def _mark_dirty(self):
+        """Called under self._lock after a change; schedules one flush for the whole burst."""
+        self._dirty = True
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.save_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write unsaved changes to disk now. Queries and adds are only blocked while copying."""
+        with self._save_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                # Rows are never changed in place (a replaced row becomes None), so copying the
+                # list and the arrays is a consistent snapshot
+                postings = list(self.postings)
+                indptr, terms, counts = array("q", self._indptr), array("I", self._terms), array("f", self._counts)
+            try:
+                self._save(postings, indptr, terms, counts)
+            except OSError as e:
+                print(f"--- Could not save the JD index ({e}); will retry on the next change ---")
+                with self._lock:
+                    self._dirty = True
+
+    def _save(self, postings, indptr, terms, counts):
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path, arrays_path = self._paths()
+        # Write to temporary files and rename, so a crash never leaves a half-written index
+        with open(arrays_path + ".tmp", "wb") as f:
+            np.savez(f, indptr=np.frombuffer(indptr, dtype=np.int64),
+                     terms=np.frombuffer(terms, dtype=np.uint32),
+                     counts=np.frombuffer(counts, dtype=np.float32))
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"hash_bits": self.hash_bits, "postings": postings}, f)
+        os.replace(arrays_path + ".tmp", arrays_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    def _compact(self):
+        live = [row for row, p in enumerate(self.postings) if p is not None]
+        indptr, terms, counts = self._indptr, self._terms, self._counts
+        postings = self.postings
+        self._reset()
+        for row in live:
+            start, end = indptr[row], indptr[row + 1]
+            self._append_row(postings[row], terms[start:end], counts[start:end])
+
+    def _append_row(self, posting, terms, counts):
+        self.row_by_id[posting["id"]] = len(self.postings)
+        self.postings.append(posting)
+        self._terms.extend(terms)
+        self._counts.extend(counts)
+        self._indptr.append(len(self._terms))
+
+    # --- Ingestion ---
+    def add(self, postings):
+        """Index postings ({"id"?, "title", "company", "location", "url", "text"}). Returns their IDs.
+
+        Postings without an ID get one; an existing ID is replaced. Raises ValueError when a
+        posting has no text.
+        """
+        prepared = []
+        for posting in postings:
+            text = (posting.get("text") or posting.get("description") or "").strip()
+            if not text:
+                raise ValueError("Every posting needs a non-empty 'text'")
+            counts = hashed_counts(text, self.hash_bits)
+            record = {"id": str(posting.get("id") or uuid.uuid4().hex), "text": text,
+                      "skills": extract_keywords(text), "added": time.time(),
+                      **{field: posting.get(field, "") for field in POSTING_FIELDS}}
+            prepared.append((record, array("I", counts.keys()), array("f", counts.values())))
+
+        with self._lock:
+            self._ensure_loaded()
+            for record, terms, counts in prepared:
+                old_row = self.row_by_id.get(record["id"])
+                if old_row is not None:
+                    self.postings[old_row] = None
+                self._append_row(record, terms, counts)
+            if len(self.postings) - len(self.row_by_id) > JD_INDEX_COMPACT_FRACTION * len(self.postings):
+                self._compact()
+            self._built = None
+            self._mark_dirty()
+        return [record["id"] for record, _t, _c in prepared]
+
+    def remove(self, posting_id):
+        with self._lock:
+            self._ensure_loaded()
+            row = self.row_by_id.pop(posting_id, None)
+            if row is None:
+                return False
+            self.postings[row] = None
+            self._built = None
+            self._mark_dirty()
+            return True
+
+    def get(self, posting_id):
+        with self._lock:
+            self._ensure_loaded()
+            row = self.row_by_id.get(posting_id)
+            return None if row is None else self.postings[row]
+
+    # --- Query ---
+    def _build(self):
+        """TF-IDF weights (log-scaled tf, L2-normalized per posting) sorted by term hash."""
+        n_rows = len(self.postings)
+        indptr = np.frombuffer(self._indptr, dtype=np.int64)
+        terms = np.frombuffer(self._terms, dtype=np.uint32)
+        counts = np.frombuffer(self._counts, dtype=np.float32)
+        rows = np.repeat(np.arange(n_rows, dtype=np.int32), np.diff(indptr))
+        live = np.array([p is not None for p in self.postings], dtype=bool)
+        keep = live[rows] if rows.size else np.zeros(0, dtype=bool)
+        rows, terms, counts = rows[keep], terms[keep], counts[keep]
+
+        doc_freq = np.bincount(terms, minlength=1 << self.hash_bits)
+        idf = (np.log((1.0 + live.sum()) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+        weights = (1.0 + np.log(counts)) * idf[terms]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_rows))
+        norms[norms == 0] = 1.0
+        weights = (weights / norms[rows]).astype(np.float32)
+
+        order = np.argsort(terms, kind="stable")
+        skill_rows = {}
+        for row, posting in enumerate(self.postings):
+            if posting is not None:
+                for skill in posting["skills"]:
+                    skill_rows.setdefault(skill.lower(), []).append(row)
+        return {
+            "terms": terms[order], "rows": rows[order], "weights": weights[order], "idf": idf, "live": live,
+            "skill_rows": {skill: np.array(r, dtype=np.int32) for skill, r in skill_rows.items()},
+        }
+
+    def search(self, resume_text, top_n=10, required_skills=None):
+        """Top postings for a resume: [{"id", fields..., "score", "matching_keywords", "missing_keywords"}].
+
+        required_skills keeps only postings whose skill set contains all of them.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if self._built is None:
+                self._built = self._build()
+            # A snapshot, so postings replaced while this query runs do not shift under it
+            built, postings = self._built, list(self.postings)
+        n_rows = len(postings)
+        if not n_rows:
+            return []
+
+        query = hashed_counts(resume_text, self.hash_bits)
+        if not query:
+            return []
+        q_terms = np.fromiter(query.keys(), dtype=np.uint32, count=len(query))
+        q_weights = (1.0 + np.log(np.fromiter(query.values(), dtype=np.float32, count=len(query)))) * built["idf"][q_terms]
+        q_weights /= np.linalg.norm(q_weights) or 1.0
+
+        # Gather every posting list of the query terms in one go and sum per posting
+        starts = np.searchsorted(built["terms"], q_terms, side="left")
+        lengths = np.searchsorted(built["terms"], q_terms, side="right") - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        scores = np.bincount(built["rows"][offsets], weights=built["weights"][offsets] * np.repeat(q_weights, lengths),
+                             minlength=n_rows)
+
+        allowed = built["live"].copy()
+        for skill in required_skills or []:
+            mask = np.zeros(n_rows, dtype=bool)
+            mask[built["skill_rows"].get(skill.lower(), np.zeros(0, dtype=np.int32))] = True
+            allowed &= mask
+        scores[~allowed] = -1.0
+        top_n = min(top_n, int(allowed.sum()))
+        if top_n <= 0:
+            return []
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        resume_skills = set(extract_keywords(resume_text))
+        results = []
+        for row in top:
+            posting = postings[row]
+            results.append({
+                "id": posting["id"],
+                **{field: posting.get(field, "") for field in POSTING_FIELDS},
+                "score": round(float(max(scores[row], 0.0)), 4),
+                "matching_keywords": [s for s in posting["skills"] if s in resume_skills],
+                "missing_keywords": [s for s in posting["skills"] if s not in resume_skills],
+            })
+        return results
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                "postings": len(self.row_by_id),
+                "rows": len(self.postings),
+                "stored_terms": len(self._terms),
+                "array_bytes": (len(self._indptr) * self._indptr.itemsize + len(self._terms) * self._terms.itemsize
+                                + len(self._counts) * self._counts.itemsize),
+                "hash_bits": self.hash_bits,
+            }
+
+
+jd_index = JDIndex()
@@ -0,0 +1,418 @@
+# job_queue.py
+# Background jobs for the slow upload routes (/aiResumeParser, /api/critique-resume).
+# A client opts in with the form field async=true or the header "Prefer: respond-async" and gets
+# 202 with a job ID straight away; a pool of worker processes runs the extraction and LLM stages.
+# Job state, per-stage progress and results live in SQLite (JOB_DB_PATH) and the upload is
+# spooled to JOB_SPOOL_DIR, so queued and interrupted jobs are picked up again after a restart.
+# Clients poll GET /api/jobs/<job_id>, or pass callback_url to be POSTed the result; callbacks
+# only go to local hosts (JOB_CALLBACK_HOSTS).
+# One server process per JOB_DB_PATH: on start it re-queues every job left "running".
+# Workers are spawned, not forked, and import extraction/utils only when they run a job.
+# LLM budgets (LLM_RPM_*/LLM_TPM_*) are per process, so the server and each worker run at
+# 1 / (JOB_WORKERS + 1) of them and together stay within the configured limits.
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import tempfile
+import threading
+import ipaddress
+import multiprocessing
+import urllib.request
+from urllib.parse import urlsplit
+from contextlib import closing, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "resume_builder_jobs.sqlite3"))
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_job_uploads"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs (and their results) are deleted after this long
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+# A job interrupted this many times by restarts or worker crashes is failed instead of retried
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_CALLBACK_HOSTS = {h.strip().lower() for h in os.getenv("JOB_CALLBACK_HOSTS", "localhost,127.0.0.1,::1").split(",") if h.strip()}
+JOB_CALLBACK_TIMEOUT_SECONDS = float(os.getenv("JOB_CALLBACK_TIMEOUT_SECONDS", "10"))
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+# Stages of each job kind, in order; progress is reported per stage
+JOB_KINDS = {
+    "parse": ("extract", "parse"),
+    "critique": ("extract", "critique"),
+}
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    stages TEXT NOT NULL,
+    params TEXT NOT NULL,
+    filename TEXT,
+    input_path TEXT,
+    callback_url TEXT,
+    callback_status TEXT,
+    result TEXT,
+    http_status INTEGER,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobFailed(Exception):
+    """A job that ran but cannot produce a result; http_status is what the synchronous route returns."""
+
+    def __init__(self, message, http_status):
+        super().__init__(message)
+        self.http_status = http_status
+
+
+def async_requested(form_value, prefer_header):
+    return (form_value or "").lower() in ("1", "true", "yes") or "respond-async" in (prefer_header or "").lower()
+
+
+def check_callback_url(url):
+    """Raise ValueError unless url is http(s) on a local host."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("callback_url must be an http(s) URL")
+    try:
+        local = ipaddress.ip_address(host).is_loopback or host in JOB_CALLBACK_HOSTS
+    except ValueError:
+        local = host in JOB_CALLBACK_HOSTS
+    if not local:
+        raise ValueError(f"callback_url must point at a local host ({', '.join(sorted(JOB_CALLBACK_HOSTS))})")
+
+
+# --- Storage ---
+class JobStore:
+    """Job rows in SQLite. Every call opens its own connection, so the store is safe to use from
+    server threads and worker processes at once."""
+
+    def __init__(self, path=JOB_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def _execute(self, sql, args=()):
+        with closing(self._connect()) as db:
+            cursor = db.execute(sql, args)
+            return cursor.fetchall(), cursor.rowcount
+
+    def create(self, kind, filename, input_path, params, callback_url=None, job_id=None):
+        job_id = job_id or uuid.uuid4().hex
+        stages = [{"name": name, "status": "pending", "seconds": None} for name in JOB_KINDS[kind]]
+        self._execute("INSERT INTO jobs (id, kind, status, stages, params, filename, input_path, callback_url, created) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                      (job_id, kind, QUEUED, json.dumps(stages), json.dumps(params), filename, input_path,
+                       callback_url, time.time()))
+        return job_id
+
+    def get(self, job_id):
+        rows, _count = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        for key in ("stages", "params", "result"):
+            if job[key] is not None:
+                job[key] = json.loads(job[key])
+        return job
+
+    def claim(self, job_id):
+        """Mark a queued job running. False if another process already took it."""
+        _rows, count = self._execute("UPDATE jobs SET status = ?, started = ?, attempts = attempts + 1 "
+                                     "WHERE id = ? AND status = ?", (RUNNING, time.time(), job_id, QUEUED))
+        return count == 1
+
+    def update_stages(self, job_id, stage, stages):
+        self._execute("UPDATE jobs SET stage = ?, stages = ? WHERE id = ?", (stage, json.dumps(stages), job_id))
+
+    def finish(self, job_id, status, result=None, http_status=None, error=None):
+        self._execute("UPDATE jobs SET status = ?, result = ?, http_status = ?, error = ?, finished = ? WHERE id = ?",
+                      (status, None if result is None else json.dumps(result), http_status, error, time.time(), job_id))
+
+    def fail_unfinished(self, job_id, error):
+        self._execute("UPDATE jobs SET status = ?, error = ?, http_status = 500, finished = ? "
+                      "WHERE id = ? AND status IN (?, ?)", (FAILED, error, time.time(), job_id, QUEUED, RUNNING))
+
+    def set_callback_status(self, job_id, callback_status):
+        self._execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id))
+
+    def recover(self, max_attempts=JOB_MAX_ATTEMPTS):
+        """Re-queue jobs left running by a previous process. Returns the IDs of every queued job."""
+        rows, _count = self._execute("SELECT id, attempts FROM jobs WHERE status = ?", (RUNNING,))
+        for row in rows:
+            if row["attempts"] >= max_attempts:
+                self.fail_unfinished(row["id"], f"Interrupted {row['attempts']} times; giving up")
+            else:
+                self._execute("UPDATE jobs SET status = ?, stage = NULL WHERE id = ? AND status = ?",
+                              (QUEUED, row["id"], RUNNING))
+        rows, _count = self._execute("SELECT id FROM jobs WHERE status = ? ORDER BY created", (QUEUED,))
+        return [row["id"] for row in rows]
+
+    def purge(self, ttl_seconds=JOB_TTL_SECONDS):
+        """Delete finished jobs older than the TTL. Returns their leftover input files."""
+        cutoff = time.time() - ttl_seconds
+        rows, _count = self._execute("SELECT input_path FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                                     (SUCCEEDED, FAILED, cutoff))
+        self._execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?", (SUCCEEDED, FAILED, cutoff))
+        return [row["input_path"] for row in rows if row["input_path"]]
+
+    def counts(self):
+        rows, _count = self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+
+def public_view(job):
+    """What GET /api/jobs/<job_id> returns."""
+    stages = job["stages"]
+    view = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": round(sum(1 for s in stages if s["status"] == "done") / len(stages), 2),
+        "stages": stages,
+        "filename": job["filename"],
+        "attempts": job["attempts"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+        "status_url": f"/api/jobs/{job['id']}",
+    }
+    if job["callback_url"]:
+        view["callback_status"] = job["callback_status"]
+    if job["status"] in (SUCCEEDED, FAILED):
+        view["http_status"] = job["http_status"]
+        view["result"] = job["result"]
+        if job["error"]:
+            view["error"] = job["error"]
+    return view
+
+
+# --- Worker side (runs in a pool process) ---
+def budget_share(workers):
+    """Share of the LLM budgets for the server and each of its `workers` job processes."""
+    return 1.0 / (workers + 1)
+
+
+def init_worker(share):
+    """Pool initializer: this worker's share of the LLM budgets."""
+    from utils import llm_scheduler
+    llm_scheduler.share_budgets(share)
+
+
+def _extract_upload(job, stream):
+    from extraction import extract_file_text, UnsupportedFileType, DocumentTooLarge
+    try:
+        raw_text, extraction = extract_file_text(job["filename"], stream, use_cache=job["params"].get("use_cache", True))
+    except UnsupportedFileType:
+        raise JobFailed("Unsupported file type.", 400)
+    except DocumentTooLarge as e:
+        raise JobFailed(str(e), 413)
+    if raw_text is None or len(raw_text.strip()) < 20:
+        raise JobFailed("Could not extract any text.", 400)
+    return raw_text, extraction
+
+
+def _parse_job(job, stream, stage):
+    from utils import process_resume_text
+    params = job["params"]
+    with stage("extract"):
+        raw_text, extraction = _extract_upload(job, stream)
+    with stage("parse"):
+        result = process_resume_text(raw_text, params.get("model_choice", "Llama 3.1"),
+                                     use_cache=params.get("use_cache", True), mode=params.get("parse_mode", "auto"))
+        if not ("resumeData" in result and result["resumeData"].get("fullName")):
+            raise JobFailed("The AI could not understand this resume. It may be too corrupted or unreadable.", 400)
+    return {**result, "extraction": extraction}
+
+
+def _critique_job(job, stream, stage):
+    from utils import critique_resume
+    with stage("extract"):
+        raw_text, extraction = _extract_upload(job, stream)
+    with stage("critique"):
+        result = critique_resume(raw_text, use_cache=job["params"].get("use_cache", True))
+        # critique_resume reports an LLM failure as {"error": ...} rather than raising
+        if "error" in result:
+            raise JobFailed(result["error"], 500)
+    return {**result, "extraction": extraction}
+
+
+JOB_RUNNERS = {"parse": _parse_job, "critique": _critique_job}
+
+
+def send_callback(url, payload):
+    # No redirects: a local callback must not be bounced to another host
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.build_opener(NoRedirect).open(request, timeout=JOB_CALLBACK_TIMEOUT_SECONDS) as response:
+        return response.status
+
+
+def run_job(db_path, job_id):
+    """Pool entry point: run one job to completion, recording progress and the result."""
+    store = JobStore(db_path)
+    if not store.claim(job_id):
+        return
+    job = store.get(job_id)
+    stages = job["stages"]
+    for entry in stages:
+        entry["status"], entry["seconds"] = "pending", None
+
+    @contextmanager
+    def stage(name):
+        entry = next(s for s in stages if s["name"] == name)
+        entry["status"] = "running"
+        store.update_stages(job_id, name, stages)
+        start = time.perf_counter()
+        try:
+            yield
+            entry["status"] = "done"
+        except BaseException:
+            entry["status"] = "failed"
+            raise
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 4)
+            store.update_stages(job_id, name, stages)
+
+    print(f"--- Job {job_id}: {job['kind']} of {job['filename']} (attempt {job['attempts']}) ---")
+    try:
+        with open(job["input_path"], "rb") as stream:
+            result = JOB_RUNNERS[job["kind"]](job, stream, stage)
+        status, http_status, error = SUCCEEDED, 200, None
+    except JobFailed as e:
+        result, status, http_status, error = {"error": str(e)}, FAILED, e.http_status, str(e)
+    except Exception as e:
+        print(f"--- Job {job_id} failed: {e} ---")
+        result, status, http_status, error = {"error": str(e)}, FAILED, 500, str(e)
+    store.finish(job_id, status, result, http_status, error)
+    try:
+        os.remove(job["input_path"])
+    except OSError:
+        pass
+
+    if job["callback_url"]:
+        try:
+            payload = {"job_id": job_id, "status": status, "http_status": http_status, "result": result}
+            store.set_callback_status(job_id, f"delivered (HTTP {send_callback(job['callback_url'], payload)})")
+        except Exception as e:
+            store.set_callback_status(job_id, f"failed: {e}")
+
+
+# --- Server side ---
+class JobQueue:
+    def __init__(self, db_path=JOB_DB_PATH, spool_dir=JOB_SPOOL_DIR, workers=JOB_WORKERS):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.workers = workers
+        self._store = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = JobStore(self.db_path)
+        return self._store
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from utils import llm_scheduler
+                share = budget_share(self.workers)
+                llm_scheduler.share_budgets(share)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=init_worker, initargs=(share,))
+            return self._pool
+
+    def _dispatch(self, job_id):
+        future = self._get_pool().submit(run_job, self.db_path, job_id)
+
+        def on_done(done):
+            error = done.exception()
+            if error is None:
+                return
+            print(f"--- Job worker for {job_id} crashed: {error!r} ---")
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    if self._pool is not None:
+                        self._pool.shutdown(wait=False, cancel_futures=True)
+                        self._pool = None
+            self.store.fail_unfinished(job_id, f"Worker crashed: {error!r}")
+
+        future.add_done_callback(on_done)
+
+    def start(self):
+        """Purge expired jobs and resume the ones a previous process left queued or running."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._purge()
+        pending = self.store.recover()
+        if pending:
+            print(f"--- Resuming {len(pending)} background jobs ---")
+        for job_id in pending:
+            self._dispatch(job_id)
+
+    def _purge(self):
+        for path in self.store.purge():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def submit(self, kind, filename, stream, params, callback_url=None):
+        """Spool the upload and queue the job. Returns its public view; ValueError for a bad callback_url."""
+        if callback_url:
+            check_callback_url(callback_url)
+        self.start()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        input_path = os.path.join(self.spool_dir, job_id + os.path.splitext(filename or "")[1].lower())
+        stream.seek(0)
+        with open(input_path, "wb") as f:
+            shutil.copyfileobj(stream, f)
+        self.store.create(kind, filename, input_path, params, callback_url, job_id=job_id)
+        self._dispatch(job_id)
+        return public_view(self.store.get(job_id))
+
+    def get(self, job_id):
+        """Public view of a job, or None if the ID is malformed, unknown or expired."""
+        if not job_id or not JOB_ID_PATTERN.match(job_id):
+            return None
+        self.start()
+        job = self.store.get(job_id)
+        return None if job is None else public_view(job)
+
+    def stats(self):
+        self.start()
+        return {"workers": self.workers, "jobs": self.store.counts()}
+
+
+job_queue = JobQueue()
@@ -0,0 +1,181 @@
+# json_stream.py
+# Incremental parsing and salvage of LLM JSON replies.
+# StreamingJSONParser is fed the completion chunk by chunk and reports each top-level field as
+# soon as its value closes, so a caller can show match_score before the suggestions are written.
+# salvage_json recovers the finished part of a reply that was cut off at max_tokens or has stray
+# text around the object, instead of throwing the whole (paid-for) completion away.
+# No imports from sibling modules, so the Streamlit app can use it as functions.json_stream.
+import copy
+import json
+
+
+class StreamingJSONParser:
+    """Feed chunks with feed(); each call returns the (key, value) pairs of the top-level fields
+    that closed in that chunk. Text before the first "{" (e.g. a ```json fence) is skipped."""
+
+    def __init__(self):
+        self.parts = []
+        self.text = ""
+        self.fields = {}
+        self._pos = 0
+        self._depth = 0
+        self._state = "start"  # start, key, colon, value, in_value, comma, done
+        self._in_string = False
+        self._escape = False
+        self._key_start = self._value_start = 0
+        self._key = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        closed = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._state == "done":
+                break
+            if self._state == "start":
+                if c == "{":
+                    self._state, self._depth = "key", 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == "key":
+                        self._key = self._decode(text[self._key_start:i + 1])
+                        self._state = "colon"
+                    elif self._depth == 1 and self._state == "in_value":
+                        self._close_value(text[self._value_start:i + 1], closed)
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state == "key":
+                    self._key_start = i
+                elif self._depth == 1 and self._state == "value":
+                    self._value_start, self._state = i, "in_value"
+            elif c in "{[":
+                if self._depth == 1 and self._state == "value":
+                    self._value_start, self._state = i, "in_value"
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._state == "in_value":
+                    self._close_value(text[self._value_start:i + 1], closed)
+                elif self._depth == 0:
+                    if self._state == "in_value":
+                        self._close_value(text[self._value_start:i], closed)
+                    self._state = "done"
+            elif self._depth == 1:
+                if c == ":" and self._state == "colon":
+                    self._state = "value"
+                elif c == ",":
+                    if self._state == "in_value":
+                        self._close_value(text[self._value_start:i], closed)
+                    self._state = "key"
+                elif self._state == "value" and not c.isspace():
+                    # Number, true, false or null: it ends at the next "," or "}"
+                    self._value_start, self._state = i, "in_value"
+        self._pos = len(text)
+        return closed
+
+    @staticmethod
+    def _decode(raw):
+        try:
+            return json.loads(raw.strip())
+        except ValueError:
+            return None
+
+    def _close_value(self, raw, closed):
+        self._state = "comma"
+        value = self._decode(raw)
+        if self._key is not None and (value is not None or raw.strip() == "null"):
+            self.fields[self._key] = value
+            closed.append((self._key, value))
+
+    @property
+    def complete(self):
+        return self._state == "done"
+
+
+def salvage_json(text):
+    """Best-effort parse of a JSON object that may be truncated or wrapped in stray text.
+
+    Returns a dict, or None if nothing usable is left. Unfinished trailing items are dropped
+    rather than guessed at, so every value in the result is one the model actually finished.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    stack = []
+    in_string = escape = False
+    cuts = []  # (end index, closing brackets) where cutting keeps only finished values
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                cuts.append((i + 1, "".join(reversed(stack))))
+            continue
+        if c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif c in "}]":
+            if not stack or stack[-1] != c:
+                break
+            stack.pop()
+            if not stack:
+                # The object is complete; anything after it is stray text
+                try:
+                    value = json.loads(text[start:i + 1])
+                    return value if isinstance(value, dict) else None
+                except ValueError:
+                    break
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif c == ",":
+            cuts.append((i, "".join(reversed(stack))))
+    for end, closers in reversed(cuts):
+        try:
+            value = json.loads(text[start:end] + closers)
+        except ValueError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def fill_defaults(value, schema):
+    """Add the keys the model never reached, using the schema's default values (recursively for dicts)."""
+    filled = dict(value)
+    for key, default in schema.items():
+        if key not in filled:
+            filled[key] = copy.deepcopy(default)
+        elif isinstance(default, dict) and isinstance(filled[key], dict):
+            filled[key] = fill_defaults(filled[key], default)
+    return filled
+
+
+def parse_json_reply(text, schema=None):
+    """Parse an LLM JSON reply. Returns (dict or None, salvaged).
+
+    A clean reply is returned unchanged. Anything else goes through salvage_json and, when a
+    schema (a dict of default values) is given, missing keys are filled in from it. A salvaged
+    reply that recovered none of the schema's keys counts as a failure.
+    """
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value, False
+    except ValueError:
+        pass
+    value = salvage_json(text)
+    if not value or (schema and not any(key in value for key in schema)):
+        return None, True
+    return (fill_defaults(value, schema) if schema else value), True
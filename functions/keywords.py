@@ -0,0 +1,292 @@
+# keywords.py
+# Deterministic skill/keyword extraction for the job matcher.
+# A lexicon of canonical skills and their aliases is compiled into a token trie; a single
+# left-to-right scan with longest-match finds every skill in a text in linear time.
+# Skills that are also everyday words ("swift", "spark", "go") only count in a technical
+# context, e.g. "Skills: Go, Rust" or "Python and Go", never in "go live" or "a swift pace".
+# matching_keywords / missing_keywords are then plain set algebra between resume and JD.
+import os
+import re
+import json
+
+# A leading dot is kept on a word of its own, so ".NET" is ".net" and never the word "net".
+# Case-insensitive, so the original spelling of each token can be checked for context.
+TOKEN_PATTERN = re.compile(r"(?<![a-z0-9+#.])\.?[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|(?<![a-z0-9+#.])\.?[a-z0-9]|[a-z0-9]",
+                           re.IGNORECASE)
+
+# Canonical name -> aliases (matched case-insensitively, on whole tokens).
+# The canonical name itself is also an alias unless it is listed in AMBIGUOUS_NAMES.
+SKILL_LEXICON = {
+    # Languages
+    "Python": ["python3"],
+    "Java": [],
+    "JavaScript": ["js", "java script", "ecmascript", "es6"],
+    "TypeScript": [],
+    "C++": ["cpp", "c plus plus"],
+    "C#": ["csharp", "c sharp"],
+    "Go": ["golang", "go programming", "go language"],
+    "Rust": [],
+    "Ruby": [],
+    "PHP": [],
+    "Kotlin": [],
+    "Swift": ["swiftui"],
+    "Scala": [],
+    "SQL": ["structured query language"],
+    "Bash": ["shell scripting", "shell script"],
+    "HTML": ["html5"],
+    "CSS": ["css3"],
+    "MATLAB": [],
+    # Frontend
+    "React": ["react.js", "reactjs"],
+    "React Native": [],
+    "Angular": ["angular.js", "angularjs"],
+    "Vue.js": ["vue", "vuejs"],
+    "Next.js": ["nextjs"],
+    "Redux": [],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "Bootstrap": [],
+    "jQuery": [],
+    # Backend
+    "Node.js": ["nodejs", "node js"],
+    "Express.js": ["expressjs", "express js"],
+    "Django": [],
+    "Flask": [],
+    "FastAPI": [],
+    "Spring Boot": ["springboot", "spring framework"],
+    "Ruby on Rails": ["ror"],
+    ".NET": ["dotnet", "dot net", "asp.net", ".net core", "asp.net core"],
+    "GraphQL": [],
+    "REST APIs": ["restful", "rest api", "rest apis", "restful api", "restful apis"],
+    "Microservices": ["microservice", "micro services"],
+    # Data stores
+    "PostgreSQL": ["postgres", "postgresql", "psql"],
+    "MySQL": [],
+    "MongoDB": ["mongo"],
+    "Redis": [],
+    "Elasticsearch": ["elastic search", "elk stack"],
+    "DynamoDB": [],
+    "Cassandra": [],
+    "SQLite": [],
+    "Oracle Database": ["oracle db", "oracle sql"],
+    "Snowflake": [],
+    "BigQuery": ["big query"],
+    # Cloud / DevOps
+    "AWS": ["amazon web services"],
+    "Azure": ["microsoft azure"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Firebase": [],
+    "Docker": ["containerization"],
+    "Kubernetes": ["k8s"],
+    "Terraform": [],
+    "Ansible": [],
+    "Jenkins": [],
+    "GitHub Actions": [],
+    "CI/CD": ["ci cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "Linux": ["unix"],
+    "Git": ["github", "gitlab", "version control"],
+    "Kafka": ["apache kafka"],
+    "RabbitMQ": [],
+    "Nginx": [],
+    # Data / ML
+    "Machine Learning": [],
+    "Deep Learning": [],
+    "Artificial Intelligence": [],
+    "Natural Language Processing": ["nlp"],
+    "Computer Vision": [],
+    "Large Language Models": ["llm", "llms"],
+    "TensorFlow": [],
+    "PyTorch": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "Pandas": [],
+    "NumPy": [],
+    "Spark": ["apache spark", "pyspark", "spark sql", "spark streaming"],
+    "Hadoop": [],
+    "Airflow": ["apache airflow"],
+    "Data Analysis": ["data analytics"],
+    "Data Visualization": ["data viz"],
+    "ETL": ["elt", "data pipelines", "data pipeline"],
+    "Statistics": ["statistical analysis"],
+    "Tableau": [],
+    "Power BI": ["powerbi"],
+    "Excel": ["microsoft excel", "ms excel", "excel vba"],
+    "Jupyter": ["jupyter notebook", "jupyter notebooks"],
+    # Design
+    "Figma": [],
+    "Sketch": [],
+    "Adobe XD": [],
+    "Photoshop": ["adobe photoshop"],
+    "Illustrator": ["adobe illustrator"],
+    "UI Design": ["user interface design"],
+    "UX Design": ["user experience", "user experience design"],
+    "Wireframing": ["wireframes"],
+    "Prototyping": ["prototypes"],
+    # Testing / practices
+    "Unit Testing": ["unit tests"],
+    "Jest": [],
+    "Pytest": [],
+    "Selenium": [],
+    "Cypress": [],
+    "Test-Driven Development": ["tdd"],
+    "Agile": ["agile methodologies", "agile methodology", "agile development"],
+    "Scrum": [],
+    "Jira": [],
+    "System Design": [],
+    "Data Structures": [],
+    "Algorithms": [],
+    "Object-Oriented Programming": ["oop", "object oriented programming"],
+    "Security": ["cybersecurity", "cyber security", "application security", "information security",
+                 "network security"],
+    # Business / soft skills
+    "Project Management": [],
+    "Product Management": [],
+    "Stakeholder Management": [],
+    "Communication": ["communication skills"],
+    "Leadership": ["team leadership"],
+    "Mentoring": ["mentorship"],
+    "Problem Solving": ["problem-solving"],
+    "SEO": ["search engine optimization"],
+    "Salesforce": [],
+    "Google Analytics": [],
+}
+
+# Names that are ordinary English words ("go live", "excel at", "a swift pace", "security
+# clearance") match through their aliases, and as the bare word only in a technical context:
+# capitalized, and next to a list separator ("Go, Rust"), another skill ("Python and Go") or a
+# word from AMBIGUOUS_CONTEXT ("Excel spreadsheets"). Aliases themselves are never everyday words.
+AMBIGUOUS_NAMES = frozenset({
+    "Go", "Excel", "Sketch", "Swift", "Spark", "Rust", "Security", "Statistics", "Jest", "Agile", "Bootstrap",
+    "Snowflake",
+})
+# Acronyms that are only skills when written in capitals ("AI", not "ai")
+ACRONYM_ALIASES = {"ai": "Artificial Intelligence", "ml": "Machine Learning", "ux": "UX Design"}
+# Words next to an ambiguous name that make it a skill
+AMBIGUOUS_CONTEXT = frozenset({
+    "developer", "developers", "engineer", "engineers", "programming", "language", "framework", "library",
+    "spreadsheet", "spreadsheets", "formulas", "macros", "pivot", "methodology", "methodologies", "scrum",
+    "tests", "testing", "clusters", "jobs", "warehouse", "cluster",
+})
+LIST_SEPARATORS_BEFORE = frozenset(",/|;(&:")
+LIST_SEPARATORS_AFTER = frozenset(",/|;)&")
+LIST_CONJUNCTIONS = frozenset({"and", "or", "&"})
+
+SKILL_LEXICON_PATH = os.getenv("SKILL_LEXICON_PATH")
+
+_END = "$canonical"
+_GATED = "$gated"  # (canonical, "word" or "acronym"): only a skill in a technical context
+
+
+def normalize_tokens(text):
+    return [token.lower() for token in TOKEN_PATTERN.findall(text or "")]
+
+
+class SkillMatcher:
+    """Token trie over every alias; scan() reports canonical skills by first occurrence."""
+
+    def __init__(self, lexicon, ambiguous_names=AMBIGUOUS_NAMES, acronym_aliases=None):
+        self.lexicon = lexicon
+        self.root = {}
+        for canonical, aliases in lexicon.items():
+            for alias in aliases:
+                self.add(alias, canonical)
+            if canonical in ambiguous_names:
+                self.add(canonical, canonical, gated="word")
+            else:
+                self.add(canonical, canonical)
+        for alias, canonical in (ACRONYM_ALIASES if acronym_aliases is None else acronym_aliases).items():
+            if canonical in lexicon:
+                self.add(alias, canonical, gated="acronym")
+
+    def add(self, alias, canonical, gated=None):
+        tokens = normalize_tokens(alias)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if gated:
+            node[_GATED] = (canonical, gated)
+        else:
+            node[_END] = canonical
+
+    def _is_skill_word(self, text, span):
+        node = self.root.get(text[span[0]:span[1]].lower(), {})
+        return _END in node or (_GATED in node and text[span[0]].isupper())
+
+    def _in_context(self, text, spans, i, kind):
+        """Whether the everyday word at spans[i] is used as a skill name here."""
+        start, end = spans[i]
+        word = text[start:end]
+        if kind == "acronym":
+            return word.isupper()
+        if not word[0].isupper():
+            return False
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", end)
+        before = text[line_start:start].rstrip()
+        after = text[end:line_end if line_end >= 0 else len(text)].lstrip()
+        if (before and before[-1] in LIST_SEPARATORS_BEFORE) or (after[:1] in LIST_SEPARATORS_AFTER) or \
+                (not after and before[-1:] in LIST_SEPARATORS_BEFORE):
+            return True
+        for step in (-1, 1):
+            j = i + step
+            if 0 <= j < len(spans) and text[spans[j][0]:spans[j][1]].lower() in LIST_CONJUNCTIONS:
+                j += step
+            if 0 <= j < len(spans) and (self._is_skill_word(text, spans[j]) or
+                                        (step == 1 and j == i + 1 and
+                                         text[spans[j][0]:spans[j][1]].lower() in AMBIGUOUS_CONTEXT)):
+                return True
+        return False
+
+    def scan(self, text):
+        text = text or ""
+        spans = [match.span() for match in TOKEN_PATTERN.finditer(text)]
+        tokens = [text[start:end].lower() for start, end in spans]
+        found = {}  # dicts keep insertion order, i.e. first occurrence
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            match, match_end = None, i
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if _END in node:
+                    match, match_end = node[_END], j
+                elif _GATED in node and j == i + 1 and self._in_context(text, spans, i, node[_GATED][1]):
+                    match, match_end = node[_GATED][0], j
+            if match is not None:
+                found.setdefault(match, None)
+                i = match_end
+            else:
+                i += 1
+        return list(found)
+
+
+def _load_lexicon():
+    lexicon = dict(SKILL_LEXICON)
+    if SKILL_LEXICON_PATH:
+        try:
+            with open(SKILL_LEXICON_PATH, "r", encoding="utf-8") as f:
+                for canonical, aliases in json.load(f).items():
+                    lexicon[canonical] = list(lexicon.get(canonical, [])) + list(aliases)
+        except (OSError, ValueError) as e:
+            print(f"Could not load SKILL_LEXICON_PATH ({e}). Using the built-in lexicon.")
+    return lexicon
+
+
+skill_matcher = SkillMatcher(_load_lexicon())
+
+
+def extract_keywords(text):
+    """Canonical skill names found in text, in order of first appearance."""
+    return skill_matcher.scan(text)
+
+
+def compare_keywords(resume_text, jd_text):
+    """JD skills split into those the resume has and those it lacks (both in JD order)."""
+    resume_skills = set(extract_keywords(resume_text))
+    jd_skills = extract_keywords(jd_text)
+    return {
+        "matching_keywords": [skill for skill in jd_skills if skill in resume_skills],
+        "missing_keywords": [skill for skill in jd_skills if skill not in resume_skills],
+    }
@@ -0,0 +1,269 @@
+# llm_cache.py
+# Content-addressed cache for LLM responses.
+# A response is keyed by a SHA-256 of (model, system prompt, user prompt, sampling params),
+# so re-running the same resume/JD pair never goes back to the provider.
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_llm_cache"))
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "256"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False")
+# An over-full disk tier is trimmed to this fraction of max_bytes, so the next few writes
+# do not each trigger another directory scan
+EVICT_TO_FRACTION = 0.9
+
+
+def make_cache_key(model, system_prompt, user_prompt, **params):
+    """Stable hex digest for one completion request."""
+    payload = json.dumps(
+        {"model": model, "system": system_prompt, "user": user_prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryLRU:
+    """Small in-process LRU tier."""
+
+    def __init__(self, max_items=LLM_CACHE_MEMORY_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskTier:
+    """One JSON file per key, expired by TTL and evicted least-recently-used under a byte cap.
+
+    A file's mtime is its creation time (the entry's "created"), which both get() and evict()
+    expire by; reads set its atime, the LRU clock. The total size is counted once at startup and
+    then kept up to date on every write and delete, so the directory is only scanned when a write
+    takes it over max_bytes (the scan also re-syncs the total with entries written by other
+    processes).
+    """
+
+    def __init__(self, directory, ttl_seconds=LLM_CACHE_TTL_SECONDS, max_bytes=LLM_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._total_bytes = self.size_bytes()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl_seconds and time.time() - entry.get("created", 0) > self.ttl_seconds:
+            self._delete(path)
+            return None
+        try:
+            os.utime(path, (time.time(), entry.get("created", 0)))
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"created": time.time(), "value": value}
+        # Write to a temp file first so concurrent readers never see a half-written entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            new_size = os.path.getsize(tmp_path)
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            os.utime(path, (entry["created"], entry["created"]))
+        except OSError:
+            self._remove(tmp_path)
+            return
+        with self._lock:
+            self._total_bytes += new_size - old_size
+            over = self.max_bytes and self._total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                # (last used, created, size, path)
+                entries.append((max(st.st_atime, st.st_mtime), st.st_mtime, st.st_size, path))
+        return entries
+
+    def size_bytes(self):
+        return sum(size for _used, _created, size, _path in self._entries())
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones until under EVICT_TO_FRACTION
+        of max_bytes."""
+        with self._lock:
+            entries = self._entries()
+            now = time.time()
+            total = 0
+            live = []
+            for used, created, size, path in entries:
+                if self.ttl_seconds and now - created > self.ttl_seconds:
+                    self._remove(path)
+                else:
+                    live.append((used, size, path))
+                    total += size
+            if self.max_bytes and total > self.max_bytes:
+                target = self.max_bytes * EVICT_TO_FRACTION
+                for used, size, path in sorted(live):
+                    self._remove(path)
+                    total -= size
+                    if total <= target:
+                        break
+            self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for _used, _created, _size, path in self._entries():
+                self._remove(path)
+            self._total_bytes = 0
+
+    def _delete(self, path):
+        """Remove one entry and take its size off the running total."""
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class LLMCache:
+    """Memory LRU in front of a disk tier, with hit/miss counters."""
+
+    def __init__(self, directory=LLM_CACHE_DIR, memory_items=LLM_CACHE_MEMORY_ITEMS,
+                 ttl_seconds=LLM_CACHE_TTL_SECONDS, max_bytes=LLM_CACHE_MAX_BYTES, enabled=LLM_CACHE_ENABLED):
+        self.enabled = enabled
+        self.memory = MemoryLRU(memory_items)
+        self.disk = None
+        if enabled and directory:
+            try:
+                self.disk = DiskTier(directory, ttl_seconds=ttl_seconds, max_bytes=max_bytes)
+            except OSError as e:
+                print(f"LLM disk cache disabled ({e}). Using memory only.")
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "bypassed": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key, value):
+        if not self.enabled or value is None:
+            return
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("stores")
+
+    def record_bypass(self):
+        self._count("bypassed")
+
+    def get_or_compute(self, key, compute, use_cache=True, should_store=None):
+        """Return the cached value for key, or call compute() and store its result.
+
+        use_cache=False skips both the lookup and the store for this call.
+        should_store(value) can veto caching of a result (e.g. error payloads).
+        """
+        if not use_cache or not self.enabled:
+            self.record_bypass()
+            return compute()
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if should_store is None or should_store(value):
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["memory_items"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+llm_cache = LLMCache()
@@ -1,81 +1,144 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
-import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+import json
+import time
 import os
 
 # *** FIX 1: Changed 'process_resume_file' to 'process_resume_text' ***
 from utils import process_resume_text, analyze_match, generate_cover_letter, critique_resume 
-import pytesseract
-from pdf2image import convert_from_bytes
-import pdfplumber
-import docx
-import cv2
-import numpy as np
+from utils import stream_cover_letter, stream_match, PARSE_MODES, llm_router, llm_scheduler
+from llm_cache import llm_cache
+from extraction_cache import extraction_cache
+from extraction import extract_file_text, extraction_path, UnsupportedFileType, DocumentTooLarge
+from uploads import SpooledUpload, UPLOAD_MAX_BYTES, too_large_message
+from document_store import document_store
+from scheduler import context_with_priority, BATCH
+from job_queue import job_queue, async_requested
+from metrics import begin_request, end_request, timed_stage, set_extraction_path, render_metrics, PROMETHEUS_CONTENT_TYPE
+from metrics import begin_request_memory, end_request_memory, request_trace_summary
+from profiling import (
+    request_id_from, should_profile, start_profile, stop_profile, save_profile, profile_report,
+    is_slow, log_slow_request, PROFILE_HEADER, REQUEST_ID_HEADER,
+)
 
-# NOTE: Ensure you have Tesseract and Poppler installed and paths are correct.
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-POPPLER_PATH = r'D:\Projects\Release-25.07.0-0\poppler-25.07.0\Library\bin'
+# Batch matching: how many pairs get the full LLM treatment, and how many LLM calls run at once
+BATCH_DEFAULT_TOP_K = 5
+BATCH_MAX_TOP_K = 50
+BATCH_MAX_PAIRS = 100000
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+# How many pre-ranked pairs are echoed back in the first streamed line
+BATCH_PRERANK_PREVIEW = 100
+# Posting search: results per query, and how many of the top results may get a full analyze_match
+POSTINGS_DEFAULT_TOP_N = 10
+POSTINGS_MAX_TOP_N = 100
+POSTINGS_DEFAULT_ANALYZE_TOP = 3
+POSTINGS_MAX_ANALYZE_TOP = 10
+
+ANALYZE_TASKS = ("parse", "critique", "match")
+
+class SpooledRequest(Request):
+    # Uploads are kept in memory only up to UPLOAD_SPOOL_BYTES, then moved to a temp file on disk
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledUpload()
 
 app = Flask(__name__)
+app.request_class = SpooledRequest
+# Larger request bodies are refused with 413 before any of the body is read
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES
 CORS(app, resources={r"/api/*": {"origins": "*"}, r"/*": {"origins": "*"}})
 
 @app.route("/")
 def home():
     return jsonify({"message": "✅ Local AI server running successfully."})
 
-def preprocess_image_for_ocr(image):
-    open_cv_image = np.array(image) 
-    gray = cv2.cvtColor(open_cv_image, cv2.COLOR_BGR2GRAY)
-    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-    thresh = cv2.medianBlur(thresh, 3)
-    return thresh
+def metrics_route():
+    # The URL rule, not the path, so /api/documents/<document_id> is one label value
+    return request.url_rule.rule if request.url_rule else "unmatched"
 
-# ROBUST PDF EXTRACTION
-def extract_text_from_pdf(file_stream):
-    text = ""
-    try:
-        file_stream.seek(0)
-        with pdfplumber.open(file_stream) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        
-        if text and len(text.strip()) > 20:
-            print("--- Extracted text with pdfplumber (fast mode) ---")
-            return text
-    except Exception as e:
-        print(f"pdfplumber failed: {e}. Trying OCR.")
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return jsonify({"error": too_large_message(UPLOAD_MAX_BYTES)}), 413
 
-    print("--- pdfplumber returned no text. Attempting OCR (slower) ---")
-    try:
-        file_stream.seek(0)
-        images = convert_from_bytes(file_stream.read(), poppler_path=POPPLER_PATH, dpi=300)
-        ocr_text = ""
-        for image in images:
-            cleaned_image = preprocess_image_for_ocr(image)
-            ocr_text += pytesseract.image_to_string(cleaned_image, config='--psm 6')
-        
-        if ocr_text and len(ocr_text.strip()) > 20:
-            print("--- Extracted text with Tesseract OCR (Preprocessed) ---")
-            return ocr_text
-        else:
-            print("--- OCR also returned no text ---")
-            return None
-    except Exception as ocr_error:
-        print(f"--- Tesseract OCR error: {ocr_error} ---")
-        return None
+@app.before_request
+def start_request_metrics():
+    g.metrics_start = begin_request(metrics_route())
+    g.memory_token = begin_request_memory()
+    g.request_id = request_id_from(request.headers.get(REQUEST_ID_HEADER))
+    if should_profile(request.headers.get(PROFILE_HEADER)):
+        g.profiler = start_profile()  # None while another request is being profiled
+    if request.mimetype == "multipart/form-data":
+        # Parse the upload here so reading it shows up as its own stage
+        with timed_stage("upload_read"):
+            request.files
+
+@app.after_request
+def record_request_metrics(response):
+    # Streaming responses are measured up to the first byte
+    if "metrics_start" in g:
+        profile_path = None
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profile_id, profile_path = save_profile(profiler, g.request_id)
+            response.headers["X-Profile-ID"] = profile_id
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        seconds = end_request(metrics_route(), request.method, response.status_code, g.metrics_start)
+        memory = end_request_memory(metrics_route(), g.pop("memory_token", None))
+        if memory is not None:
+            response.headers["X-Peak-RSS-MB"] = f"{memory['rss_peak_bytes'] / (1024 * 1024):.1f}"
+            response.headers["X-RSS-Growth-MB"] = f"{(memory['rss_peak_bytes'] - memory['rss_start_bytes']) / (1024 * 1024):.1f}"
+        if is_slow(seconds):
+            log_slow_request({
+                "request_id": g.request_id, "route": metrics_route(), "method": request.method,
+                "status": response.status_code, "seconds": round(seconds, 4), "input_bytes": request.content_length,
+                **request_trace_summary(),
+                "peak_rss_mb": round(memory["rss_peak_bytes"] / (1024 * 1024), 1) if memory else None,
+                "profile": profile_path,
+            })
+    return response
+
+@app.teardown_request
+def stop_stray_profiler(exc):
+    # after_request is skipped when a handler raises an unhandled error; never leave this thread profiled
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        stop_profile(profiler)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.route("/api/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    # Top functions by cumulative time; the full .prof file is under PROFILE_DIR
+    report = profile_report(profile_id, sort=request.args.get("sort", "cumulative"))
+    if report is None:
+        return jsonify({"error": "No profile with this ID"}), 404
+    return Response(report, content_type="text/plain; charset=utf-8")
 
-def extract_text_from_docx(file_stream):
+@app.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"llm": llm_cache.stats(), "extraction": extraction_cache.stats(), "providers": llm_router.stats(),
+                    "scheduler": llm_scheduler.stats(), "jobs": job_queue.stats()})
+
+def caching_enabled():
+    # Clients can force fresh extraction and LLM calls with "Cache-Control: no-cache"
+    return "no-cache" not in request.headers.get("Cache-Control", "").lower()
+
+def wants_job():
+    # Background job mode is opt-in; requests without it keep the synchronous path
+    return async_requested(request.form.get("async"), request.headers.get("Prefer"))
+
+def submit_job(kind, uploaded_file, params):
+    """Queue a background job for the upload: 202 with its status URL, or 400 for a non-local callback_url."""
     try:
-        doc = docx.Document(file_stream)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
-    except Exception as e:
-        print(f"Error reading DOCX: {e}")
-        return None
+        job = job_queue.submit(kind, uploaded_file.filename, uploaded_file.stream, params,
+                               callback_url=request.form.get("callback_url"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(job), 202, {"Location": job["status_url"]}
 
 @app.route("/aiResumeParser", methods=["POST"])
 def ai_resume_parser():
@@ -85,27 +148,30 @@ def ai_resume_parser():
 
         uploaded_file = request.files["file"]
         model_choice = request.form.get("model_choice", "Llama 3.1")
+        parse_mode = request.form.get("parse_mode", "auto")
+        if parse_mode not in PARSE_MODES:
+            return jsonify({"error": f"Unknown parse_mode. Use one of: {', '.join(PARSE_MODES)}"}), 400
+        if wants_job():
+            return submit_job("parse", uploaded_file, {"model_choice": model_choice, "parse_mode": parse_mode,
+                                                       "use_cache": caching_enabled()})
         original_filename = uploaded_file.filename
         
-        raw_text = ""
-        if original_filename.endswith('.pdf'):
-            raw_text = extract_text_from_pdf(uploaded_file.stream)
-        elif original_filename.endswith('.docx'):
-            raw_text = extract_text_from_docx(uploaded_file.stream)
-        elif original_filename.endswith('.txt'):
-            uploaded_file.stream.seek(0)
-            raw_text = uploaded_file.stream.read().decode('utf-8')
-        else:
+        try:
+            raw_text, extraction = extract_file_text(original_filename, uploaded_file.stream, use_cache=caching_enabled())
+        except UnsupportedFileType:
             return jsonify({"error": "Unsupported file type."}), 400
+        except DocumentTooLarge as e:
+            return jsonify({"error": str(e)}), 413
 
         if raw_text is None or len(raw_text.strip()) < 20:
             return jsonify({"error": "Could not extract any text."}), 400
 
         # *** FIX 2: Changed function call to 'process_resume_text' ***
-        result = process_resume_text(raw_text, model_choice)
+        result = process_resume_text(raw_text, model_choice, use_cache=caching_enabled(), mode=parse_mode)
 
         if "resumeData" in result and result["resumeData"].get("fullName"):
-            return jsonify(result)
+            # Copy rather than mutate: the result may be a shared cache entry
+            return jsonify({**result, "extraction": extraction})
         else:
             print("--- AI failed to parse, returning error ---")
             return jsonify({"error": "The AI could not understand this resume. It may be too corrupted or unreadable."}), 400
@@ -122,11 +188,200 @@ def ai_job_matcher():
         jd_text = data.get("job_description") or data.get("jd_text", "")
         if not resume_text or not jd_text:
             return jsonify({"error": "Missing resume or job description"}), 400
-        result = analyze_match(resume_text, jd_text)
+        result = analyze_match(resume_text, jd_text, use_cache=caching_enabled())
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/aiJobMatcherStream", methods=["POST"])
+def ai_job_matcher_stream():
+    """Server-sent events: one `data: {"field": ..., "value": ...}` per result field as soon as it is
+    known (keywords first, then match_score, summary, ...), then an `event: done` with the full result."""
+    try:
+        data = request.get_json()
+        resume_text = data.get("resume") or data.get("resume_text", "")
+        jd_text = data.get("job_description") or data.get("jd_text", "")
+        if not resume_text or not jd_text:
+            return jsonify({"error": "Missing resume or job description"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_cache = caching_enabled()
+
+    def generate():
+        for event in stream_match(resume_text, jd_text, use_cache=use_cache):
+            if event[0] == "field":
+                yield f"data: {json.dumps({'field': event[1], 'value': event[2]})}\n\n"
+            else:
+                yield f"event: done\ndata: {json.dumps(event[1])}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _batch_items(data, list_key, single_keys, prefix):
+    """Accept a list of strings or {"id", "text"} objects, or a single text under the old keys."""
+    items = data.get(list_key)
+    if items is None:
+        single = next((data.get(k) for k in single_keys if data.get(k)), None)
+        items = [single] if single else []
+    normalized = []
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            normalized.append((str(item.get("id", f"{prefix}{i}")), item.get("text", "")))
+        else:
+            normalized.append((f"{prefix}{i}", item or ""))
+    return normalized
+
+@app.route("/aiJobMatcherBatch", methods=["POST"])
+def ai_job_matcher_batch():
+    """Pre-rank every resume/JD pair locally, then run analyze_match on the top_k pairs only.
+
+    Streams newline-delimited JSON: one "prerank" line, one "match" line per LLM result as
+    it finishes, then a "done" line.
+    """
+    try:
+        data = request.get_json()
+        resumes = _batch_items(data, "resumes", ("resume", "resume_text"), "resume")
+        jds = _batch_items(data, "job_descriptions", ("job_description", "jd_text"), "jd")
+        method = data.get("method", "cosine")
+        top_k = min(int(data.get("top_k", BATCH_DEFAULT_TOP_K)), BATCH_MAX_TOP_K)
+        if not resumes or not jds:
+            return jsonify({"error": "Missing resumes or job descriptions"}), 400
+        if len(resumes) * len(jds) > BATCH_MAX_PAIRS:
+            return jsonify({"error": f"Too many pairs. The limit is {BATCH_MAX_PAIRS}."}), 400
+        # Imported here so NumPy is only loaded by the batch endpoint
+        from prerank import rank_pairs, SCORERS
+        if method not in SCORERS:
+            return jsonify({"error": f"Unknown method '{method}'. Use one of: {', '.join(SCORERS)}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_cache = caching_enabled()
+
+    def generate():
+        start = time.perf_counter()
+        ranked = rank_pairs([text for _id, text in resumes], [text for _id, text in jds],
+                            method=method, limit=max(top_k, BATCH_PRERANK_PREVIEW))
+        yield json.dumps({
+            "type": "prerank",
+            "method": method,
+            "pairs_scored": len(resumes) * len(jds),
+            "seconds": round(time.perf_counter() - start, 4),
+            "ranking": [{"rank": rank, "resume_id": resumes[r][0], "jd_id": jds[j][0], "score": score}
+                        for rank, (r, j, score) in enumerate(ranked, start=1)],
+        }) + "\n"
+
+        with ThreadPoolExecutor(max_workers=BATCH_LLM_CONCURRENCY) as executor:
+            futures = {}
+            for rank, (r, j, score) in enumerate(ranked[:top_k], start=1):
+                # Batch priority: interactive requests are admitted to the LLM ahead of these
+                future = executor.submit(context_with_priority(BATCH).run, analyze_match, resumes[r][1], jds[j][1],
+                                         use_cache)
+                futures[future] = (rank, r, j, score)
+            for future in as_completed(futures):
+                rank, r, j, score = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"error": str(e)}
+                yield json.dumps({"type": "match", "rank": rank, "resume_id": resumes[r][0],
+                                  "jd_id": jds[j][0], "prerank_score": score, "result": result}) + "\n"
+
+        yield json.dumps({"type": "done", "llm_calls": min(top_k, len(ranked)),
+                          "seconds": round(time.perf_counter() - start, 4)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+# --- Job posting index ---
+# jd_index is imported inside the routes so NumPy is only loaded once postings are used.
+@app.route("/api/postings", methods=["POST"])
+def add_postings():
+    """Index job postings: {"postings": [{"id"?, "title", "company", "location", "url", "text"}, ...]}."""
+    from jd_index import jd_index
+    try:
+        data = request.get_json()
+        postings = data.get("postings")
+        if postings is None and (data.get("text") or data.get("description")):
+            postings = [data]
+        if not postings or not all(isinstance(p, dict) for p in postings):
+            return jsonify({"error": "Missing postings"}), 400
+        start = time.perf_counter()
+        ids = jd_index.add(postings)
+        return jsonify({"ids": ids, "seconds": round(time.perf_counter() - start, 4), **jd_index.stats()}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in /api/postings: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/postings", methods=["GET"])
+def postings_stats():
+    from jd_index import jd_index
+    return jsonify(jd_index.stats())
+
+@app.route("/api/postings/<posting_id>", methods=["GET"])
+def get_posting(posting_id):
+    from jd_index import jd_index
+    posting = jd_index.get(posting_id)
+    if posting is None:
+        return jsonify({"error": "Unknown posting id"}), 404
+    return jsonify(posting)
+
+@app.route("/api/postings/<posting_id>", methods=["DELETE"])
+def delete_posting(posting_id):
+    from jd_index import jd_index
+    if not jd_index.remove(posting_id):
+        return jsonify({"error": "Unknown posting id"}), 404
+    return jsonify({"deleted": posting_id})
+
+@app.route("/api/postings/search", methods=["POST"])
+def search_postings():
+    """Rank the indexed postings for one resume.
+
+    The resume is raw text ("resume" / "resume_text"), a parsed "resumeData" object, or a stored
+    "document_id". Optional: "top_n", "skills" (postings must list all of them), and "analyze":
+    true to run the full analyze_match on the best "analyze_top" results.
+    """
+    from jd_index import jd_index, resume_data_text
+    try:
+        data = request.get_json()
+        resume_text = data.get("resume") or data.get("resume_text", "")
+        if not resume_text and isinstance(data.get("resumeData"), dict):
+            resume_text = resume_data_text(data["resumeData"])
+        if not resume_text and data.get("document_id"):
+            document = document_store.get(data["document_id"])
+            if document is None:
+                return jsonify({"error": "Unknown or expired document_id"}), 404
+            resume_text = document["text"]
+        if not resume_text.strip():
+            return jsonify({"error": "Missing resume"}), 400
+        top_n = max(1, min(int(data.get("top_n", POSTINGS_DEFAULT_TOP_N)), POSTINGS_MAX_TOP_N))
+        analyze_top = min(int(data.get("analyze_top", POSTINGS_DEFAULT_ANALYZE_TOP)), POSTINGS_MAX_ANALYZE_TOP)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        start = time.perf_counter()
+        results = jd_index.search(resume_text, top_n=top_n, required_skills=data.get("skills"))
+        response = {"results": results, "search_seconds": round(time.perf_counter() - start, 4),
+                    "postings_searched": jd_index.stats()["postings"]}
+        if data.get("analyze") and results and analyze_top > 0:
+            use_cache = caching_enabled()
+            top = results[:analyze_top]
+            with ThreadPoolExecutor(max_workers=min(BATCH_LLM_CONCURRENCY, len(top))) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, analyze_match, resume_text,
+                                           jd_index.get(result["id"])["text"], use_cache) for result in top]
+                for result, future in zip(top, futures):
+                    try:
+                        result["analysis"] = future.result()
+                    except Exception as e:
+                        result["analysis"] = {"error": str(e)}
+        response["seconds"] = round(time.perf_counter() - start, 4)
+        return jsonify(response)
+    except Exception as e:
+        print(f"Error in /api/postings/search: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/aiCoverLetter", methods=["POST"])
 def ai_cover_letter():
     try:
@@ -136,11 +391,35 @@ def ai_cover_letter():
         user_name = data.get("user_name", "the candidate")
         if not resume_text or not jd_text:
             return jsonify({"error": "Missing resume or job description"}), 400
-        result = generate_cover_letter(resume_text, jd_text, user_name)
+        result = generate_cover_letter(resume_text, jd_text, user_name, use_cache=caching_enabled())
         return jsonify({"cover_letter": result})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/aiCoverLetterStream", methods=["POST"])
+def ai_cover_letter_stream():
+    """Server-sent events: one `data: {"delta": ...}` per chunk, then an `event: done` with timings."""
+    try:
+        data = request.get_json()
+        resume_text = data.get("resume") or data.get("resume_text", "")
+        jd_text = data.get("job_description") or data.get("jd_text", "")
+        user_name = data.get("user_name", "the candidate")
+        if not resume_text or not jd_text:
+            return jsonify({"error": "Missing resume or job description"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_cache = caching_enabled()
+
+    def generate():
+        metrics = {}
+        for delta in stream_cover_letter(resume_text, jd_text, user_name, use_cache=use_cache, metrics=metrics):
+            yield f"data: {json.dumps({'delta': delta})}\n\n"
+        yield f"event: done\ndata: {json.dumps(metrics)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route("/api/extract-text", methods=["POST"])
 def extract_resume_text():
     if 'resumeFile' not in request.files:
@@ -149,18 +428,16 @@ def extract_resume_text():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
 
-    text = ""
     filename = file.filename
     try:
-        if filename.endswith('.pdf'):
-            text = extract_text_from_pdf(file.stream)
-        elif filename.endswith('.docx'):
-            text = extract_text_from_docx(file.stream)
-        else:
-            return jsonify({"error": "Unsupported file type. Please upload a .pdf or .docx"}), 400
+        text, extraction = extract_file_text(filename, file.stream, allowed=('.pdf', '.docx'), use_cache=caching_enabled())
         if text is None or len(text.strip()) == 0:
             return jsonify({"error": "Could not extract any text from this file."}), 500
-        return jsonify({"text": text})
+        return jsonify({"text": text, "extraction": extraction})
+    except UnsupportedFileType:
+        return jsonify({"error": "Unsupported file type. Please upload a .pdf or .docx"}), 400
+    except DocumentTooLarge as e:
+        return jsonify({"error": str(e)}), 413
     except Exception as e:
         print(f"Server error: {e}")
         return jsonify({"error": "An internal error occurred"}), 500
@@ -172,28 +449,117 @@ def ai_resume_critique():
             return jsonify({"error": "No file uploaded"}), 400
 
         uploaded_file = request.files["file"]
+        if wants_job():
+            return submit_job("critique", uploaded_file, {"use_cache": caching_enabled()})
         original_filename = uploaded_file.filename
 
-        raw_text = ""
-        if original_filename.endswith('.pdf'):
-            raw_text = extract_text_from_pdf(uploaded_file.stream)
-        elif original_filename.endswith('.docx'):
-            raw_text = extract_text_from_docx(uploaded_file.stream)
-        elif original_filename.endswith('.txt'):
-            uploaded_file.stream.seek(0)
-            raw_text = uploaded_file.stream.read().decode('utf-8')
-        else:
+        try:
+            raw_text, extraction = extract_file_text(original_filename, uploaded_file.stream, use_cache=caching_enabled())
+        except UnsupportedFileType:
             return jsonify({"error": "Unsupported file type."}), 400
+        except DocumentTooLarge as e:
+            return jsonify({"error": str(e)}), 413
 
         if raw_text is None or len(raw_text.strip()) < 20:
             return jsonify({"error": "Could not extract any text."}), 400
 
-        result = critique_resume(raw_text)
-        return jsonify(result)
+        result = critique_resume(raw_text, use_cache=caching_enabled())
+        return jsonify({**result, "extraction": extraction})
 
     except Exception as e:
         print(f"Error in /api/critique-resume: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- Background jobs ---
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job_id"}), 404
+    return jsonify(job)
+
+# --- Document handles: upload once, then fan out ---
+@app.route("/api/documents", methods=["POST"])
+def upload_document():
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "No file uploaded"}), 400
+        uploaded_file = request.files["file"]
+        try:
+            raw_text, extraction = extract_file_text(uploaded_file.filename, uploaded_file.stream,
+                                                     use_cache=caching_enabled())
+        except UnsupportedFileType:
+            return jsonify({"error": "Unsupported file type."}), 400
+        except DocumentTooLarge as e:
+            return jsonify({"error": str(e)}), 413
+        if raw_text is None or len(raw_text.strip()) < 20:
+            return jsonify({"error": "Could not extract any text."}), 400
+
+        document_id = document_store.put(uploaded_file.filename, raw_text, extraction)
+        return jsonify({"document_id": document_id, "filename": uploaded_file.filename,
+                        "characters": len(raw_text), "extraction": extraction}), 201
+    except Exception as e:
+        print(f"Error in /api/documents: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/documents/<document_id>", methods=["GET"])
+def get_document(document_id):
+    document = document_store.get(document_id)
+    if document is None:
+        return jsonify({"error": "Unknown or expired document_id"}), 404
+    return jsonify({"document_id": document_id, **document})
+
+@app.route("/api/documents/<document_id>/analyze", methods=["POST"])
+def analyze_document(document_id):
+    """Run parse, critique and (with a job description) match concurrently on one stored document.
+
+    Latency is that of the slowest call rather than the sum of all three.
+    """
+    try:
+        document = document_store.get(document_id)
+        if document is None:
+            return jsonify({"error": "Unknown or expired document_id"}), 404
+        data = request.get_json(silent=True) or {}
+        jd_text = data.get("job_description") or data.get("jd_text", "")
+        model_choice = data.get("model_choice", "Llama 3.1")
+        tasks = data.get("tasks") or [t for t in ANALYZE_TASKS if t != "match" or jd_text]
+        unknown = [t for t in tasks if t not in ANALYZE_TASKS]
+        if unknown:
+            return jsonify({"error": f"Unknown tasks: {', '.join(unknown)}"}), 400
+        if "match" in tasks and not jd_text:
+            return jsonify({"error": "Missing job description for the match task"}), 400
+
+        raw_text = document["text"]
+        set_extraction_path(extraction_path(document["extraction"]) if document.get("extraction") else None)
+        use_cache = caching_enabled()
+        calls = {
+            "parse": lambda: process_resume_text(raw_text, model_choice, use_cache=use_cache),
+            "critique": lambda: critique_resume(raw_text, use_cache=use_cache),
+            "match": lambda: analyze_match(raw_text, jd_text, use_cache=use_cache),
+        }
+
+        def timed(task):
+            start = time.perf_counter()
+            try:
+                result = calls[task]()
+            except Exception as e:
+                result = {"error": str(e)}
+            return result, round(time.perf_counter() - start, 4)
+
+        start = time.perf_counter()
+        response = {"document_id": document_id, "timings": {}}
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {task: executor.submit(contextvars.copy_context().run, timed, task) for task in tasks}
+            for task, future in futures.items():
+                response[task], response["timings"][task] = future.result()
+        response["timings"]["total"] = round(time.perf_counter() - start, 4)
+        return jsonify(response)
+    except Exception as e:
+        print(f"Error in /api/documents/{document_id}/analyze: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
+    # With the reloader only the child process serves requests, so only it resumes background jobs
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start()
     app.run(debug=True, port=5000)
\ No newline at end of file
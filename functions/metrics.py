@@ -0,0 +1,311 @@
+# metrics.py
+# In-process latency histograms and counters, served in Prometheus text format on /metrics.
+# Every pipeline stage (upload read, PDF text layer, pdf2image render, OpenCV preprocess, Tesseract,
+# LLM call, JSON parse) is observed with the current route and extraction path as labels, so
+# a dashboard can show whether OCR or the LLM is behind the p99. Recording is a bisect and a
+# dict update under a lock, cheap enough to leave on in production.
+# Requests also get their peak memory: RssTracker samples the RSS of this process and its OCR
+# workers while any request is in flight.
+# Each request also keeps its own stage totals and facts (page count) in a RequestTrace, for the
+# slow-request log in profiling.py.
+import os
+import time
+import itertools
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond JSON parses up to multi-minute OCR of long scans
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bytes; RSS of the server process tree
+MEMORY_BUCKETS = tuple(mb * 1024 * 1024 for mb in (64, 128, 256, 512, 768, 1024, 1536, 2048, 4096, 8192))
+RSS_SAMPLE_SECONDS = float(os.getenv("REQUEST_RSS_SAMPLE_SECONDS", "0.05"))
+
+STAGES = ("upload_read", "pdf_text", "pdf2image_render", "opencv_preprocess", "tesseract", "llm_call", "json_parse")
+
+# Set per request by the servers; worker threads inherit them via contextvars.copy_context()
+current_route = contextvars.ContextVar("current_route", default="none")
+current_extraction_path = contextvars.ContextVar("current_extraction_path", default="none")
+current_request_trace = contextvars.ContextVar("current_request_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self.values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self.series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.label_names, label_values, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {count}")
+        return lines
+
+
+stage_seconds = Histogram("resume_stage_seconds", "Time spent in one pipeline stage.",
+                          ("stage", "route", "extraction_path"))
+stage_errors = Counter("resume_stage_errors_total", "Pipeline stages that raised.",
+                       ("stage", "route", "extraction_path"))
+request_seconds = Histogram("resume_http_request_seconds", "End-to-end request latency.",
+                            ("route", "method", "status"))
+requests_total = Counter("resume_http_requests_total", "Requests served.", ("route", "method", "status"))
+request_peak_rss = Histogram("resume_http_request_peak_rss_bytes",
+                             "Peak RSS of the server and its OCR workers while the request ran.",
+                             ("route",), buckets=MEMORY_BUCKETS)
+
+REGISTRY = (stage_seconds, stage_errors, request_seconds, requests_total, request_peak_rss)
+
+
+class RequestTrace:
+    """Stage totals and facts about one request.
+
+    Worker threads that copied the request's context add to the same trace, hence the lock.
+    Stages that run concurrently each count in full, so the totals can exceed the request time.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.fields = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def annotate(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+
+    def summary(self):
+        with self._lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1][0])
+            return {**self.fields,
+                    "stages": {stage: {"seconds": round(total, 4), "count": count} for stage, (total, count) in stages}}
+
+
+def observe_stage(stage, seconds, extraction_path=None):
+    """Record a stage timed elsewhere, e.g. inside an OCR worker process."""
+    stage_seconds.observe(seconds, stage, current_route.get(), extraction_path or current_extraction_path.get())
+    trace = current_request_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+
+@contextmanager
+def timed_stage(stage, extraction_path=None):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage, current_route.get(), extraction_path or current_extraction_path.get())
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, extraction_path)
+
+
+def set_extraction_path(path):
+    current_extraction_path.set(path or "none")
+
+
+def annotate_request(**fields):
+    """Attach facts (e.g. pages=3) to the current request's trace; a no-op outside a request."""
+    trace = current_request_trace.get()
+    if trace is not None:
+        trace.annotate(**fields)
+
+
+def request_trace_summary():
+    """Extraction path, annotated fields and stage totals of the current request."""
+    trace = current_request_trace.get()
+    summary = trace.summary() if trace is not None else {"stages": {}}
+    return {"extraction_path": current_extraction_path.get(), **summary}
+
+
+def begin_request(route):
+    """Label everything recorded in this context with `route`. Returns the start time for end_request."""
+    current_route.set(route)
+    current_extraction_path.set("none")
+    current_request_trace.set(RequestTrace())
+    return time.perf_counter()
+
+
+def end_request(route, method, status, started):
+    """Record the request and return its duration in seconds."""
+    status = str(status)
+    seconds = time.perf_counter() - started
+    request_seconds.observe(seconds, route, method, status)
+    requests_total.inc(route, method, status)
+    return seconds
+
+
+# --- Memory ---
+def _proc_rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _proc_children(pid):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children += [int(child) for child in f.read().split()]
+    return children
+
+
+def process_tree_rss_bytes():
+    """RSS of this process plus its children (the OCR pool), or None where it cannot be measured."""
+    try:
+        import psutil
+        process = psutil.Process()
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+    except ImportError:
+        pass
+    try:
+        total, pending = 0, [os.getpid()]
+        while pending:
+            pid = pending.pop()
+            try:
+                total += _proc_rss_bytes(pid)
+                pending += _proc_children(pid)
+            except (FileNotFoundError, ProcessLookupError):
+                continue  # a worker exited between listing and reading
+        return total
+    except (OSError, ValueError):
+        return None
+
+
+class RssTracker:
+    """Peak RSS per request, from one sampler thread that only runs while requests are in flight.
+
+    RSS is process-wide, so concurrent requests see each other's memory: the peak is an upper
+    bound for one request, and exact when requests do not overlap.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        self.interval = interval
+        self._active = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        rss = process_tree_rss_bytes()
+        if rss is None:
+            return None
+        with self._lock:
+            token = next(self._ids)
+            self._active[token] = [rss, rss]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-tracker", daemon=True)
+                self._thread.start()
+            self._wake.set()
+        return token
+
+    def stop(self, token):
+        """{"rss_start_bytes", "rss_peak_bytes"} for a token from start(), or None."""
+        if token is None:
+            return None
+        rss = process_tree_rss_bytes() or 0
+        with self._lock:
+            entry = self._active.pop(token, None)
+        if entry is None:
+            return None
+        return {"rss_start_bytes": entry[0], "rss_peak_bytes": max(entry[1], rss)}
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._active:
+                    self._wake.clear()
+                    continue
+            rss = process_tree_rss_bytes()
+            if rss is not None:
+                with self._lock:
+                    for entry in self._active.values():
+                        entry[1] = max(entry[1], rss)
+            time.sleep(self.interval)
+
+
+rss_tracker = RssTracker()
+
+
+def begin_request_memory():
+    return rss_tracker.start()
+
+
+def end_request_memory(route, token):
+    """Record the request's peak RSS and return it (or None) for response headers."""
+    memory = rss_tracker.stop(token)
+    if memory is not None:
+        request_peak_rss.observe(memory["rss_peak_bytes"], route)
+    return memory
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,294 @@
+# ocr_engine.py
+# Page-streaming OCR for scanned PDFs.
+# Each page is rendered and OCR'd inside a worker process, one page per task, and only a
+# small window of pages is in flight at once, so memory stays flat however long the PDF is.
+# In adaptive mode (the default) a page is first OCR'd in grayscale at a low DPI; only pages,
+# or single lines, whose Tesseract word confidence is below OCR_MIN_CONFIDENCE are re-rendered
+# at OCR_DPI and re-OCR'd with the heavier OpenCV preprocessing.
+# OpenCV, NumPy, pytesseract and pdf2image are imported inside the functions that need them,
+# so importing this module (and every server that imports extraction.py) stays cheap.
+import os
+import time
+import tempfile
+import threading
+import multiprocessing
+import multiprocessing.util
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+# Pages in flight per worker; each holds at most one rendered page image
+OCR_WINDOW_PER_WORKER = int(os.getenv("OCR_WINDOW_PER_WORKER", "2"))
+TESSERACT_CONFIG = "--psm 6"
+# Single text line, used when re-OCR'ing one low-confidence region
+LINE_TESSERACT_CONFIG = "--psm 7"
+
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "1") not in ("0", "false", "False")
+OCR_FIRST_PASS_DPI = int(os.getenv("OCR_FIRST_PASS_DPI", "150"))
+# Mean Tesseract word confidence (0-100) below which a page or line is escalated to OCR_DPI
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "70"))
+# When more than this share of lines is low-confidence, re-OCR the whole page instead of the lines
+OCR_REGION_MAX_FRACTION = float(os.getenv("OCR_REGION_MAX_FRACTION", "0.3"))
+REGION_PADDING_PX = 4
+# Longer PDFs are refused instead of being rendered page by page for minutes
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "40"))
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """Shared worker pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+            if multiprocessing.parent_process() is not None:
+                # In a worker process (job queue, bulk ingest) multiprocessing joins child processes
+                # before atexit runs, so the OCR pool must be shut down first or the worker never exits.
+                # The priority runs this before the pool's own queues are closed (priority 10).
+                multiprocessing.util.Finalize(None, shutdown_ocr_pool, kwargs={"wait": True}, exitpriority=100)
+        return _pool
+
+
+def shutdown_ocr_pool(wait=False):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+            _pool = None
+
+
+def preprocess_image_for_ocr(image):
+    import cv2
+    import numpy as np
+    open_cv_image = np.array(image)
+    gray = open_cv_image if open_cv_image.ndim == 2 else cv2.cvtColor(open_cv_image, cv2.COLOR_BGR2GRAY)
+    thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    thresh = cv2.medianBlur(thresh, 3)
+    return thresh
+
+
+class _StageTimer:
+    """Accumulates seconds per stage; a page can render or run Tesseract more than once."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+
+def render_page(pdf_path, page_number, dpi, poppler_path=None, grayscale=False):
+    from pdf2image import convert_from_path
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                               poppler_path=poppler_path, grayscale=grayscale)
+    return images[0] if images else None
+
+
+def read_lines(image, config=TESSERACT_CONFIG):
+    """Tesseract words grouped into text lines, in reading order.
+
+    Each line is {"key": (block, paragraph, line), "words": [...], "confidences": [...],
+    "box": [left, top, right, bottom]} in pixels of `image`.
+    """
+    import pytesseract
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        confidence = float(data["conf"][i])
+        if confidence < 0 or not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        line = lines.setdefault(key, {"key": key, "words": [], "confidences": [],
+                                      "box": [float("inf"), float("inf"), 0, 0]})
+        line["words"].append(word.strip())
+        line["confidences"].append(confidence)
+        left, top = data["left"][i], data["top"][i]
+        box = line["box"]
+        box[0], box[1] = min(box[0], left), min(box[1], top)
+        box[2], box[3] = max(box[2], left + data["width"][i]), max(box[3], top + data["height"][i])
+    return list(lines.values())
+
+
+def mean_confidence(lines):
+    confidences = [c for line in lines for c in line["confidences"]]
+    return sum(confidences) / len(confidences) if confidences else None
+
+
+def lines_to_text(lines):
+    """One text line per OCR line, with a blank line between paragraphs."""
+    parts = []
+    previous = None
+    for line in lines:
+        if previous is not None and line["key"][:2] != previous:
+            parts.append("")
+        parts.append(" ".join(line["words"]))
+        previous = line["key"][:2]
+    return "\n".join(parts) + "\n" if parts else ""
+
+
+def _ocr_full(pdf_path, page_number, dpi, poppler_path, timer):
+    # The original fixed-quality path: colour render at `dpi`, full preprocessing, one Tesseract pass
+    import pytesseract
+    with timer("pdf2image_render"):
+        image = render_page(pdf_path, page_number, dpi, poppler_path)
+    quality = {"dpi": dpi, "confidence": None, "escalation": "none"}
+    if image is None:
+        return "", quality
+    try:
+        with timer("opencv_preprocess"):
+            cleaned_image = preprocess_image_for_ocr(image)
+        with timer("tesseract"):
+            text = pytesseract.image_to_string(cleaned_image, config=TESSERACT_CONFIG)
+    finally:
+        image.close()
+    return text, quality
+
+
+def _ocr_adaptive(pdf_path, page_number, dpi, poppler_path, timer):
+    first_dpi = min(OCR_FIRST_PASS_DPI, dpi)
+    with timer("pdf2image_render"):
+        image = render_page(pdf_path, page_number, first_dpi, poppler_path, grayscale=True)
+    if image is None:
+        return "", {"dpi": first_dpi, "confidence": None, "escalation": "none"}
+    try:
+        # Tesseract binarizes internally, so a clean grayscale page needs no OpenCV pass
+        with timer("tesseract"):
+            lines = read_lines(image)
+    finally:
+        image.close()
+
+    first_confidence = mean_confidence(lines)
+    quality = {"dpi": first_dpi, "confidence": _round(first_confidence), "first_pass_confidence": _round(first_confidence),
+               "escalation": "none"}
+    low_lines = [line for line in lines if mean_confidence([line]) < OCR_MIN_CONFIDENCE]
+    if dpi <= first_dpi or (first_confidence is not None and first_confidence >= OCR_MIN_CONFIDENCE and not low_lines):
+        return lines_to_text(lines), quality
+
+    with timer("pdf2image_render"):
+        high = render_page(pdf_path, page_number, dpi, poppler_path, grayscale=True)
+    if high is None:
+        return lines_to_text(lines), quality
+    try:
+        if first_confidence is None or len(low_lines) > OCR_REGION_MAX_FRACTION * len(lines):
+            with timer("opencv_preprocess"):
+                cleaned_image = preprocess_image_for_ocr(high)
+            with timer("tesseract"):
+                retry = read_lines(cleaned_image)
+            retry_confidence = mean_confidence(retry)
+            if retry_confidence is not None and (first_confidence is None or retry_confidence > first_confidence):
+                lines = retry
+                quality.update(dpi=dpi, confidence=_round(retry_confidence))
+            quality["escalation"] = "page"
+        else:
+            scale = dpi / first_dpi
+            for line in low_lines:
+                left, top, right, bottom = line["box"]
+                region = high.crop((max(0, int((left - REGION_PADDING_PX) * scale)),
+                                    max(0, int((top - REGION_PADDING_PX) * scale)),
+                                    min(high.width, int((right + REGION_PADDING_PX) * scale)),
+                                    min(high.height, int((bottom + REGION_PADDING_PX) * scale))))
+                with timer("opencv_preprocess"):
+                    cleaned_region = preprocess_image_for_ocr(region)
+                with timer("tesseract"):
+                    retry = read_lines(cleaned_region, LINE_TESSERACT_CONFIG)
+                if retry and mean_confidence(retry) > mean_confidence([line]):
+                    line["words"] = [word for r in retry for word in r["words"]]
+                    line["confidences"] = [c for r in retry for c in r["confidences"]]
+            quality.update(confidence=_round(mean_confidence(lines)), escalation="regions",
+                           regions=len(low_lines), region_dpi=dpi)
+    finally:
+        high.close()
+    return lines_to_text(lines), quality
+
+
+def _round(value):
+    return round(value, 1) if value is not None else None
+
+
+def ocr_page(pdf_path, page_number, dpi=OCR_DPI, poppler_path=None, tesseract_cmd=None, adaptive=OCR_ADAPTIVE):
+    """Render a single 1-based page from disk and OCR it. Runs inside a worker process.
+
+    Returns (text, seconds, stages, quality): seconds covers render + preprocess + Tesseract,
+    stages splits it into pdf2image_render / opencv_preprocess / tesseract seconds, and quality
+    reports the DPI used, the mean word confidence and whether the page or some lines were escalated.
+    """
+    import pytesseract
+    start = time.perf_counter()
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    timer = _StageTimer()
+    if adaptive:
+        text, quality = _ocr_adaptive(pdf_path, page_number, dpi, poppler_path, timer)
+    else:
+        text, quality = _ocr_full(pdf_path, page_number, dpi, poppler_path, timer)
+    return text, time.perf_counter() - start, timer.stages, quality
+
+
+def count_pdf_pages(pdf_path, poppler_path=None):
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"])
+
+
+def ocr_pdf_pages(pdf_path, page_numbers=None, dpi=OCR_DPI, poppler_path=None, tesseract_cmd=None,
+                  max_pages=MAX_PDF_PAGES):
+    """Yield (page_number, text, seconds, stages, quality) in page order, keeping at most a small window of pages in flight.
+
+    Raises DocumentTooLarge before rendering anything if the PDF has more than max_pages pages.
+    """
+    if page_numbers is None:
+        page_count = count_pdf_pages(pdf_path, poppler_path)
+        if max_pages and page_count > max_pages:
+            raise DocumentTooLarge(f"The PDF has {page_count} pages; the limit is {max_pages}.")
+        page_numbers = range(1, page_count + 1)
+    page_numbers = list(page_numbers)
+    pool = get_ocr_pool()
+    window = max(1, OCR_WORKERS * OCR_WINDOW_PER_WORKER)
+    pending = []
+    next_index = 0
+    while next_index < len(page_numbers) or pending:
+        while next_index < len(page_numbers) and len(pending) < window:
+            page_number = page_numbers[next_index]
+            future = pool.submit(ocr_page, pdf_path, page_number, dpi, poppler_path, tesseract_cmd)
+            pending.append((page_number, future))
+            next_index += 1
+        # Always wait on the oldest page so output stays in page order
+        page_number, future = pending.pop(0)
+        yield (page_number, *future.result())
+
+
+def ocr_pdf_stream(file_stream, page_numbers=None, dpi=OCR_DPI, poppler_path=None, tesseract_cmd=None):
+    """OCR an uploaded PDF page by page from disk.
+
+    An upload spooled by uploads.SpooledUpload is rendered in place from its temp file (closed
+    first with to_path(), so poppler can open it on Windows); anything else is copied to a temp
+    file first. Returns a list of (page_number, text, seconds, stages, quality) in page order.
+    """
+    if hasattr(file_stream, "to_path"):
+        return list(ocr_pdf_pages(file_stream.to_path(), page_numbers, dpi, poppler_path, tesseract_cmd))
+    file_stream.seek(0)
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = file_stream.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+        return list(ocr_pdf_pages(pdf_path, page_numbers, dpi, poppler_path, tesseract_cmd))
+    finally:
+        try:
+            os.remove(pdf_path)
+        except OSError:
+            pass
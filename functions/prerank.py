@@ -0,0 +1,124 @@
+# prerank.py
+# Cheap local scoring of resume/JD pairs, used to pick which pairs deserve a full LLM analyze_match.
+# Both scorers are vectorized with NumPy over a vocabulary limited to terms the two sides share.
+import re
+import math
+from collections import Counter
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my no nor not of off on once only or other
+our ours out over own same she should so some such than that the their theirs them then there these they
+this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours job role work team candidate experience years year strong ability skills
+""".split())
+
+
+def tokenize(text):
+    """Lowercase terms, keeping tech tokens like c++, c#, node.js intact."""
+    return [t for t in TOKEN_PATTERN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def _shared_vocab(left_counts, right_counts):
+    left_terms = set()
+    for counts in left_counts:
+        left_terms.update(counts)
+    right_terms = set()
+    for counts in right_counts:
+        right_terms.update(counts)
+    return {term: i for i, term in enumerate(sorted(left_terms & right_terms))}
+
+
+def _idf(all_counts):
+    df = Counter()
+    for counts in all_counts:
+        df.update(counts.keys())
+    n = len(all_counts)
+    return {term: math.log((n + 1) / (freq + 1)) + 1.0 for term, freq in df.items()}
+
+
+def _tf_matrix(counts_list, vocab):
+    matrix = np.zeros((len(counts_list), len(vocab)), dtype=np.float32)
+    for row, counts in enumerate(counts_list):
+        for term, count in counts.items():
+            idx = vocab.get(term)
+            if idx is not None:
+                matrix[row, idx] = count
+    return matrix
+
+
+def cosine_scores(resume_texts, jd_texts):
+    """TF-IDF cosine similarity matrix of shape (len(resumes), len(jds)), values in [0, 1]."""
+    resume_counts = [Counter(tokenize(t)) for t in resume_texts]
+    jd_counts = [Counter(tokenize(t)) for t in jd_texts]
+    vocab = _shared_vocab(resume_counts, jd_counts)
+    if not vocab:
+        return np.zeros((len(resume_texts), len(jd_texts)), dtype=np.float32)
+    idf_by_term = _idf(resume_counts + jd_counts)
+    idf = np.array([idf_by_term[term] for term in vocab], dtype=np.float32)
+
+    def norms(counts_list):
+        # Norms use every term of the document, not just the shared vocabulary
+        return np.array([math.sqrt(sum((c * idf_by_term[t]) ** 2 for t, c in counts.items())) or 1.0
+                         for counts in counts_list], dtype=np.float32)
+
+    resume_matrix = _tf_matrix(resume_counts, vocab) * idf
+    jd_matrix = _tf_matrix(jd_counts, vocab) * idf
+    scores = resume_matrix @ jd_matrix.T
+    scores /= norms(resume_counts)[:, None]
+    scores /= norms(jd_counts)[None, :]
+    return np.clip(scores, 0.0, 1.0)
+
+
+def _bm25(query_counts, doc_counts, k1, b):
+    vocab = _shared_vocab(query_counts, doc_counts)
+    if not vocab:
+        return np.zeros((len(query_counts), len(doc_counts)), dtype=np.float32)
+    n_docs = len(doc_counts)
+    tf = _tf_matrix(doc_counts, vocab)
+    doc_lengths = np.array([sum(c.values()) for c in doc_counts], dtype=np.float32)
+    avg_length = float(doc_lengths.mean()) or 1.0
+    doc_freq = (tf > 0).sum(axis=0).astype(np.float32)
+    idf = np.log(1.0 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    denom = tf + k1 * (1.0 - b + b * doc_lengths[:, None] / avg_length)
+    weights = idf * tf * (k1 + 1.0) / np.maximum(denom, 1e-9)
+    query_matrix = (_tf_matrix(query_counts, vocab) > 0).astype(np.float32)
+    return query_matrix @ weights.T
+
+
+def bm25_scores(resume_texts, jd_texts, k1=1.5, b=0.75):
+    """BM25 matrix of shape (len(resumes), len(jds)), rescaled to [0, 1] by the batch maximum.
+
+    The larger side is treated as the document collection and the smaller side as queries.
+    """
+    resume_counts = [Counter(tokenize(t)) for t in resume_texts]
+    jd_counts = [Counter(tokenize(t)) for t in jd_texts]
+    if len(jd_counts) >= len(resume_counts):
+        scores = _bm25(resume_counts, jd_counts, k1, b)
+    else:
+        scores = _bm25(jd_counts, resume_counts, k1, b).T
+    peak = float(scores.max()) if scores.size else 0.0
+    return scores / peak if peak > 0 else scores
+
+
+SCORERS = {"cosine": cosine_scores, "bm25": bm25_scores}
+
+
+def rank_pairs(resume_texts, jd_texts, method="cosine", limit=None):
+    """Score every pair and return [(resume_index, jd_index, score), ...] best first."""
+    if method not in SCORERS:
+        raise ValueError(f"Unknown pre-rank method '{method}'. Use one of: {', '.join(SCORERS)}")
+    scores = SCORERS[method](resume_texts, jd_texts)
+    flat = scores.ravel()
+    if limit is not None and limit < flat.size:
+        top = np.argpartition(-flat, limit - 1)[:limit]
+    else:
+        top = np.arange(flat.size)
+    top = top[np.argsort(-flat[top], kind="stable")]
+    n_jds = scores.shape[1]
+    return [(int(i // n_jds), int(i % n_jds), round(float(flat[i]), 4)) for i in top]
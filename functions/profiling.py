@@ -0,0 +1,156 @@
+# profiling.py
+# Opt-in request profiling and the slow-request log for local_server.py.
+# - Profiling: a request sent with "X-Profile: 1" (honoured only with PROFILE_HEADER_ENABLED=1),
+#   or picked at PROFILE_SAMPLE_RATE, runs under cProfile. The stats are saved as
+#   PROFILE_DIR/<profile id>.prof (pstats, snakeviz) and summarized at GET /api/profiles/<profile id>.
+#   The profile ID (returned in X-Profile-ID) is the request ID plus a server-generated suffix, so
+#   a client reusing another request's X-Request-ID cannot overwrite or read its profile.
+#   cProfile only sees the request thread; time spent in worker threads and OCR processes shows in
+#   the stage breakdown. Only one request is profiled at a time (Python 3.12+ refuses a second
+#   active profiler); a request picked while another is being profiled just runs unprofiled.
+# - Slow-request log: every request slower than SLOW_REQUEST_SECONDS is appended to
+#   SLOW_REQUEST_LOG as one JSON line: stage breakdown, input size, page count, extraction path.
+# Every response carries X-Request-ID (the client's own, if it sent a valid one) to find both.
+import io
+import os
+import re
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import logging
+import tempfile
+import threading
+from logging.handlers import RotatingFileHandler
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "resume_builder_profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "0") in ("1", "true", "True")
+# Oldest profiles are deleted beyond this many
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+PROFILE_REPORT_LINES = 40
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls")
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "10"))  # 0 = off
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", os.path.join(tempfile.gettempdir(), "resume_builder_slow_requests.jsonl"))
+SLOW_REQUEST_LOG_MAX_BYTES = int(os.getenv("SLOW_REQUEST_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_REQUEST_LOG_BACKUPS = 3
+
+PROFILE_HEADER = "X-Profile"
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+PROFILE_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}\.[0-9a-f]{12}$")
+
+_profile_lock = threading.Lock()  # held while a request is being profiled
+_prune_lock = threading.Lock()
+_slow_log = None
+_slow_log_lock = threading.Lock()
+
+
+def request_id_from(header_value):
+    """The client's request ID if it is safe to use in a file name, otherwise a new one."""
+    if header_value and REQUEST_ID_PATTERN.match(header_value):
+        return header_value
+    return uuid.uuid4().hex
+
+
+def should_profile(header_value):
+    if PROFILE_HEADER_ENABLED and (header_value or "").lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+# --- Profiles ---
+def start_profile():
+    """A running profiler, or None when another request is already being profiled."""
+    if not _profile_lock.acquire(blocking=False):
+        print("--- Profiling skipped: another request is being profiled ---")
+        return None
+    try:
+        profile = cProfile.Profile()
+        profile.enable()
+    except Exception:
+        _profile_lock.release()
+        raise
+    return profile
+
+
+def stop_profile(profile):
+    """Stop a profiler from start_profile() and let the next request be profiled."""
+    try:
+        profile.disable()
+    finally:
+        _profile_lock.release()
+
+
+def _profile_path(profile_id):
+    return os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+
+
+def save_profile(profile, request_id):
+    """Stop the profiler and write its stats. Returns (profile ID, file path)."""
+    stop_profile(profile)
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{request_id}.{uuid.uuid4().hex[:12]}"
+    path = _profile_path(profile_id)
+    profile.dump_stats(path)
+    _prune_profiles()
+    return profile_id, path
+
+
+def _prune_profiles():
+    with _prune_lock:
+        try:
+            entries = [e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".prof")]
+        except OSError:
+            return
+        if len(entries) <= PROFILE_MAX_FILES:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - PROFILE_MAX_FILES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def profile_report(profile_id, sort="cumulative", lines=PROFILE_REPORT_LINES):
+    """pstats text report of a saved profile, or None if there is none for this ID."""
+    if not PROFILE_ID_PATTERN.match(profile_id or "") or not os.path.exists(_profile_path(profile_id)):
+        return None
+    if sort not in PROFILE_SORT_KEYS:
+        sort = "cumulative"
+    out = io.StringIO()
+    pstats.Stats(_profile_path(profile_id), stream=out).strip_dirs().sort_stats(sort).print_stats(lines)
+    return out.getvalue()
+
+
+# --- Slow-request log ---
+def _slow_logger():
+    global _slow_log
+    with _slow_log_lock:
+        if _slow_log is None:
+            os.makedirs(os.path.dirname(os.path.abspath(SLOW_REQUEST_LOG)), exist_ok=True)
+            handler = RotatingFileHandler(SLOW_REQUEST_LOG, maxBytes=SLOW_REQUEST_LOG_MAX_BYTES,
+                                          backupCount=SLOW_REQUEST_LOG_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _slow_log = logging.getLogger("resume_builder.slow_requests")
+            _slow_log.setLevel(logging.INFO)
+            _slow_log.propagate = False
+            _slow_log.addHandler(handler)
+        return _slow_log
+
+
+def is_slow(seconds):
+    return SLOW_REQUEST_SECONDS > 0 and seconds >= SLOW_REQUEST_SECONDS
+
+
+def log_slow_request(entry):
+    """Append one slow request to SLOW_REQUEST_LOG and print where its time went."""
+    entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), **entry}
+    _slow_logger().info(json.dumps(entry))
+    top = ", ".join(f"{stage} {stats['seconds']}s" for stage, stats in list(entry.get("stages", {}).items())[:3])
+    print(f"--- Slow request {entry.get('request_id')}: {entry.get('route')} took {entry.get('seconds')}s "
+          f"({top or 'no stages recorded'}) ---")
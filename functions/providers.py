@@ -0,0 +1,364 @@
+# providers.py
+# Provider layer behind generate_llama_json / generate_cover_letter.
+# Each call goes to the preferred provider first, with jittered exponential-backoff retries;
+# a per-provider circuit breaker stops hammering a provider that keeps failing, and the router
+# fails over to the next provider (Groq -> Gemini by default). Optional hedging fires a second
+# provider once the first has been running longer than its own p95 latency and returns
+# whichever answer arrives first, which trims tail latency.
+#
+# Everything is testable offline with StubProvider, e.g.:
+#   router = ProviderRouter([StubProvider("groq", failures=3), StubProvider("gemini", reply="{}")])
+#   router.complete("system", "prompt", {"max_tokens": 10})
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "4.0"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") in ("1", "true", "True")
+# Until a provider has this many latency samples, hedge after HEDGE_DEFAULT_DELAY seconds
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "8.0"))
+LATENCY_WINDOW = 200
+
+
+class ProviderError(Exception):
+    pass
+
+
+class Provider:
+    """One LLM backend. Subclasses implement complete() and, optionally, stream()."""
+
+    name = "provider"
+    model = ""
+
+    def complete(self, system_prompt, prompt, params):
+        raise NotImplementedError
+
+    def stream(self, system_prompt, prompt, params):
+        # Providers without native streaming yield the whole answer at once
+        yield self.complete(system_prompt, prompt, params)
+
+
+class OpenAICompatibleProvider(Provider):
+    """Groq (or any OpenAI-compatible endpoint) through the openai client."""
+
+    def __init__(self, name, get_client, model):
+        self.name = name
+        self.get_client = get_client
+        self.model = model
+
+    def _create(self, system_prompt, prompt, params, **extra):
+        return self.get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt},
+            ],
+            **params,
+            **extra,
+        )
+
+    def complete(self, system_prompt, prompt, params):
+        response = self._create(system_prompt, prompt, params)
+        return response.choices[0].message.content.strip()
+
+    def stream(self, system_prompt, prompt, params):
+        for chunk in self._create(system_prompt, prompt, params, stream=True):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class GeminiProvider(Provider):
+    """Google Gemini through google.generativeai, mapping the OpenAI-style params."""
+
+    def __init__(self, get_genai, model):
+        self.name = "gemini"
+        self.get_genai = get_genai
+        self.model = model
+
+    def _generate(self, system_prompt, prompt, params, stream=False):
+        genai = self.get_genai()
+        config = {"temperature": params.get("temperature", 0.7)}
+        if "max_tokens" in params:
+            config["max_output_tokens"] = params["max_tokens"]
+        if params.get("response_format", {}).get("type") == "json_object":
+            config["response_mime_type"] = "application/json"
+        model = genai.GenerativeModel(self.model, system_instruction=system_prompt)
+        return model.generate_content(prompt, generation_config=config, stream=stream)
+
+    def complete(self, system_prompt, prompt, params):
+        return self._generate(system_prompt, prompt, params).text.strip()
+
+    def stream(self, system_prompt, prompt, params):
+        for chunk in self._generate(system_prompt, prompt, params, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+
+class StubProvider(Provider):
+    """Local stand-in for tests and benchmarks.
+
+    reply is a string or a callable(system_prompt, prompt, params) -> str. The first `failures`
+    calls raise ProviderError; every call sleeps `latency` seconds first.
+    """
+
+    def __init__(self, name, reply="{}", latency=0.0, failures=0, model="stub"):
+        self.name = name
+        self.model = model
+        self.reply = reply
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def complete(self, system_prompt, prompt, params):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.failures
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ProviderError(f"{self.name} stub failure {self.calls}")
+        return self.reply(system_prompt, prompt, params) if callable(self.reply) else self.reply
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `reset_seconds`.
+
+    available() only reports whether a call could go through; allow() is asked right before a
+    call and, while half-open, claims the single trial. A trial that never reports back (an
+    abandoned stream) stops blocking others after another `reset_seconds`.
+    """
+
+    def __init__(self, threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def _trial_running(self):
+        return self.trial_started is not None and time.monotonic() - self.trial_started < self.reset_seconds
+
+    def available(self):
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._trial_running())
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self._trial_running():
+                return False
+            self.trial_started = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_started = None
+            if self.failures >= self.threshold or self.opened_at is not None:
+                # A failed half-open trial re-opens the breaker for another full period
+                self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds=None, ok=True):
+        with self._lock:
+            if ok:
+                self.successes += 1
+                self.latencies.append(seconds)
+            else:
+                self.failures += 1
+
+    def quantile(self, q):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class ProviderRouter:
+    def __init__(self, providers, retries=LLM_RETRIES, base_delay=LLM_RETRY_BASE_DELAY,
+                 max_delay=LLM_RETRY_MAX_DELAY, hedge=LLM_HEDGE, sleep=time.sleep):
+        self.providers = {p.name: p for p in providers}
+        self.order = [p.name for p in providers]
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.sleep = sleep
+        self.breakers = {name: CircuitBreaker() for name in self.order}
+        self.stats_by_provider = {name: ProviderStats() for name in self.order}
+        # Threads are only started by the first hedged call
+        self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+    def candidates(self, preferred=None):
+        """Provider names to try, preferred first, skipping providers whose breaker is open."""
+        order = list(self.order)
+        if preferred in self.providers:
+            order.remove(preferred)
+            order.insert(0, preferred)
+        return [name for name in order if self.breakers[name].available()]
+
+    def model_for(self, preferred=None):
+        name = preferred if preferred in self.providers else self.order[0]
+        return self.providers[name].model
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _call_with_retries(self, name, system_prompt, prompt, params, on_call=None):
+        provider = self.providers[name]
+        breaker = self.breakers[name]
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                break
+            if on_call is not None:
+                on_call(name)
+            start = time.perf_counter()
+            try:
+                text = provider.complete(system_prompt, prompt, params)
+            except Exception as e:
+                last_error = e
+                breaker.record_failure()
+                self.stats_by_provider[name].record(ok=False)
+                print(f"--- {name} attempt {attempt + 1} failed: {e} ---")
+                if attempt < self.retries:
+                    self.sleep(self._backoff(attempt))
+                continue
+            breaker.record_success()
+            self.stats_by_provider[name].record(time.perf_counter() - start)
+            return text
+        raise ProviderError(f"{name} failed: {last_error or 'circuit open'}")
+
+    def _failover(self, names, system_prompt, prompt, params, on_call=None):
+        errors = []
+        for name in names:
+            try:
+                return self._call_with_retries(name, system_prompt, prompt, params, on_call)
+            except ProviderError as e:
+                errors.append(str(e))
+        raise ProviderError("All LLM providers failed: " + "; ".join(errors) if errors else "No LLM provider available")
+
+    def hedge_delay(self, name):
+        stats = self.stats_by_provider[name]
+        if len(stats.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return stats.quantile(0.95)
+
+    def _hedged(self, names, system_prompt, prompt, params, on_call=None):
+        # The primary leg only tries names[0]; names[1:] belong to the backup leg (or to the
+        # plain failover when the primary fails before the hedge delay), never to both
+        primary = self._hedge_pool.submit(self._failover, names[:1], system_prompt, prompt, params, on_call)
+        done, _ = wait([primary], timeout=self.hedge_delay(names[0]))
+        if done:
+            try:
+                return primary.result()
+            except ProviderError as e:
+                print(f"--- {names[0]} failed before its hedge delay, failing over ---")
+                try:
+                    return self._failover(names[1:], system_prompt, prompt, params, on_call)
+                except ProviderError as backup_error:
+                    raise ProviderError(f"{e}; {backup_error}") from backup_error
+        print(f"--- {names[0]} slower than its p95, hedging with {names[1]} ---")
+        backup = self._hedge_pool.submit(self._failover, names[1:], system_prompt, prompt, params, on_call)
+        pending = {primary, backup}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except ProviderError as e:
+                    last_error = e
+        raise last_error
+
+    def complete(self, system_prompt, prompt, params, preferred=None, on_call=None):
+        """Answer from the preferred provider, retrying, failing over and hedging as configured.
+
+        on_call(name) runs before every upstream call (retries, failovers and hedges included).
+        """
+        names = self.candidates(preferred)
+        if not names:
+            raise ProviderError("No LLM provider available (all circuit breakers open)")
+        if self.hedge and len(names) > 1:
+            return self._hedged(names, system_prompt, prompt, params, on_call)
+        return self._failover(names, system_prompt, prompt, params, on_call)
+
+    def stream(self, system_prompt, prompt, params, preferred=None, on_call=None):
+        """Yield chunks from the first provider that starts answering.
+
+        Failover only happens before the first chunk; a stream that breaks midway raises.
+        """
+        errors = []
+        for name in self.candidates(preferred):
+            if not self.breakers[name].allow():
+                errors.append(f"{name} failed: circuit open")
+                continue
+            if on_call is not None:
+                on_call(name)
+            start = time.perf_counter()
+            try:
+                chunks = self.providers[name].stream(system_prompt, prompt, params)
+                first = next(chunks, None)
+            except Exception as e:
+                self.breakers[name].record_failure()
+                self.stats_by_provider[name].record(ok=False)
+                errors.append(f"{name} failed: {e}")
+                continue
+            if first is not None:
+                yield first
+            yield from chunks
+            self.breakers[name].record_success()
+            self.stats_by_provider[name].record(time.perf_counter() - start)
+            return
+        raise ProviderError("All LLM providers failed: " + "; ".join(errors) if errors else "No LLM provider available")
+
+    def stats(self):
+        result = {}
+        for name in self.order:
+            stats = self.stats_by_provider[name]
+            p50, p95 = stats.quantile(0.5), stats.quantile(0.95)
+            result[name] = {
+                "model": self.providers[name].model,
+                "breaker": self.breakers[name].state,
+                "successes": stats.successes,
+                "failures": stats.failures,
+                "p50_seconds": round(p50, 4) if p50 is not None else None,
+                "p95_seconds": round(p95, 4) if p95 is not None else None,
+            }
+        return {"order": self.order, "hedge": self.hedge, "providers": result}
@@ -0,0 +1,36 @@
+# resume_sections.py
+# Splits resume text into sections on recognised headings. Shared by section-parallel parsing
+# (section_parser.py) and section-level job matching in the Streamlit app (root utils.py), so
+# both see the same sections for the same resume.
+# No imports from sibling modules, so the Streamlit app can use it as functions.resume_sections.
+import re
+
+SECTION_HEADINGS = {
+    "summary": r"(professional |career )?(summary|profile|objective|about me)",
+    "experience": r"(professional |work |relevant )?(experience|employment( history)?|work history|career history)",
+    "education": r"education( and training)?|academic (background|qualifications)",
+    "projects": r"(personal |academic |key )?projects",
+    "skills": r"(technical |core |key )?(skills|competencies|technologies|tech stack)( and tools)?",
+    "certifications": r"certifications?( and licenses)?|licenses( and certifications)?|courses|awards( and certifications)?",
+    "languages": r"languages",
+}
+HEADING_PATTERNS = [(name, re.compile(rf"^\s*({pattern})\s*:?\s*$", re.IGNORECASE))
+                    for name, pattern in SECTION_HEADINGS.items()]
+HEADING_MAX_CHARS = 40
+
+
+def split_sections(text):
+    """{section name: text} in document order. Text before the first heading is the "header"."""
+    sections = {"header": []}
+    current = "header"
+    for line in text.split("\n"):
+        stripped = line.strip()
+        heading = None
+        if stripped and len(stripped) <= HEADING_MAX_CHARS:
+            heading = next((name for name, pattern in HEADING_PATTERNS if pattern.match(stripped)), None)
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+        else:
+            sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if "\n".join(lines).strip()}
@@ -0,0 +1,302 @@
+# scheduler.py
+# Admission control in front of the ProviderRouter.
+# - Coalescing: identical prompts already in flight share one upstream call; every waiter gets
+#   the same answer (or the same error).
+# - Budgets: each provider has token buckets for requests per minute and tokens per minute
+#   (LLM_RPM_<PROVIDER>, LLM_TPM_<PROVIDER>, e.g. LLM_TPM_GROQ=6000; 0 = unlimited). A call is
+#   sent to the first candidate provider with budget left, or waits until one refills. Retries,
+#   failovers and hedges the router sends after that first call are charged to the provider
+#   that received them.
+#   Budgets are per process. When several processes call the LLM (the server and its job-queue
+#   workers), each one runs at share_budgets(1 / processes) of the configured limits so together
+#   they stay within them.
+# - Priorities: interactive calls are admitted before batch calls. The priority comes from the
+#   llm_priority context variable, set with priority("batch") or context_with_priority("batch").
+import os
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+from llm_cache import make_cache_key
+from compaction import estimate_tokens, CHARS_PER_TOKEN
+from providers import ProviderError
+from metrics import observe_stage
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_RANKS = {INTERACTIVE: 0, BATCH: 1}
+
+DEFAULT_RPM = float(os.getenv("LLM_RPM_DEFAULT", "0"))
+DEFAULT_TPM = float(os.getenv("LLM_TPM_DEFAULT", "0"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "120"))
+# Longest a waiter sleeps before re-checking, so it notices refills and timeouts promptly
+MAX_POLL_SECONDS = 0.5
+WAIT_WINDOW = 500
+
+llm_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(name):
+    """Run the enclosed LLM calls (and contexts copied from here) at this priority."""
+    token = llm_priority.set(name)
+    try:
+        yield
+    finally:
+        llm_priority.reset(token)
+
+
+def context_with_priority(name):
+    """A copy of the current context running at this priority, for executor.submit(ctx.run, ...)."""
+    context = contextvars.copy_context()
+    context.run(llm_priority.set, name)
+    return context
+
+
+def provider_limit(kind, provider, default):
+    return float(os.getenv(f"LLM_{kind}_{provider.upper()}", str(default)))
+
+
+def estimate_request_tokens(system_prompt, prompt, params):
+    # What the provider counts against TPM: the prompt plus the completion it may generate
+    return estimate_tokens(system_prompt) + estimate_tokens(prompt) + int(params.get("max_tokens", 0))
+
+
+class TokenBucket:
+    """`per_minute` units refilled continuously, holding at most one minute's worth.
+
+    per_minute <= 0 means unlimited. Not locked; the scheduler calls it under its own lock.
+    """
+
+    def __init__(self, per_minute, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.level = float(per_minute)
+        self.updated = clock()
+
+    @property
+    def unlimited(self):
+        return self.per_minute <= 0
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` is available (0 if it is available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.per_minute)  # a request larger than the bucket waits for a full one
+        return 0.0 if self.level >= amount else (amount - self.level) * 60.0 / self.per_minute
+
+    def set_rate(self, per_minute):
+        self._refill()
+        self.per_minute = per_minute
+        self.level = min(self.level, float(per_minute))
+
+    def take(self, amount):
+        if not self.unlimited:
+            self.level -= min(amount, self.per_minute)
+
+    def refund(self, amount):
+        if not self.unlimited:
+            self._refill()
+            self.level = min(self.per_minute, self.level + amount)
+
+    def available(self):
+        if self.unlimited:
+            return None
+        self._refill()
+        return round(self.level, 1)
+
+
+class LLMScheduler:
+    def __init__(self, router, queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS, clock=time.monotonic):
+        self.router = router
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.limits = {name: (provider_limit("RPM", name, DEFAULT_RPM), provider_limit("TPM", name, DEFAULT_TPM))
+                       for name in router.order}
+        self.rpm = {name: TokenBucket(rpm, clock) for name, (rpm, _tpm) in self.limits.items()}
+        self.tpm = {name: TokenBucket(tpm, clock) for name, (_rpm, tpm) in self.limits.items()}
+        self.budget_share = 1.0
+        self._cond = threading.Condition()
+        self._queue = []            # heap of [priority rank, sequence]
+        self._queued_by_key = {}    # coalescing key -> its heap entry while it waits
+        self._in_flight = {}        # coalescing key -> Future shared by every waiter
+        self._sequence = itertools.count()
+        self._running = 0
+        self._counts = {"admitted": 0, "coalesced": 0, "timeouts": 0, "extra_calls": 0}
+        self._waits = {name: deque(maxlen=WAIT_WINDOW) for name in PRIORITY_RANKS}
+
+    def model_for(self, preferred=None):
+        return self.router.model_for(preferred)
+
+    def share_budgets(self, share):
+        """Run at `share` (0-1] of the configured RPM/TPM limits, e.g. 1/3 in each of three
+        processes calling the same provider account."""
+        with self._cond:
+            self.budget_share = share
+            for name, (rpm, tpm) in self.limits.items():
+                self.rpm[name].set_rate(rpm * share)
+                self.tpm[name].set_rate(tpm * share)
+            self._cond.notify_all()
+
+    # --- Admission ---
+    def _reserve(self, name, tokens):
+        wait = max(self.rpm[name].wait_time(1), self.tpm[name].wait_time(tokens))
+        if wait == 0:
+            self.rpm[name].take(1)
+            self.tpm[name].take(tokens)
+        return wait
+
+    def _admit(self, priority_name, tokens, preferred, key=None):
+        """Block until this call is first in line and a provider has budget. Returns the provider name."""
+        entry = [PRIORITY_RANKS.get(priority_name, PRIORITY_RANKS[BATCH]), next(self._sequence)]
+        enqueued = self.clock()
+        deadline = enqueued + self.queue_timeout
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            if key is not None:
+                self._queued_by_key[key] = entry
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] is entry:
+                        names = self.router.candidates(preferred) or self.router.order[:1]
+                        waits = []
+                        for name in names:
+                            needed = self._reserve(name, tokens)
+                            if needed == 0:
+                                heapq.heappop(self._queue)
+                                self._running += 1
+                                self._counts["admitted"] += 1
+                                waited = self.clock() - enqueued
+                                self._waits[priority_name if priority_name in self._waits else BATCH].append(waited)
+                                self._cond.notify_all()
+                                observe_stage("llm_queue", waited)
+                                return name
+                            waits.append(needed)
+                        wait = min(waits)
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self._queue.remove(entry)
+                        heapq.heapify(self._queue)
+                        self._counts["timeouts"] += 1
+                        self._cond.notify_all()
+                        raise ProviderError(f"Timed out after {self.queue_timeout:.0f}s waiting for LLM capacity")
+                    self._cond.wait(min(wait if wait is not None else remaining, remaining, MAX_POLL_SECONDS))
+            finally:
+                if key is not None:
+                    self._queued_by_key.pop(key, None)
+
+    def _charger(self, name, tokens):
+        """on_call hook for the router: the admission paid for the first call to `name`; every
+        other upstream call is taken from its provider's buckets, which may go negative so the
+        next admissions wait for the debt to refill."""
+        calls = []
+
+        def charge(called):
+            with self._cond:
+                if calls or called != name:
+                    self.rpm[called].take(1)
+                    self.tpm[called].take(tokens)
+                    self._counts["extra_calls"] += 1
+                calls.append(called)
+        return charge
+
+    def _release(self, name, reserved_tokens, used_tokens):
+        with self._cond:
+            self._running -= 1
+            # Give back what the call did not use (the reservation assumed the full max_tokens)
+            if used_tokens < reserved_tokens:
+                self.tpm[name].refund(reserved_tokens - used_tokens)
+            self._cond.notify_all()
+
+    # --- Calls ---
+    def complete(self, system_prompt, prompt, params, preferred=None):
+        """Same contract as ProviderRouter.complete, behind coalescing, budgets and priorities."""
+        priority_name = llm_priority.get()
+        key = make_cache_key(f"{preferred}:{self.router.model_for(preferred)}", system_prompt, prompt, **params)
+        with self._cond:
+            shared = self._in_flight.get(key)
+            if shared is None:
+                future = self._in_flight[key] = Future()
+            else:
+                self._counts["coalesced"] += 1
+                # An interactive caller joining a queued batch call pulls it forward
+                entry = self._queued_by_key.get(key)
+                rank = PRIORITY_RANKS.get(priority_name, PRIORITY_RANKS[BATCH])
+                if entry is not None and rank < entry[0]:
+                    entry[0] = rank
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+        if shared is not None:
+            return shared.result()
+
+        try:
+            tokens = estimate_request_tokens(system_prompt, prompt, params)
+            name = self._admit(priority_name, tokens, preferred, key)
+            text = None
+            try:
+                text = self.router.complete(system_prompt, prompt, params, preferred=name,
+                                            on_call=self._charger(name, tokens))
+            finally:
+                used = tokens if text is None else tokens - int(params.get("max_tokens", 0)) + estimate_tokens(text)
+                self._release(name, tokens, used)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                self._in_flight.pop(key, None)
+
+    def stream(self, system_prompt, prompt, params, preferred=None):
+        """Same contract as ProviderRouter.stream. Streams are budgeted but never coalesced."""
+        tokens = estimate_request_tokens(system_prompt, prompt, params)
+        name = self._admit(llm_priority.get(), tokens, preferred)
+        generated = 0
+        try:
+            for delta in self.router.stream(system_prompt, prompt, params, preferred=name,
+                                            on_call=self._charger(name, tokens)):
+                generated += len(delta)
+                yield delta
+        finally:
+            used = tokens - int(params.get("max_tokens", 0)) + generated // CHARS_PER_TOKEN
+            self._release(name, tokens, used)
+
+    # --- Stats ---
+    @staticmethod
+    def _wait_summary(samples):
+        if not samples:
+            return {"samples": 0}
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+        return {"samples": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 4)}
+
+    def stats(self):
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_RANKS}
+            names_by_rank = {rank: name for name, rank in PRIORITY_RANKS.items()}
+            for rank, _seq in self._queue:
+                depth[names_by_rank[rank]] += 1
+            return {
+                "queue_depth": depth,
+                "running": self._running,
+                "in_flight_prompts": len(self._in_flight),
+                "budget_share": round(self.budget_share, 4),
+                **self._counts,
+                "wait_seconds": {name: self._wait_summary(list(samples)) for name, samples in self._waits.items()},
+                "budgets": {name: {"rpm_limit": self.rpm[name].per_minute or None, "rpm_available": self.rpm[name].available(),
+                                   "tpm_limit": self.tpm[name].per_minute or None, "tpm_available": self.tpm[name].available()}
+                            for name in self.router.order},
+            }
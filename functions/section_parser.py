@@ -0,0 +1,185 @@
+# section_parser.py
+# Section-parallel resume parsing for long resumes.
+# The raw text is split into sections locally, each section is enhanced by its own smaller LLM
+# call (run concurrently), and the pieces are merged back into the usual
+# {"analysis": ..., "resumeData": ...} structure with stable, deterministic IDs.
+# Wall-clock time then follows the longest section instead of the whole document, and one
+# truncated section no longer fails the entire parse.
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from compaction import normalize_whitespace, remove_repeated_lines, truncate_to_budget, estimate_tokens
+from resume_sections import split_sections
+
+SECTION_TOKEN_BUDGET = int(os.getenv("SECTION_TOKEN_BUDGET", "2500"))
+# "auto" mode switches to section-parallel parsing above this many input tokens
+SECTION_PARSE_MIN_TOKENS = int(os.getenv("SECTION_PARSE_MIN_TOKENS", "1200"))
+
+ACHIEVEMENT_RULE = ("Enhance every achievement with strong, professional action verbs and quantifiable results "
+                    "(e.g., \"Increased sales by 15%\"). Fix grammar and flow. Do NOT invent employers, dates or degrees.")
+
+# Per task: which sections it reads, the JSON it returns, its max_tokens, and extra instructions
+SECTION_TASKS = {
+    "header": {
+        "sections": ("header", "summary"),
+        "schema": '{ "fullName": "string", "email": "string", "phone": "string", "location": "string", '
+                  '"linkedin": "string (optional)", "github": "string (optional)", "portfolio": "string (optional)", '
+                  '"summary": "string" }',
+        "max_tokens": 600,
+        "rules": "Rewrite the summary so it is concise and results-oriented, using strong action verbs.",
+    },
+    "experience": {
+        "sections": ("experience",),
+        "schema": '{ "experiences": [ { "title": "string", "company": "string", "location": "string (optional)", '
+                  '"startDate": "string", "endDate": "string", "achievements": [ { "description": "string" } ] } ] }',
+        "max_tokens": 2500,
+        "rules": ACHIEVEMENT_RULE,
+    },
+    "education": {
+        "sections": ("education",),
+        "schema": '{ "education": [ { "degree": "string", "school": "string", "location": "string (optional)", '
+                  '"startDate": "string", "endDate": "string" } ] }',
+        "max_tokens": 600,
+        "rules": "",
+    },
+    "projects": {
+        "sections": ("projects",),
+        "schema": '{ "projects": [ { "name": "string", "techStack": "string", '
+                  '"achievements": [ { "description": "string" } ] } ] }',
+        "max_tokens": 1500,
+        "rules": ACHIEVEMENT_RULE,
+    },
+    "skills": {
+        # Summary and skills are enough context to guess the role and the gaps
+        "sections": ("summary", "skills"),
+        "schema": '{ "detectedRole": "string (best guess for the job title, e.g. \'Data Analyst\')", '
+                  '"skills": [ { "name": "string", "category": "string" } ], '
+                  '"missingSkills": [ { "name": "string", "category": "string" } ] }',
+        "max_tokens": 800,
+        "rules": "List every skill in `skills`. In `missingSkills` list 3-5 important skills for the detected role "
+                 "that are NOT in `skills`. Do NOT mix information: a company is not a skill.",
+    },
+    "certifications": {
+        "sections": ("certifications", "languages"),
+        "schema": '{ "certifications": [ { "name": "string", "organization": "string", "date": "string" } ], '
+                  '"languages": [ { "name": "string", "proficiency": "string" } ] }',
+        "max_tokens": 600,
+        "rules": "",
+    },
+}
+
+
+def build_section_prompt(task_name, section_text):
+    task = SECTION_TASKS[task_name]
+    rules = f"\n**Rules:** {task['rules']}" if task["rules"] else ""
+    return f"""
+You are parsing ONE part of a resume. Return a single JSON object with exactly this structure and nothing else:
+{task['schema']}
+If the text contains nothing for a key, return an empty string or an empty array `[]`.{rules}
+---
+RESUME SECTION TEXT:
+{section_text}
+---
+"""
+
+
+def build_section_tasks(resume_text):
+    """[(task_name, prompt, max_tokens), ...] for every task whose sections are present.
+
+    Returns None when no body section headings are found, so the caller can fall back to a
+    single whole-resume call.
+    """
+    text = remove_repeated_lines(normalize_whitespace(resume_text))
+    sections = split_sections(text)
+    if not any(name in sections for name in ("experience", "education", "projects", "skills")):
+        return None
+    tasks = []
+    before = after = 0
+    for task_name, task in SECTION_TASKS.items():
+        parts = [sections[name] for name in task["sections"] if name in sections]
+        if not parts and task_name != "header":
+            continue
+        section_text = "\n\n".join(parts)
+        before += estimate_tokens(section_text)
+        section_text = truncate_to_budget(section_text, SECTION_TOKEN_BUDGET)
+        after += estimate_tokens(section_text)
+        tasks.append((task_name, build_section_prompt(task_name, section_text), task["max_tokens"]))
+    print(f"--- section parse: {len(tasks)} sections, input tokens {before} -> {after} after compaction ---")
+    return tasks
+
+
+def _items(result, key):
+    value = result.get(key) if isinstance(result, dict) else None
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def _with_ids(items, prefix, nested_key=None, nested_prefix="a"):
+    # IDs depend only on position, so re-parsing the same resume gives the same IDs
+    out = []
+    for i, item in enumerate(items, start=1):
+        item = {"id": f"{prefix}{i}", **{k: v for k, v in item.items() if k != "id"}}
+        if nested_key:
+            item[nested_key] = [
+                {"id": f"{prefix}{i}-{nested_prefix}{j}", **{k: v for k, v in sub.items() if k != "id"}}
+                for j, sub in enumerate(_items(item, nested_key), start=1)
+            ]
+        out.append(item)
+    return out
+
+
+def merge_section_results(results):
+    """Merge {task_name: json_result} into the same shape process_resume_text returns."""
+    warnings = [f"{name}: {result['error']}" for name, result in results.items()
+                if isinstance(result, dict) and "error" in result]
+    header = results.get("header") or {}
+    if "error" in header:
+        header = {}
+    skills = results.get("skills") or {}
+    resume_data = {
+        "fullName": header.get("fullName", ""),
+        "email": header.get("email", ""),
+        "phone": header.get("phone", ""),
+        "location": header.get("location", ""),
+        "linkedin": header.get("linkedin", ""),
+        "github": header.get("github", ""),
+        "portfolio": header.get("portfolio", ""),
+        "summary": header.get("summary", ""),
+        "skills": _with_ids(_items(skills, "skills"), "skill"),
+        "experiences": _with_ids(_items(results.get("experience"), "experiences"), "exp", "achievements"),
+        "education": _with_ids(_items(results.get("education"), "education"), "edu"),
+        "projects": _with_ids(_items(results.get("projects"), "projects"), "proj", "achievements"),
+        "certifications": _with_ids(_items(results.get("certifications"), "certifications"), "cert"),
+        "languages": _with_ids(_items(results.get("certifications"), "languages"), "lang"),
+    }
+    merged = {
+        "analysis": {
+            "detectedRole": skills.get("detectedRole", "") if isinstance(skills, dict) else "",
+            "missingSkills": _with_ids(_items(skills, "missingSkills"), "missingSkill"),
+        },
+        "resumeData": resume_data,
+    }
+    if warnings:
+        merged["warnings"] = warnings
+    return merged
+
+
+def parse_resume_by_sections(resume_text, generate_json, max_workers=None):
+    """Run one generate_json(prompt, max_tokens) call per section concurrently and merge them.
+
+    Returns None when no section headings are found, so the caller can fall back to a single call.
+    """
+    tasks = build_section_tasks(resume_text)
+    if tasks is None:
+        return None
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks)) as executor:
+        # Each worker runs in a copy of the caller's context so per-request metric labels carry over
+        futures = {name: executor.submit(contextvars.copy_context().run, generate_json, prompt, max_tokens)
+                   for name, prompt, max_tokens in tasks}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = {"error": str(e)}
+    return merge_section_results(results)
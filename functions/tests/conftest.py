@@ -0,0 +1,9 @@
+# conftest.py
+# The modules in functions/ import each other as top-level names, as they do when a server is
+# started from this directory.
+#
+#   python -m pytest -q functions/tests
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
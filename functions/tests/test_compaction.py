@@ -0,0 +1,73 @@
+from compaction import (
+    compact_resume, compact_job_description, remove_repeated_lines, strip_boilerplate, normalize_whitespace,
+    truncate_to_budget,
+)
+
+PAGE = ["Line %d of the page" % i for i in range(25)]
+
+
+def test_short_lines_are_content():
+    # Regression: years, one-letter skills and a GPA were dropped as page numbers or OCR noise
+    text = "Education\nB.Sc. Computer Science\nMIT\n2019\nSkills\nC\nR\nC++\nGPA\n4"
+    assert compact_resume(text) == text
+
+
+def test_ocr_speckle_is_dropped():
+    assert normalize_whitespace("Python\n| ~ .\n=—\n'\nSQL") == "Python\nSQL"
+
+
+def test_page_number_lines_are_dropped():
+    text = "\n".join(["Name"] + PAGE + ["Page 1 of 3"] + PAGE + ["2 of 3"] + PAGE + ["- 3 -"])
+    assert "of 3" not in remove_repeated_lines(text) and "- 3 -" not in remove_repeated_lines(text)
+
+
+def test_bare_numbers_counting_up_a_page_apart_are_dropped():
+    lines = remove_repeated_lines("\n".join(PAGE + ["1"] + PAGE + ["2"] + PAGE + ["3"])).split("\n")
+    assert not {"1", "2", "3"} & set(lines)
+    assert remove_repeated_lines("Team size\n5\nBudget\n6") == "Team size\n5\nBudget\n6"
+
+
+def test_repeated_header_is_kept_once():
+    text = "\n".join(["Jane Doe - Resume"] + PAGE + ["Jane Doe - Resume"] + PAGE + ["Jane Doe - Resume"] + PAGE)
+    assert remove_repeated_lines(text).count("Jane Doe - Resume") == 1
+
+
+JD = """Requirements
+- Build background check service integrations
+- Own the reasonable accommodations booking tool
+- Ship the disability status dashboard
+
+Benefits
+- Health insurance
+- 401k match
+
+Responsibilities
+- Lead the platform team
+
+We are an equal opportunity employer. All applicants will be considered
+without regard to race, color, religion, sex, national origin or disability status.
+
+We participate in E-Verify.
+Reasonable accommodations are available on request."""
+
+
+def test_requirements_that_mention_legal_words_are_kept():
+    # Regression: boilerplate patterns were matched on every line of the JD
+    stripped = strip_boilerplate(JD)
+    assert "background check service integrations" in stripped
+    assert "reasonable accommodations booking tool" in stripped
+    assert "disability status dashboard" in stripped
+
+
+def test_eeo_paragraph_and_benefits_are_stripped():
+    stripped = strip_boilerplate(JD)
+    assert "equal opportunity" not in stripped and "E-Verify" not in stripped
+    assert "Health insurance" not in stripped
+    assert "Lead the platform team" in stripped
+
+
+def test_truncate_marks_the_cut():
+    text = "\n".join("word " * 20 for _ in range(100))
+    truncated = truncate_to_budget(text, 50)
+    assert truncated.endswith("[...truncated]") and len(truncated) < len(text)
+    assert compact_job_description("Short JD") == "Short JD"
@@ -0,0 +1,70 @@
+import pytest
+
+from jd_index import JDIndex, resume_data_text
+
+POSTINGS = [
+    {"id": "backend", "title": "Backend Engineer", "text": "Python, Django and PostgreSQL. Build REST APIs on AWS."},
+    {"id": "frontend", "title": "Frontend Engineer", "text": "React, TypeScript and CSS. Build accessible web UIs."},
+    {"id": "devops", "title": "DevOps Engineer", "text": "Docker, Kubernetes and Terraform. Run CI/CD on AWS."},
+]
+RESUME = "Python developer. Built Django REST APIs backed by PostgreSQL, deployed on AWS."
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = JDIndex(str(tmp_path), hash_bits=16, save_delay=60)
+    index.add(POSTINGS)
+    yield index
+    index.flush()
+
+
+def test_best_matching_posting_ranks_first(index):
+    results = index.search(RESUME, top_n=2)
+    assert [r["id"] for r in results] == ["backend", "devops"]
+    assert results[0]["title"] == "Backend Engineer" and results[0]["score"] > results[1]["score"] > 0
+    assert results[0]["matching_keywords"] == ["Python", "Django", "PostgreSQL", "REST APIs", "AWS"]
+
+
+def test_required_skills_filter_postings(index):
+    assert [r["id"] for r in index.search(RESUME, required_skills=["kubernetes"])] == ["devops"]
+    assert index.search(RESUME, required_skills=["Rust"]) == []
+
+
+def test_replaced_and_removed_postings_are_not_returned(index):
+    index.add([{"id": "backend", "title": "Data Engineer", "text": "Spark, Airflow and Snowflake pipelines."}])
+    assert index.get("backend")["title"] == "Data Engineer"
+    assert index.remove("devops") and not index.remove("devops")
+    results = index.search(RESUME)
+    assert {r["id"] for r in results} == {"backend", "frontend"}
+    assert index.stats()["postings"] == 2
+
+
+def test_posting_without_text_is_refused(index):
+    with pytest.raises(ValueError):
+        index.add([{"title": "Empty"}])
+
+
+def test_flush_saves_and_a_new_index_loads_it(index, tmp_path):
+    index.flush()
+    reloaded = JDIndex(str(tmp_path), hash_bits=16)
+    assert [r["id"] for r in reloaded.search(RESUME, top_n=1)] == ["backend"]
+    assert JDIndex(str(tmp_path), hash_bits=12).stats()["postings"] == 0  # other hash size starts empty
+
+
+def test_a_burst_of_changes_is_saved_once(tmp_path, monkeypatch):
+    index = JDIndex(str(tmp_path), hash_bits=16, save_delay=60)
+    saves = []
+    monkeypatch.setattr(index, "_save", lambda *args: saves.append(args))
+    for posting in POSTINGS:
+        index.add([posting])
+    index.remove("frontend")
+    assert saves == []
+    index.flush()
+    index.flush()
+    assert len(saves) == 1 and sum(p is not None for p in saves[0][0]) == 2
+
+
+def test_resume_data_is_flattened_for_matching():
+    text = resume_data_text({"summary": "Backend developer", "skills": [{"name": "Python"}, "Docker"],
+                             "experiences": [{"title": "Engineer", "achievements": [{"description": "Cut latency"}]}]})
+    assert text.split("\n") == ["Backend developer", "Python", "Docker", "Engineer", "Cut latency"]
@@ -0,0 +1,90 @@
+import sys
+import types
+
+import pytest
+
+from job_queue import JobStore, run_job, public_view, check_callback_url, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+RESUME = b"Jane Doe\nSoftware engineer with five years of Python and AWS experience."
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def fake_utils(monkeypatch):
+    # The job runners import utils lazily; replace it so no LLM is called
+    module = types.SimpleNamespace(critique_result={"score": 80})
+    module.critique_resume = lambda text, use_cache=True: module.critique_result
+    monkeypatch.setitem(sys.modules, "utils", module)
+    return module
+
+
+def queue_job(store, tmp_path, kind="critique", filename="resume.txt", content=RESUME):
+    input_path = tmp_path / ("upload" + filename[filename.rfind("."):])
+    input_path.write_bytes(content)
+    return store.create(kind, filename, str(input_path), {"use_cache": False})
+
+
+# --- Store ---
+def test_a_job_is_claimed_once(store, tmp_path):
+    job_id = queue_job(store, tmp_path)
+    assert store.claim(job_id) and not store.claim(job_id)
+    assert store.get(job_id)["status"] == RUNNING and store.get(job_id)["attempts"] == 1
+
+
+def test_recover_requeues_running_jobs_until_max_attempts(store, tmp_path):
+    first, second = queue_job(store, tmp_path), queue_job(store, tmp_path)
+    store.claim(first)
+    store.claim(second)
+    store._execute("UPDATE jobs SET attempts = 2 WHERE id = ?", (second,))
+    assert store.recover(max_attempts=2) == [first]
+    assert store.get(first)["status"] == QUEUED
+    assert store.get(second)["status"] == FAILED and store.get(second)["http_status"] == 500
+
+
+def test_purge_deletes_expired_finished_jobs(store, tmp_path):
+    job_id = queue_job(store, tmp_path)
+    store.finish(job_id, SUCCEEDED, {"ok": True}, 200)
+    assert store.purge(ttl_seconds=3600) == []
+    assert store.purge(ttl_seconds=-1) == [str(tmp_path / "upload.txt")]
+    assert store.get(job_id) is None
+
+
+# --- Running jobs ---
+def test_successful_job_records_result_and_stages(store, tmp_path, fake_utils):
+    job_id = queue_job(store, tmp_path)
+    run_job(store.path, job_id)
+    view = public_view(store.get(job_id))
+    assert view["status"] == SUCCEEDED and view["http_status"] == 200 and view["progress"] == 1
+    assert view["result"]["score"] == 80 and view["result"]["extraction"]["path"] == "txt"
+    assert not (tmp_path / "upload.txt").exists()
+
+
+def test_llm_error_result_fails_the_job(store, tmp_path, fake_utils):
+    # Regression: an {"error": ...} result from the LLM stage was recorded as succeeded/200
+    fake_utils.critique_result = {"error": "Failed to get a valid JSON response from the AI."}
+    job_id = queue_job(store, tmp_path)
+    run_job(store.path, job_id)
+    job = store.get(job_id)
+    assert job["status"] == FAILED and job["http_status"] == 500
+    assert job["error"] == "Failed to get a valid JSON response from the AI."
+    assert [s["status"] for s in job["stages"]] == ["done", "failed"]
+
+
+def test_unreadable_upload_fails_with_the_route_status(store, tmp_path, fake_utils):
+    job_id = queue_job(store, tmp_path, content=b"too short")
+    run_job(store.path, job_id)
+    job = store.get(job_id)
+    assert job["status"] == FAILED and job["http_status"] == 400 and job["error"] == "Could not extract any text."
+
+
+# --- Callbacks ---
+def test_callbacks_only_go_to_local_hosts():
+    check_callback_url("http://127.0.0.1:9000/done")
+    check_callback_url("http://localhost/done")
+    for url in ("http://example.com/done", "ftp://localhost/done", "not a url"):
+        with pytest.raises(ValueError):
+            check_callback_url(url)
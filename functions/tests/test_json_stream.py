@@ -0,0 +1,52 @@
+import json
+
+from json_stream import StreamingJSONParser, salvage_json, parse_json_reply
+
+REPLY = '```json\n{"match_score": 82, "summary": "Strong fit, \\"senior\\" level", ' \
+        '"keywords": ["Python", "AWS"], "details": {"a": [1, {"b": null}]}, "ok": true}\n```'
+
+
+# --- StreamingJSONParser ---
+def test_fields_are_reported_as_they_close():
+    parser = StreamingJSONParser()
+    closed = []
+    for i in range(0, len(REPLY), 7):
+        closed += parser.feed(REPLY[i:i + 7])
+    assert [key for key, _value in closed] == ["match_score", "summary", "keywords", "details", "ok"]
+    assert parser.fields == json.loads(REPLY.strip("`json\n"))
+    assert parser.complete
+
+
+def test_number_closes_only_at_its_delimiter():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"match_score": 8') == []
+    assert parser.feed('2, "summary"') == [("match_score", 82)]
+    assert not parser.complete
+
+
+# --- salvage_json ---
+def test_salvage_drops_unfinished_trailing_value():
+    assert salvage_json('{"match_score": 70, "summary": "Good", "suggestions": ["Add AWS", "Quan') == \
+        {"match_score": 70, "summary": "Good", "suggestions": ["Add AWS"]}
+
+
+def test_salvage_ignores_stray_text_around_the_object():
+    assert salvage_json('Here you go: {"a": {"b": [1, 2]}} Hope this helps!') == {"a": {"b": [1, 2]}}
+
+
+def test_salvage_without_object_returns_none():
+    assert salvage_json("no json here") is None
+    assert salvage_json("[1, 2, 3]") is None
+
+
+def test_parse_reply_fills_schema_defaults():
+    value, salvaged = parse_json_reply('{"match_score": 55, "summ', schema={"match_score": 0, "summary": ""})
+    assert salvaged and value == {"match_score": 55, "summary": ""}
+
+
+def test_parse_reply_without_schema_keys_fails():
+    assert parse_json_reply('{"other": 1', schema={"match_score": 0}) == (None, True)
+
+
+def test_clean_reply_is_returned_unchanged():
+    assert parse_json_reply('{"a": 1}') == ({"a": 1}, False)
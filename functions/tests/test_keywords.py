@@ -0,0 +1,55 @@
+from keywords import SkillMatcher, extract_keywords, compare_keywords, normalize_tokens
+
+
+def test_aliases_map_to_canonical_names():
+    assert extract_keywords("Built services in golang, postgres and k8s") == ["Go", "PostgreSQL", "Kubernetes"]
+
+
+def test_longest_match_wins():
+    matcher = SkillMatcher({"Java": [], "JavaScript": ["java script"]})
+    assert matcher.scan("java script and java") == ["JavaScript", "Java"]
+
+
+def test_skills_reported_once_in_first_appearance_order():
+    assert extract_keywords("Python, Docker, python3, Docker") == ["Python", "Docker"]
+
+
+def test_ambiguous_names_only_match_through_aliases():
+    assert extract_keywords("Ready to go live and excel at sketching") == []
+    assert extract_keywords("Golang developer, MS Excel") == ["Go", "Excel"]
+
+
+def test_everyday_skill_names_need_a_technical_context():
+    assert extract_keywords("We move at a swift pace and spark joy") == []
+    assert extract_keywords("Must pass a security clearance") == []
+    assert extract_keywords("Go to market. Go live!") == []
+    assert extract_keywords("carry the torch; elk hunting; rails") == []
+
+
+def test_ambiguous_names_match_in_lists_and_next_to_skills():
+    assert extract_keywords("Experience with Go and Excel") == ["Go", "Excel"]
+    assert extract_keywords("Skills: Go, Rust, Swift") == ["Go", "Rust", "Swift"]
+    assert extract_keywords("Languages: Python/Go\nTools: Jest | Bootstrap") == ["Python", "Go", "Jest", "Bootstrap"]
+    assert extract_keywords("Excel spreadsheets and Spark jobs") == ["Excel", "Spark"]
+
+
+def test_acronyms_only_match_in_capitals():
+    assert extract_keywords("Built AI and ML tools") == ["Artificial Intelligence", "Machine Learning"]
+    assert extract_keywords("ai ml ux") == []
+
+
+def test_dotnet_is_not_the_word_net():
+    # Regression: ".NET" was indexed as "net", so "net revenue" reported .NET
+    assert normalize_tokens(".NET and ASP.NET") == [".net", "and", "asp.net"]
+    assert extract_keywords("Increased net revenue by 20%") == []
+    assert extract_keywords("C#/.NET developer, ASP.NET Core, dotnet") == ["C#", ".NET"]
+
+
+def test_everyday_words_are_not_skills():
+    assert extract_keywords("Each node of the tree; ts = 3; the oracle of Delphi") == []
+    assert extract_keywords("Node.js, TypeScript and Oracle Database") == ["Node.js", "TypeScript", "Oracle Database"]
+
+
+def test_compare_keywords_keeps_jd_order():
+    result = compare_keywords("Python and Docker", "Docker, Kubernetes, Python")
+    assert result == {"matching_keywords": ["Docker", "Python"], "missing_keywords": ["Kubernetes"]}
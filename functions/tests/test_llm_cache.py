@@ -0,0 +1,100 @@
+import os
+import json
+import time
+
+from llm_cache import MemoryLRU, DiskTier, LLMCache, make_cache_key
+
+KEYS = [make_cache_key("model", "system", "prompt %d" % i) for i in range(4)]
+
+
+def age(tier, key, created_seconds_ago, used_seconds_ago=None):
+    """Backdate an entry on disk: its created time (mtime) and last use (atime)."""
+    now = time.time()
+    used = created_seconds_ago if used_seconds_ago is None else used_seconds_ago
+    os.utime(tier._path(key), (now - used, now - created_seconds_ago))
+
+
+def test_cache_key_ignores_param_order():
+    assert make_cache_key("m", "s", "u", a=1, b=2) == make_cache_key("m", "s", "u", b=2, a=1)
+    assert make_cache_key("m", "s", "u", a=1) != make_cache_key("m", "s", "u", a=2)
+
+
+def test_memory_lru_evicts_least_recently_used():
+    lru = MemoryLRU(2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+
+# --- Disk tier ---
+def test_expired_entry_is_not_returned(tmp_path):
+    tier = DiskTier(str(tmp_path), ttl_seconds=60)
+    tier.set(KEYS[0], "old")
+    entry_path = tier._path(KEYS[0])
+    with open(entry_path, "w", encoding="utf-8") as f:
+        json.dump({"created": time.time() - 120, "value": "old"}, f)
+    assert tier.get(KEYS[0]) is None and not os.path.exists(entry_path)
+
+
+def test_reads_do_not_extend_the_ttl_on_eviction(tmp_path):
+    # Regression: get() refreshed mtime, which evict() used as the creation time
+    tier = DiskTier(str(tmp_path), ttl_seconds=60)
+    tier.set(KEYS[0], "read 50s after it was written")
+    with open(tier._path(KEYS[0]), "w", encoding="utf-8") as f:
+        json.dump({"created": time.time() - 50, "value": "read 50s after it was written"}, f)
+    age(tier, KEYS[0], 50)
+    assert tier.get(KEYS[0]) is not None
+    tier.ttl_seconds = 30
+    tier.evict()
+    assert not os.path.exists(tier._path(KEYS[0]))
+
+
+def test_get_keeps_the_creation_time(tmp_path):
+    tier = DiskTier(str(tmp_path), ttl_seconds=60)
+    tier.set(KEYS[0], "value")
+    created = os.stat(tier._path(KEYS[0])).st_mtime
+    time.sleep(0.01)
+    assert tier.get(KEYS[0]) == "value"
+    st = os.stat(tier._path(KEYS[0]))
+    assert st.st_mtime == created and st.st_atime > created
+
+
+def test_least_recently_used_entries_are_evicted_below_the_cap(tmp_path):
+    tier = DiskTier(str(tmp_path), ttl_seconds=0, max_bytes=10 ** 6)
+    for key in KEYS[:3]:
+        tier.set(key, "x" * 100)
+    age(tier, KEYS[0], 30, used_seconds_ago=1)   # oldest, but read recently
+    age(tier, KEYS[1], 20)
+    age(tier, KEYS[2], 10)
+    tier.max_bytes = tier.size_bytes() - 1
+    tier.evict()
+    assert [os.path.exists(tier._path(key)) for key in KEYS[:3]] == [True, False, True]
+    assert tier._total_bytes == tier.size_bytes() <= tier.max_bytes
+
+
+def test_write_over_the_cap_evicts_and_keeps_the_total(tmp_path):
+    tier = DiskTier(str(tmp_path), ttl_seconds=0, max_bytes=400)
+    for key in KEYS:
+        tier.set(key, "x" * 100)
+    assert tier._total_bytes == tier.size_bytes() <= 400
+    assert tier.get(KEYS[-1]) == "x" * 100
+
+
+# --- Two tiers ---
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    cache = LLMCache(directory=str(tmp_path), memory_items=4)
+    cache.set(KEYS[0], {"a": 1})
+    cache.memory.clear()
+    assert cache.get(KEYS[0]) == {"a": 1} and cache.get(KEYS[0]) == {"a": 1}
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
+
+
+def test_get_or_compute_skips_vetoed_results(tmp_path):
+    cache = LLMCache(directory=str(tmp_path))
+    calls = []
+    compute = lambda: calls.append(1) or {"error": "failed"}
+    for _ in range(2):
+        cache.get_or_compute(KEYS[0], compute, should_store=lambda value: "error" not in value)
+    assert len(calls) == 2 and cache.get(KEYS[0]) is None
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+import providers
+from providers import ProviderRouter, StubProvider, CircuitBreaker, ProviderError
+
+
+def make_router(*stubs, **kwargs):
+    kwargs.setdefault("retries", 0)
+    kwargs.setdefault("sleep", lambda seconds: None)
+    return ProviderRouter(list(stubs), **kwargs)
+
+
+# --- Failover ---
+def test_failover_to_next_provider():
+    primary, backup = StubProvider("a", failures=1), StubProvider("b", reply="from b")
+    router = make_router(primary, backup)
+    assert router.complete("system", "prompt", {}) == "from b"
+    assert (primary.calls, backup.calls) == (1, 1)
+
+
+def test_retries_before_failing_over():
+    primary, backup = StubProvider("a", reply="from a", failures=2), StubProvider("b")
+    router = make_router(primary, backup, retries=2)
+    assert router.complete("system", "prompt", {}) == "from a"
+    assert (primary.calls, backup.calls) == (3, 0)
+
+
+def test_preferred_provider_goes_first():
+    a, b = StubProvider("a", reply="from a"), StubProvider("b", reply="from b")
+    assert make_router(a, b).complete("system", "prompt", {}, preferred="b") == "from b"
+    assert a.calls == 0
+
+
+def test_all_providers_failing_raises():
+    router = make_router(StubProvider("a", failures=9), StubProvider("b", failures=9))
+    with pytest.raises(ProviderError, match="All LLM providers failed"):
+        router.complete("system", "prompt", {})
+
+
+def test_on_call_sees_every_upstream_call():
+    called = []
+    router = make_router(StubProvider("a", failures=2), StubProvider("b"), retries=1)
+    router.complete("system", "prompt", {}, on_call=called.append)
+    assert called == ["a", "a", "b"]
+
+
+# --- Circuit breaker ---
+def test_breaker_opens_and_skips_provider():
+    primary, backup = StubProvider("a", failures=9), StubProvider("b", reply="from b")
+    router = make_router(primary, backup)
+    router.breakers["a"] = CircuitBreaker(threshold=2, reset_seconds=60)
+    for _ in range(2):
+        router.complete("system", "prompt", {})
+    assert router.breakers["a"].state == "open"
+    assert router.candidates() == ["b"]
+    router.complete("system", "prompt", {})
+    assert primary.calls == 2
+
+
+def test_breaker_half_open_trial_closes_on_success():
+    breaker = CircuitBreaker(threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == "half-open" and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker(threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.allow() and not breaker.allow() and not breaker.available()
+    # An abandoned trial stops blocking after another reset period
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_breaker_half_open_trial_failure_reopens():
+    breaker = CircuitBreaker(threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+# --- Hedging ---
+@pytest.fixture
+def short_hedge_delay(monkeypatch):
+    monkeypatch.setattr(providers, "HEDGE_DEFAULT_DELAY", 0.05)
+
+
+def test_hedge_returns_faster_backup(short_hedge_delay):
+    slow, fast = StubProvider("a", reply="slow", latency=0.5), StubProvider("b", reply="fast")
+    router = make_router(slow, fast, hedge=True)
+    start = time.perf_counter()
+    assert router.complete("system", "prompt", {}) == "fast"
+    assert time.perf_counter() - start < 0.4
+
+
+def test_hedge_calls_each_backup_once(short_hedge_delay):
+    # The primary leg must not fall through to "b" while the backup leg is calling it
+    slow = StubProvider("a", reply="slow", latency=0.3, failures=1)
+    flaky = StubProvider("b", latency=0.05, failures=1)
+    last = StubProvider("c", reply="from c")
+    router = make_router(slow, flaky, last, hedge=True)
+    assert router.complete("system", "prompt", {}) == "from c"
+    time.sleep(0.35)
+    assert (slow.calls, flaky.calls, last.calls) == (1, 1, 1)
+
+
+def test_hedge_fails_over_when_primary_fails_fast(short_hedge_delay):
+    primary, backup = StubProvider("a", failures=1), StubProvider("b", reply="from b")
+    router = make_router(primary, backup, hedge=True)
+    assert router.complete("system", "prompt", {}) == "from b"
+    assert (primary.calls, backup.calls) == (1, 1)
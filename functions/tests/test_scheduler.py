@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+from providers import ProviderRouter, StubProvider, ProviderError
+from scheduler import LLMScheduler, TokenBucket, priority, llm_priority, BATCH, INTERACTIVE
+
+
+def make_scheduler(*stubs, queue_timeout=5.0):
+    router = ProviderRouter(list(stubs), retries=0, sleep=lambda seconds: None)
+    return LLMScheduler(router, queue_timeout=queue_timeout)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# --- Token buckets ---
+def test_token_bucket_refills_over_a_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 30
+    assert bucket.available() == pytest.approx(30)
+    assert bucket.wait_time(30) == 0
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.take(10 ** 6)
+    assert bucket.wait_time(10 ** 6) == 0 and bucket.available() is None
+
+
+# --- Coalescing ---
+def test_identical_prompts_in_flight_share_one_call():
+    stub = StubProvider("a", reply="shared", latency=0.2)
+    scheduler = make_scheduler(stub)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.complete("system", "same", {})))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["shared"] * 5
+    assert stub.calls == 1
+    assert scheduler.stats()["coalesced"] == 4
+
+
+def test_coalesced_waiters_share_the_error():
+    stub = StubProvider("a", latency=0.2, failures=9)
+    scheduler = make_scheduler(stub)
+    errors = []
+
+    def call():
+        try:
+            scheduler.complete("system", "same", {})
+        except ProviderError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3 and stub.calls == 1
+
+
+# --- Budgets ---
+def test_request_budget_times_out_when_exhausted(monkeypatch):
+    monkeypatch.setenv("LLM_RPM_A", "1")
+    stub = StubProvider("a", reply="ok")
+    scheduler = make_scheduler(stub, queue_timeout=0.3)
+    assert scheduler.complete("system", "first", {}) == "ok"
+    with pytest.raises(ProviderError, match="Timed out"):
+        scheduler.complete("system", "second", {})
+    assert stub.calls == 1 and scheduler.stats()["timeouts"] == 1
+
+
+def test_exhausted_provider_sends_call_to_next_with_budget(monkeypatch):
+    monkeypatch.setenv("LLM_RPM_A", "1")
+    a, b = StubProvider("a", reply="from a"), StubProvider("b", reply="from b")
+    scheduler = make_scheduler(a, b)
+    assert scheduler.complete("system", "first", {}) == "from a"
+    assert scheduler.complete("system", "second", {}) == "from b"
+
+
+def test_failover_is_charged_to_the_provider_called(monkeypatch):
+    monkeypatch.setenv("LLM_RPM_B", "10")
+    a, b = StubProvider("a", failures=1), StubProvider("b", reply="from b")
+    scheduler = make_scheduler(a, b)
+    assert scheduler.complete("system", "prompt", {}, preferred="a") == "from b"
+    stats = scheduler.stats()
+    assert stats["extra_calls"] == 1
+    assert stats["budgets"]["b"]["rpm_available"] == pytest.approx(9, abs=0.1)
+
+
+def test_unused_completion_tokens_are_refunded(monkeypatch):
+    monkeypatch.setenv("LLM_TPM_A", "1000")
+    scheduler = make_scheduler(StubProvider("a", reply="ok"))
+    scheduler.complete("system", "prompt", {"max_tokens": 500})
+    assert scheduler.stats()["budgets"]["a"]["tpm_available"] > 900
+
+
+def test_shared_budgets_split_the_configured_limits(monkeypatch):
+    monkeypatch.setenv("LLM_RPM_A", "30")
+    scheduler = make_scheduler(StubProvider("a", reply="ok"))
+    scheduler.share_budgets(1 / 3)
+    scheduler.share_budgets(1 / 3)  # relative to the configured limit, not the current one
+    budget = scheduler.stats()["budgets"]["a"]
+    assert budget["rpm_limit"] == pytest.approx(10) and budget["rpm_available"] == pytest.approx(10)
+    assert budget["tpm_limit"] is None
+
+
+# --- Priorities ---
+def test_priority_context():
+    assert llm_priority.get() == INTERACTIVE
+    with priority(BATCH):
+        assert llm_priority.get() == BATCH
+    assert llm_priority.get() == INTERACTIVE
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import extraction
+from extraction import extract_file_text, DocumentTooLarge
+from uploads import SpooledUpload, too_large_message
+
+RESUME = b"Jane Doe\nSoftware engineer with five years of Python and AWS experience.\n"
+
+
+def make_pdf(page_texts):
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def spooled(data, max_size=16):
+    upload = SpooledUpload(max_size=max_size)
+    upload.write(data)
+    upload.seek(0)
+    return upload
+
+
+# --- Spooling ---
+def test_small_upload_stays_in_memory():
+    upload = spooled(b"short", max_size=1024)
+    assert upload.name is None and upload.read() == b"short"
+    upload.close()
+
+
+def test_large_upload_rolls_over_to_a_temp_file_deleted_on_close():
+    upload = spooled(RESUME)
+    path = upload.name
+    assert path is not None and os.path.exists(path)
+    assert upload.read() == RESUME
+    upload.close()
+    assert not os.path.exists(path)
+
+
+def test_to_path_closes_the_handle_and_reading_resumes():
+    upload = spooled(RESUME, max_size=1024)
+    assert upload.read(8) == b"Jane Doe"
+    path = upload.to_path()
+    with open(path, "rb") as f:
+        assert f.read() == RESUME
+    assert upload.read(1) == b"\n"
+    upload.close()
+    assert not os.path.exists(path)
+
+
+def test_closed_upload_cannot_be_read():
+    upload = spooled(RESUME)
+    upload.close()
+    with pytest.raises(ValueError):
+        upload.read()
+
+
+def test_too_large_message():
+    assert too_large_message(20 * 1024 * 1024) == "The upload is larger than the 20 MB limit."
+
+
+# --- Extraction from spooled uploads ---
+def test_text_upload_is_extracted_from_disk():
+    upload = spooled(RESUME)
+    text, report = extract_file_text("resume.txt", upload)
+    assert text == RESUME.decode("utf-8") and report == {"path": "txt"}
+    upload.close()
+
+
+def test_pdf_text_layer_is_read_without_ocr():
+    pytest.importorskip("pdfplumber")
+    upload = spooled(make_pdf(["Jane Doe Python developer with AWS experience"]), max_size=64)
+    text, report = extract_file_text("resume.pdf", upload, use_cache=False)
+    assert "Python developer" in text
+    assert report["text_pages"] == [1] and report["ocr_pages"] == []
+    upload.close()
+
+
+def test_pdf_over_the_page_limit_is_refused(monkeypatch):
+    pytest.importorskip("pdfplumber")
+    monkeypatch.setattr(extraction, "MAX_PDF_PAGES", 2)
+    upload = spooled(make_pdf(["Page one text here", "Page two text here", "Page three text here"]))
+    with pytest.raises(DocumentTooLarge, match="3 pages"):
+        extract_file_text("resume.pdf", upload, use_cache=False)
+    upload.close()
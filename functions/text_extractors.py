@@ -0,0 +1,163 @@
+# text_extractors.py
+# Single-pass DOCX and PDF text extraction, shared by the servers (extraction.py) and the
+# Streamlit app (root utils.py), so both paths produce the same text for the same file.
+# DOCX: word/document.xml and the header/footer parts are streamed with iterparse, so tables,
+# text boxes and headers are included and memory does not grow with the document.
+# PDF: each page's text layer is read exactly once, with PDFium (pypdfium2, installed with
+# pdfplumber) or pdfplumber as the fallback.
+# No imports from sibling modules, so the Streamlit app can use it as functions.text_extractors.
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# Text boxes are stored twice (DrawingML in mc:Choice, VML in mc:Fallback); only the first is read
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+DOCX_BODY_PART = "word/document.xml"
+DOCX_HEADER_PART = re.compile(r"^word/header(\d*)\.xml$")
+DOCX_FOOTER_PART = re.compile(r"^word/footer(\d*)\.xml$")
+TABLE_CELL_SEPARATOR = " | "
+
+# Run-level elements that stand for a character
+RUN_CHARACTERS = {W + "tab": "\t", W + "br": "\n", W + "cr": "\n", W + "noBreakHyphen": "-"}
+
+
+# --- DOCX ---
+def _part_lines(xml_file):
+    """Lines of one WordprocessingML part in document order; a table row becomes one line."""
+    lines = []
+    sinks = [lines]     # finished paragraphs and rows go to the innermost open table cell
+    rows = []           # open table rows, each a list of cell texts
+    paragraphs = []     # open paragraphs (a text box paragraph nests inside another one)
+    run_depth = 0
+    fallback_depth = 0
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        tag = elem.tag
+        if tag == MC_FALLBACK:
+            fallback_depth += 1 if event == "start" else -1
+            continue
+        if fallback_depth:
+            continue
+        if event == "start":
+            if tag == W + "p":
+                paragraphs.append([])
+            elif tag == W + "r":
+                run_depth += 1
+            elif tag == W + "tc":
+                sinks.append([])
+            elif tag == W + "tr":
+                rows.append([])
+            continue
+
+        if tag == W + "t":
+            if run_depth and paragraphs:
+                paragraphs[-1].append(elem.text or "")
+        elif tag in RUN_CHARACTERS:
+            # w:tab also appears in paragraph properties as a tab stop; only runs hold characters
+            if run_depth and paragraphs:
+                paragraphs[-1].append(RUN_CHARACTERS[tag])
+        elif tag == W + "r":
+            run_depth -= 1
+        elif tag == W + "p":
+            sinks[-1].append("".join(paragraphs.pop()))
+            elem.clear()
+        elif tag == W + "tc":
+            cell = " ".join(line.strip() for line in sinks.pop() if line.strip())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == W + "tr":
+            cells = [cell for cell in rows.pop() if cell]
+            if cells:
+                sinks[-1].append(TABLE_CELL_SEPARATOR.join(cells))
+            elem.clear()
+        elif tag == W + "tbl":
+            elem.clear()
+    return lines
+
+
+def _part_number(name, pattern):
+    return int(pattern.match(name).group(1) or 0)
+
+
+def docx_text(file):
+    """Text of a .docx: headers, then the body (with tables and text boxes), then footers.
+
+    `file` is a path or a seekable binary stream. Identical header or footer parts (first,
+    even and default pages often repeat the same text) are included once.
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+    with zipfile.ZipFile(file) as archive:
+        names = archive.namelist()
+        headers = sorted((n for n in names if DOCX_HEADER_PART.match(n)), key=lambda n: _part_number(n, DOCX_HEADER_PART))
+        footers = sorted((n for n in names if DOCX_FOOTER_PART.match(n)), key=lambda n: _part_number(n, DOCX_FOOTER_PART))
+        blocks = []
+        seen = set()
+        for name in headers + [DOCX_BODY_PART] + footers:
+            with archive.open(name) as part:
+                text = "\n".join(_part_lines(part)).strip("\n")
+            if name != DOCX_BODY_PART and (not text.strip() or text in seen):
+                continue
+            seen.add(text)
+            blocks.append(text)
+    return "\n".join(blocks)
+
+
+# --- PDF ---
+class PdfPages:
+    """Page texts of a PDF, each page read once.
+
+        with PdfPages(file) as pages:
+            for page_number, text in pages: ...
+
+    len(pages) is known before any page is read, so callers can enforce a page limit first.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.backend = None
+        self._document = None
+
+    def __enter__(self):
+        if hasattr(self.file, "seek"):
+            self.file.seek(0)
+        try:
+            import pypdfium2
+            self._document = pypdfium2.PdfDocument(self.file)
+            self.backend = "pdfium"
+        except ImportError:
+            import pdfplumber
+            self._document = pdfplumber.open(self.file)
+            self.backend = "pdfplumber"
+        return self
+
+    def __exit__(self, *exc):
+        self._document.close()
+        return False
+
+    def __len__(self):
+        if self.backend == "pdfium":
+            return len(self._document)
+        return len(self._document.pages)
+
+    def __iter__(self):
+        if self.backend == "pdfplumber":
+            for page_number, page in enumerate(self._document.pages, start=1):
+                yield page_number, page.extract_text() or ""
+                page.flush_cache()
+            return
+        for index in range(len(self._document)):
+            page = self._document[index]
+            textpage = page.get_textpage()
+            try:
+                text = textpage.get_text_bounded()
+            finally:
+                textpage.close()
+                page.close()
+            yield index + 1, text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def pdf_text(file):
+    """All page texts of a PDF, one page per block."""
+    with PdfPages(file) as pages:
+        return "\n".join(text.rstrip("\n") for _page_number, text in pages)
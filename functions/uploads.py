@@ -0,0 +1,106 @@
+# uploads.py
+# Upload size limits and spooling shared by the servers.
+# Request bodies above UPLOAD_MAX_BYTES are refused with 413 before they are read. An uploaded
+# file is held in memory up to UPLOAD_SPOOL_BYTES and then moved to a temp file, so a large scan
+# never sits in the worker's RSS and the OCR workers can render pages straight from disk.
+import io
+import os
+import tempfile
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+
+class SpooledUpload(io.RawIOBase):
+    """Binary upload buffer: in memory up to max_size bytes, then in a temp file it owns.
+
+    Once on disk, `.name` is the file's path. to_path() hands that path to another process
+    (poppler, the OCR workers) with no handle left open on it, which Windows needs. The file is
+    deleted when the upload is closed (Flask closes uploads at the end of the request).
+    """
+
+    def __init__(self, max_size=UPLOAD_SPOOL_BYTES, suffix=".upload"):
+        super().__init__()
+        self.max_size = max_size
+        self.suffix = suffix
+        self.name = None
+        self._file = io.BytesIO()
+        self._position = 0  # kept while the handle is closed for another reader
+
+    def rollover(self):
+        """Move the buffered bytes to a temp file, if they are not on disk already."""
+        if self.name is not None:
+            return
+        memory_file = self._open_file()
+        fd, path = tempfile.mkstemp(suffix=self.suffix, prefix="resume_builder_")
+        self._file = os.fdopen(fd, "w+b")
+        self.name = path
+        self._file.write(memory_file.getvalue())
+        self._file.seek(memory_file.tell())
+
+    def to_path(self):
+        """Flush to disk and close the handle; returns the path. Reading again reopens it."""
+        self.rollover()
+        if self._file is not None:
+            self._position = self._file.tell()
+            self._file.close()
+            self._file = None
+        return self.name
+
+    def _open_file(self):
+        if self.closed:
+            raise ValueError("I/O operation on closed upload")
+        if self._file is None:
+            self._file = open(self.name, "r+b")
+            self._file.seek(self._position)
+        return self._file
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._open_file().readinto(buffer)
+
+    def read(self, size=-1):
+        return self._open_file().read(size)
+
+    def write(self, data):
+        written = self._open_file().write(data)
+        if self.name is None and self._file.tell() > self.max_size:
+            self.rollover()
+        return written
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._open_file().seek(offset, whence)
+
+    def tell(self):
+        return self._open_file().tell()
+
+    def flush(self):
+        if self._file is not None and not self.closed:
+            self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.name is not None:
+                try:
+                    os.remove(self.name)
+                except OSError:
+                    pass
+        finally:
+            super().close()
+
+
+def too_large_message(limit_bytes):
+    return f"The upload is larger than the {round(limit_bytes / (1024 * 1024), 1):g} MB limit."
@@ -1,45 +1,145 @@
 # utils.py
 import os
-import json
-import google.generativeai as genai
-from openai import OpenAI
+import time
+import threading
 from dotenv import load_dotenv
+from llm_cache import llm_cache, make_cache_key
+from keywords import compare_keywords
+from compaction import compact_inputs, estimate_tokens
+from section_parser import parse_resume_by_sections, SECTION_PARSE_MIN_TOKENS
+from providers import ProviderRouter, OpenAICompatibleProvider, GeminiProvider, ProviderError
+from metrics import timed_stage, observe_stage
+from json_stream import StreamingJSONParser, parse_json_reply
+from scheduler import LLMScheduler
 
 load_dotenv()
 # NOTE: Ensure OPENAI_API_KEY and GEMINI_API_KEY are set in your .env file
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
 
-# Initialize clients (Assuming Groq is used for Llama via OpenAI client)
-openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url="https://api.groq.com/openai/v1")
-genai.configure(api_key=GEMINI_API_KEY)
+# Clients (Groq via the OpenAI client, and Gemini) are built on first use, so importing this
+# module does not pay for the SDKs; routes that never call an LLM never load them.
+_openai_client = None
+_genai = None
+_client_lock = threading.Lock()
+
+def get_openai_client():
+    global _openai_client
+    with _client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url=LLM_BASE_URL)
+        return _openai_client
+
+def get_genai():
+    global _genai
+    with _client_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GEMINI_API_KEY)
+            _genai = genai
+        return _genai
+
+LLAMA_MODEL = "llama-3.1-8b-instant"
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+JSON_SYSTEM_PROMPT = "You are an expert resume parser and career coach. You MUST ensure the final 'summary' and all 'achievements' use strong action verbs and are quantified (X-Y-Z formula). Always provide responses in JSON format."
+COVER_LETTER_SYSTEM_PROMPT = "You are a professional cover letter writer. Output only the letter text."
+
+JSON_PARAMS = {"temperature": 0.7, "max_tokens": 4000, "response_format": {"type": "json_object"}}
+COVER_LETTER_PARAMS = {"temperature": 0.7, "max_tokens": 2000}
+
+# --- LLM providers ---
+# Groq first, Gemini as failover (only when a key is configured). Retries, circuit breakers
+# and optional hedging live in providers.py.
+def build_providers():
+    providers = [OpenAICompatibleProvider("groq", get_openai_client, LLAMA_MODEL)]
+    if GEMINI_API_KEY:
+        providers.append(GeminiProvider(get_genai, GEMINI_MODEL))
+    return providers
+
+llm_router = ProviderRouter(build_providers())
+# Every call goes through the scheduler: identical in-flight prompts share one upstream call,
+# per-provider RPM/TPM budgets are respected, and interactive calls go ahead of batch ones.
+llm_scheduler = LLMScheduler(llm_router)
+
+def provider_for_choice(model_choice):
+    # The UI's model picker ("Gemini 1.5", "Llama 3", ...) only sets the preferred provider
+    return "gemini" if model_choice and "gemini" in str(model_choice).lower() else None
 
 # --- AI Helper Function (for JSON response) ---
-def generate_llama_json(prompt):
+# A reply cut off at max_tokens (or with stray text around it) is salvaged instead of failing:
+# finished fields are kept, missing ones come from the schema's defaults, and the result is
+# marked "salvaged": True. Salvaged and error results are never cached, so the next call can
+# still get a complete answer.
+def json_result(result_text, schema=None):
+    result, salvaged = parse_json_reply(result_text, schema)
+    if result is None:
+        print(f"--- Could not parse or salvage the JSON reply ({len(result_text)} chars) ---")
+        return {"error": "Failed to get a valid JSON response from the AI."}
+    if salvaged:
+        print(f"--- Salvaged an incomplete JSON reply ({len(result_text)} chars) ---")
+        return {**result, "salvaged": True}
+    return result
+
+def cacheable(result):
+    return "error" not in result and not result.get("salvaged")
+
+def generate_llama_json(prompt, use_cache=True, max_tokens=None, provider=None, schema=None):
+    params = JSON_PARAMS if max_tokens is None else {**JSON_PARAMS, "max_tokens": max_tokens}
+    cache_key = make_cache_key(llm_router.model_for(provider), JSON_SYSTEM_PROMPT, prompt, **params)
+
+    def call_llama():
+        try:
+            # Maintaining the system role to emphasize high quality and parsing standards
+            with timed_stage("llm_call"):
+                result_text = llm_scheduler.complete(JSON_SYSTEM_PROMPT, prompt, params, preferred=provider)
+        except Exception as e:
+            print(f"Error calling Llama (JSON): {e}")
+            return {"error": "Failed to get a valid JSON response from the AI."}
+        with timed_stage("json_parse"):
+            return json_result(result_text, schema)
+
+    return llm_cache.get_or_compute(cache_key, call_llama, use_cache=use_cache, should_store=cacheable)
+
+def stream_llama_json(prompt, use_cache=True, max_tokens=None, provider=None, schema=None):
+    """Streaming generate_llama_json. Yields ("field", key, value) as each top-level field of the
+    reply closes, then ("result", result) with the same result generate_llama_json would return.
+
+    If the stream breaks midway, whatever arrived is salvaged rather than discarded.
+    """
+    params = JSON_PARAMS if max_tokens is None else {**JSON_PARAMS, "max_tokens": max_tokens}
+    cache_key = make_cache_key(llm_router.model_for(provider), JSON_SYSTEM_PROMPT, prompt, **params)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            for key, value in cached.items():
+                yield ("field", key, value)
+            yield ("result", cached)
+            return
+    else:
+        llm_cache.record_bypass()
+
+    parser = StreamingJSONParser()
+    start = time.perf_counter()
     try:
-        # Maintaining the system role to emphasize high quality and parsing standards
-        response = openai_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are an expert resume parser and career coach. You MUST ensure the final 'summary' and all 'achievements' use strong action verbs and are quantified (X-Y-Z formula). Always provide responses in JSON format."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=4000, 
-            response_format={"type": "json_object"},
-        )
-        result_text = response.choices[0].message.content.strip()
-        return json.loads(result_text)
+        for delta in llm_scheduler.stream(JSON_SYSTEM_PROMPT, prompt, params, preferred=provider):
+            for key, value in parser.feed(delta):
+                yield ("field", key, value)
     except Exception as e:
-        print(f"Error calling Llama (JSON): {e}")
-        return {"error": "Failed to get a valid JSON response from the AI."}
+        print(f"Error streaming Llama (JSON): {e}")
+    finally:
+        observe_stage("llm_call", time.perf_counter() - start)
 
-# --- 1. AI Resume Parser (Takes RAW TEXT) ---
-def process_resume_text(resume_text, model_choice):
-    if not resume_text.strip():
-        return {"error": "Could not extract any text."}
+    with timed_stage("json_parse"):
+        result = json_result(parser.text, schema)
+    if use_cache and cacheable(result):
+        llm_cache.set(cache_key, result)
+    yield ("result", result)
 
-    prompt = f"""
+# --- 1. AI Resume Parser (Takes RAW TEXT) ---
+def build_resume_parser_prompt(resume_text):
+    return f"""
 Your task is to analyze and enhance the provided raw resume text into a structured JSON object (`resumeData`).
 
 **JSON Structure Rules:**
@@ -118,24 +218,65 @@ RAW RESUME TEXT:
 {resume_text}
 ---
 """
-    return generate_llama_json(prompt)
+
+# Defaults for keys a truncated whole-resume reply never reached
+RESUME_SCHEMA = {
+    "analysis": {"detectedRole": "", "missingSkills": []},
+    "resumeData": {
+        "fullName": "", "email": "", "phone": "", "location": "", "linkedin": "", "github": "",
+        "portfolio": "", "summary": "", "skills": [], "experiences": [], "education": [], "projects": [],
+        "certifications": [], "languages": [],
+    },
+}
+
+PARSE_MODES = ("auto", "single", "sections")
+
+def use_section_parsing(resume_text, mode):
+    # "auto" only pays for several calls when the resume is long enough to be slow or truncate
+    return mode == "sections" or (mode == "auto" and estimate_tokens(resume_text) >= SECTION_PARSE_MIN_TOKENS)
+
+def process_resume_text(resume_text, model_choice, use_cache=True, mode="auto"):
+    if not resume_text.strip():
+        return {"error": "Could not extract any text."}
+    provider = provider_for_choice(model_choice)
+
+    if use_section_parsing(resume_text, mode):
+        result = parse_resume_by_sections(
+            resume_text,
+            lambda prompt, max_tokens: generate_llama_json(prompt, use_cache=use_cache, max_tokens=max_tokens,
+                                                           provider=provider),
+        )
+        if result is not None:
+            return result
+        print("--- No section headings found. Parsing the resume in one call ---")
+
+    resume_text, _ = compact_inputs("process_resume_text", resume_text)
+    prompt = build_resume_parser_prompt(resume_text)
+    return generate_llama_json(prompt, use_cache=use_cache, provider=provider, schema=RESUME_SCHEMA)
 
 # --- 2. AI Job Matcher ---
-def analyze_match(resume_text, jd_text):
-    prompt = f"""
+# matching_keywords / missing_keywords come from the local skill lexicon (keywords.py);
+# the LLM only writes the score, summary and tailoring suggestions.
+MATCH_MAX_TOKENS = 1000
+MATCH_SCHEMA = {"match_score": 0, "summary": "", "tailoring_suggestions": []}
+
+def build_match_prompt(resume_text, jd_text, keywords):
+    return f"""
 You are an expert technical recruiter and job match analyzer. 
 Your task is to compare a RESUME and a JOB DESCRIPTION and return a structured JSON response that includes:
 1. A numeric `match_score` (0–100)
 2. A short textual `summary`
-3. Lists of `matching_keywords`, `missing_keywords`, and `tailoring_suggestions`
+3. A list of `tailoring_suggestions`
+
+The skill overlap has already been computed for you:
+- Skills from the job description found in the resume: {", ".join(keywords["matching_keywords"]) or "none"}
+- Skills from the job description missing from the resume: {", ".join(keywords["missing_keywords"]) or "none"}
 
 ### Output format (JSON only)
 Return a single valid JSON object like this:
 {{
   "match_score": 85,
   "summary": "The resume aligns strongly with the job description in software development and JavaScript skills.",
-  "matching_keywords": ["React", "Node.js", "APIs"],
-  "missing_keywords": ["AWS", "GraphQL"],
   "tailoring_suggestions": [
     "Add experience with cloud technologies like AWS or Azure.",
     "Highlight teamwork and leadership in past roles."
@@ -143,14 +284,12 @@ Return a single valid JSON object like this:
 }}
 
 ### Instructions
-1. Analyze overlap between resume_text and jd_text to estimate a `match_score` between 0 and 100.
+1. Use the skill overlap and the overall fit of experience to estimate a `match_score` between 0 and 100.
    - >90 = Excellent match
    - 70–89 = Good match
    - 50–69 = Moderate match
    - <50 = Poor match
-2. Identify **skills, tools, or keywords** that appear in both (matching_keywords).
-3. Identify important job-specific keywords missing from the resume (missing_keywords).
-4. Suggest ways to tailor the resume for better alignment (tailoring_suggestions).
+2. Suggest ways to tailor the resume for better alignment (tailoring_suggestions), prioritising the missing skills.
 
 ---
 RESUME TEXT:
@@ -161,11 +300,38 @@ JOB DESCRIPTION:
 {jd_text}
 ---
 """
-    return generate_llama_json(prompt)
+
+def with_keywords(result, keywords):
+    # Copy rather than mutate: the result may be a shared cache entry
+    if "error" in result:
+        return result
+    return {**result, **keywords}
+
+def analyze_match(resume_text, jd_text, use_cache=True):
+    # Keywords are matched on the full text; only the prompt gets the compacted copy
+    keywords = compare_keywords(resume_text, jd_text)
+    resume_text, jd_text = compact_inputs("analyze_match", resume_text, jd_text)
+    prompt = build_match_prompt(resume_text, jd_text, keywords)
+    result = generate_llama_json(prompt, use_cache=use_cache, max_tokens=MATCH_MAX_TOKENS, schema=MATCH_SCHEMA)
+    return with_keywords(result, keywords)
+
+def stream_match(resume_text, jd_text, use_cache=True):
+    """analyze_match as events: the locally computed keyword fields first, then each LLM field
+    as it closes (see stream_llama_json), then ("result", result)."""
+    keywords = compare_keywords(resume_text, jd_text)
+    for key, value in keywords.items():
+        yield ("field", key, value)
+    resume_text, jd_text = compact_inputs("stream_match", resume_text, jd_text)
+    prompt = build_match_prompt(resume_text, jd_text, keywords)
+    for event in stream_llama_json(prompt, use_cache=use_cache, max_tokens=MATCH_MAX_TOKENS, schema=MATCH_SCHEMA):
+        if event[0] == "result":
+            yield ("result", with_keywords(event[1], keywords))
+        else:
+            yield event
 
 # --- 3. AI Cover Letter ---
-def generate_cover_letter(resume_text, jd_text, user_name):
-    prompt = f"""
+def build_cover_letter_prompt(resume_text, jd_text, user_name):
+    return f"""
 Act as a professional career coach. Your task is to generate a compelling and personalized cover letter based on the provided resume and job description.
 
 **Instructions:**
@@ -184,24 +350,82 @@ JOB DESCRIPTION:
 {jd_text}
 ---
 """
+
+def generate_cover_letter(resume_text, jd_text, user_name, use_cache=True):
+    resume_text, jd_text = compact_inputs("generate_cover_letter", resume_text, jd_text)
+    prompt = build_cover_letter_prompt(resume_text, jd_text, user_name)
+    params = COVER_LETTER_PARAMS
+    cache_key = make_cache_key(llm_router.model_for(), COVER_LETTER_SYSTEM_PROMPT, prompt, **params)
+
+    def call_llama():
+        try:
+            with timed_stage("llm_call"):
+                return llm_scheduler.complete(COVER_LETTER_SYSTEM_PROMPT, prompt, params)
+        except ProviderError as e:
+            print(f"Error calling Llama for Cover Letter: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error generating Cover Letter: {e}")
+            return None
+
+    cover_letter = llm_cache.get_or_compute(cache_key, call_llama, use_cache=use_cache)
+    if cover_letter is None:
+        return "Sorry, an error occurred while generating the cover letter."
+    return cover_letter
+
+def stream_cover_letter(resume_text, jd_text, user_name, use_cache=True, metrics=None):
+    """Yield the cover letter in chunks as the model produces them.
+
+    Logs time-to-first-token and total generation time, and copies them into `metrics` if given.
+    A cached letter is yielded in one piece; a completed letter is cached under the same key
+    as generate_cover_letter.
+    """
+    metrics = {} if metrics is None else metrics
+    resume_text, jd_text = compact_inputs("stream_cover_letter", resume_text, jd_text)
+    prompt = build_cover_letter_prompt(resume_text, jd_text, user_name)
+    params = COVER_LETTER_PARAMS
+    cache_key = make_cache_key(llm_router.model_for(), COVER_LETTER_SYSTEM_PROMPT, prompt, **params)
+    start = time.perf_counter()
+
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            metrics.update({"cached": True, "ttft_seconds": 0.0, "total_seconds": round(time.perf_counter() - start, 4)})
+            yield cached
+            return
+    else:
+        llm_cache.record_bypass()
+
+    parts = []
+    first_token_at = None
     try:
-        response = openai_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are a professional cover letter writer. Output only the letter text."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=2000, 
-        )
-        return response.choices[0].message.content.strip()
+        for delta in llm_scheduler.stream(COVER_LETTER_SYSTEM_PROMPT, prompt, params):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(delta)
+            yield delta
     except Exception as e:
-        print(f"Error calling Llama for Cover Letter: {e}")
-        return "Sorry, an error occurred while generating the cover letter."
-    
+        print(f"Error streaming Llama Cover Letter: {e}")
+        metrics["error"] = str(e)
+        if not parts:
+            yield "Sorry, an error occurred while generating the cover letter."
+        return
+    finally:
+        total = time.perf_counter() - start
+        ttft = (first_token_at - start) if first_token_at is not None else None
+        metrics.update({"cached": False, "ttft_seconds": round(ttft, 4) if ttft is not None else None,
+                        "total_seconds": round(total, 4)})
+        observe_stage("llm_call", total)
+        ttft_text = f"{ttft:.3f}s" if ttft is not None else "n/a"
+        print(f"--- Cover letter stream: ttft={ttft_text} total={total:.3f}s chunks={len(parts)} ---")
+
+    cover_letter = "".join(parts).strip()
+    if use_cache and cover_letter:
+        llm_cache.set(cache_key, cover_letter)
+
 # --- 4. AI Resume Critique (RESTORED TO TEXTUAL FEEDBACK ONLY) ---
-def critique_resume(resume_text):
-    prompt = f"""
+def build_critique_prompt(resume_text):
+    return f"""
 You are an expert career coach and professional resume reviewer. Your task is to provide a constructive and detailed critique of the provided resume text.
 
 **JSON Output Requirements (STRICT):**
@@ -232,4 +456,11 @@ RAW RESUME TEXT:
 {resume_text}
 ---
 """
-    return generate_llama_json(prompt)
\ No newline at end of file
+
+CRITIQUE_SCHEMA = {"overall_feedback": "", "summary_suggestions": [], "experience_suggestions": [],
+                   "skills_suggestions": []}
+
+def critique_resume(resume_text, use_cache=True):
+    resume_text, _ = compact_inputs("critique_resume", resume_text)
+    prompt = build_critique_prompt(resume_text)
+    return generate_llama_json(prompt, use_cache=use_cache, schema=CRITIQUE_SCHEMA)
\ No newline at end of file
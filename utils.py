@@ -1,49 +1,74 @@
 # utils.py
 import os
-import re
-import json
-import docx2txt
-import PyPDF2
-import google.generativeai as genai
-from openai import OpenAI
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
+from functions.llm_cache import llm_cache, make_cache_key
+from functions.keywords import compare_keywords, extract_keywords
+from functions.json_stream import parse_json_reply
+from functions.resume_sections import split_sections
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url="https://api.groq.com/openai/v1")
-genai.configure(api_key=GEMINI_API_KEY)
+
+# Built on first use so importing this module (every Streamlit page) skips the SDK imports
+_openai_client = None
+_client_lock = threading.Lock()
+
+def get_openai_client():
+    global _openai_client
+    with _client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY, base_url="https://api.groq.com/openai/v1")
+        return _openai_client
+
+LLAMA_MODEL = "llama-3.1-8b-instant"
+JSON_SYSTEM_PROMPT = "You are an expert resume coach that provides responses in JSON format."
+COVER_LETTER_SYSTEM_PROMPT = "You are an expert career coach that writes professional cover letters."
+COVER_LETTER_PARAMS = {"temperature": 0.8, "max_tokens": 1000}
 
 def extract_text_from_pdf(file):
-    text = ""
-    reader = PyPDF2.PdfReader(file)
-    for page in reader.pages:
-        if page.extract_text():
-            text += page.extract_text() + "\n"
-    return text.strip()
+    # Same single-pass extractors as the API servers, so both give the same text for a file
+    from functions.text_extractors import pdf_text
+    return pdf_text(file).strip()
 
 def extract_text_from_docx(file):
-    return docx2txt.process(file)
+    from functions.text_extractors import docx_text
+    return docx_text(file)
 
-def generate_llama_json(prompt):
-    try:
-        response = openai_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are an expert resume coach that provides responses in JSON format."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=2000,
-            response_format={"type": "json_object"},
-        )
-        result_text = response.choices[0].message.content.strip()
-        return json.loads(result_text)
-    except Exception as e:
-        print(f"Error calling Llama: {e}")
-        return {"error": "Failed to get a valid response from Llama."}
+def generate_llama_json(prompt, use_cache=True, max_tokens=2000, schema=None):
+    params = {"temperature": 0.7, "max_tokens": max_tokens, "response_format": {"type": "json_object"}}
+    cache_key = make_cache_key(LLAMA_MODEL, JSON_SYSTEM_PROMPT, prompt, **params)
 
-def process_resume_file(uploaded_file, model_choice):
+    def call_llama():
+        try:
+            response = get_openai_client().chat.completions.create(
+                model=LLAMA_MODEL,
+                messages=[
+                    {"role": "system", "content": JSON_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                **params,
+            )
+            result_text = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error calling Llama: {e}")
+            return {"error": "Failed to get a valid response from Llama."}
+        # A reply cut off at max_tokens keeps its finished fields instead of failing outright
+        result, salvaged = parse_json_reply(result_text, schema)
+        if result is None:
+            return {"error": "Failed to get a valid response from Llama."}
+        return {**result, "salvaged": True} if salvaged else result
+
+    # Salvaged replies are not cached, so the next call can still get a complete answer
+    return llm_cache.get_or_compute(cache_key, call_llama, use_cache=use_cache,
+                                    should_store=lambda result: "error" not in result and not result.get("salvaged"))
+
+def process_resume_file(uploaded_file, model_choice, use_cache=True):
     filename = uploaded_file.name.lower()
     if filename.endswith(".pdf"): resume_text = extract_text_from_pdf(uploaded_file)
     elif filename.endswith(".docx"): resume_text = extract_text_from_docx(uploaded_file)
@@ -51,17 +76,20 @@ def process_resume_file(uploaded_file, model_choice):
     else: return {"error": "Unsupported file type."}
     if not resume_text.strip(): return {"error": "Could not extract any text."}
     prompt = f'...' # Your long resume enhancement prompt
-    return generate_llama_json(prompt)
+    return generate_llama_json(prompt, use_cache=use_cache)
 
-def analyze_match(resume_text, jd_text):
+def analyze_match(resume_text, jd_text, use_cache=True):
+    # Keyword lists are computed locally; the LLM only scores and writes the narrative
+    keywords = compare_keywords(resume_text, jd_text)
     prompt = f"""
 You are an expert technical recruiter. Your task is to compare the provided RESUME with the JOB DESCRIPTION.
 You must return a response in a valid JSON format. Do not add any text before or after the JSON object.
 
+Skills from the job description found in the resume: {", ".join(keywords["matching_keywords"]) or "none"}
+Skills from the job description missing from the resume: {", ".join(keywords["missing_keywords"]) or "none"}
+
 The JSON object must have the following keys:
 - "match_score": An integer from 0 to 100.
-- "matching_keywords": A list of strings.
-- "missing_keywords": A list of strings.
 - "summary": A brief one-paragraph analysis.
 - "tailoring_suggestions": A list of 2-3 specific, actionable suggestions.
 
@@ -75,10 +103,107 @@ JOB DESCRIPTION:
 {jd_text}
 ---
 """
-    return generate_llama_json(prompt)
+    result = generate_llama_json(prompt, use_cache=use_cache, max_tokens=1000,
+                                 schema={"match_score": 0, "summary": "", "tailoring_suggestions": []})
+    if "error" in result:
+        return result
+    return {**result, **keywords}
+
+# --- Section-level matching ---
+# The resume is split into sections that are scored against the JD one by one, so after an
+# edit only the changed sections need a new LLM call; the overall score, keywords and
+# suggestions are recombined locally from the per-section results.
+# How much each section counts towards the overall match score
+SECTION_WEIGHTS = {"experience": 0.4, "skills": 0.25, "projects": 0.15, "summary": 0.1,
+                   "education": 0.05, "certifications": 0.05}
+SECTION_MAX_TOKENS = 400
+MAX_COMBINED_SUGGESTIONS = 6
+SECTION_MEMO_ITEMS = 512
+
+# Lives here rather than in the page script, whose globals are rebuilt on every rerun
+_section_memo = OrderedDict()
+_section_memo_lock = threading.Lock()
 
-def generate_cover_letter(resume_text, jd_text, user_name):
+def fingerprint(text):
+    # Whitespace-only edits do not change the fingerprint, so they never trigger a re-score
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def analyze_section(section_name, section_text, jd_text, use_cache=True):
+    """Score one resume section against the JD. Skills are matched locally; the header is not sent to the LLM."""
+    result = {"section": section_name, "skills": extract_keywords(section_text)}
+    if section_name not in SECTION_WEIGHTS:
+        return result
     prompt = f"""
+You are an expert technical recruiter. Score how well ONE section of a resume supports the JOB DESCRIPTION.
+Return a single valid JSON object and nothing else, with these keys:
+- "section_score": An integer from 0 to 100 for how well this {section_name} section fits the job.
+- "note": One sentence on the section's fit.
+- "suggestions": A list of 1-2 specific, actionable edits to this section for this job.
+
+---
+RESUME SECTION ({section_name.upper()}):
+{section_text}
+---
+JOB DESCRIPTION:
+{jd_text}
+---
+"""
+    response = generate_llama_json(prompt, use_cache=use_cache, max_tokens=SECTION_MAX_TOKENS,
+                                   schema={"section_score": 0, "note": "", "suggestions": []})
+    if "error" in response:
+        return {**result, "error": response["error"]}
+    try:
+        score = max(0, min(100, int(response.get("section_score", 0))))
+    except (TypeError, ValueError):
+        score = 0
+    suggestions = response.get("suggestions") or []
+    return {**result, "score": score, "note": response.get("note", ""),
+            "suggestions": [s for s in suggestions if isinstance(s, str)]}
+
+def score_section(section_name, section_text, jd_text):
+    """analyze_section memoized on (section, fingerprint of its text, fingerprint of the JD).
+
+    A plain locked LRU rather than st.cache_data, so it is safe to call from worker threads
+    that have no Streamlit script context. Failed results are not kept, so they are retried.
+    """
+    key = (section_name, fingerprint(section_text), fingerprint(jd_text))
+    with _section_memo_lock:
+        if key in _section_memo:
+            _section_memo.move_to_end(key)
+            return _section_memo[key]
+    result = analyze_section(section_name, section_text, jd_text)
+    if "error" not in result:
+        with _section_memo_lock:
+            _section_memo[key] = result
+            while len(_section_memo) > SECTION_MEMO_ITEMS:
+                _section_memo.popitem(last=False)
+    return result
+
+def combine_section_results(section_results, jd_text):
+    """Recombine per-section results into the analyze_match shape, plus a per-section breakdown."""
+    scored = {name: r for name, r in section_results.items() if "score" in r}
+    failed = [r["error"] for r in section_results.values() if "error" in r]
+    if not scored:
+        return {"error": failed[0] if failed else "No resume sections could be scored."}
+    total_weight = sum(SECTION_WEIGHTS[name] for name in scored)
+    match_score = round(sum(SECTION_WEIGHTS[name] * r["score"] for name, r in scored.items()) / total_weight)
+
+    resume_skills = {skill for r in section_results.values() for skill in r["skills"]}
+    jd_skills = extract_keywords(jd_text)
+    # Weakest sections first, since that is where tailoring pays off most
+    weakest_first = sorted(scored.items(), key=lambda item: item[1]["score"])
+    suggestions = [s for _name, r in weakest_first for s in r["suggestions"]][:MAX_COMBINED_SUGGESTIONS]
+    return {
+        "match_score": match_score,
+        "summary": " ".join(f"{name.capitalize()} ({r['score']}%): {r['note']}" for name, r in scored.items() if r["note"]),
+        "tailoring_suggestions": suggestions,
+        "matching_keywords": [skill for skill in jd_skills if skill in resume_skills],
+        "missing_keywords": [skill for skill in jd_skills if skill not in resume_skills],
+        "sections": {name: {"score": r["score"], "note": r["note"]} for name, r in scored.items()},
+    }
+
+def build_cover_letter_prompt(resume_text, jd_text, user_name):
+    return f"""
 Act as a professional career coach. Your task is to write a compelling, professional, and concise cover letter.
 The tone should be confident but not arrogant. The letter must be three paragraphs long.
 Use the provided RESUME TEXT to understand the candidate's skills and experience.
@@ -94,17 +219,79 @@ JOB DESCRIPTION TEXT:
 {jd_text}
 ---
 """
+
+def generate_cover_letter(resume_text, jd_text, user_name, use_cache=True):
+    prompt = build_cover_letter_prompt(resume_text, jd_text, user_name)
+    params = COVER_LETTER_PARAMS
+    cache_key = make_cache_key(LLAMA_MODEL, COVER_LETTER_SYSTEM_PROMPT, prompt, **params)
+
+    def call_llama():
+        try:
+            response = get_openai_client().chat.completions.create(
+                model=LLAMA_MODEL,
+                messages=[
+                    {"role": "system", "content": COVER_LETTER_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                **params,
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error calling Llama for Cover Letter: {e}")
+            return None
+
+    cover_letter = llm_cache.get_or_compute(cache_key, call_llama, use_cache=use_cache)
+    if cover_letter is None:
+        return "Sorry, an error occurred while generating the cover letter."
+    return cover_letter
+
+def stream_cover_letter(resume_text, jd_text, user_name, use_cache=True):
+    """Yield the cover letter in chunks as they arrive (for st.write_stream).
+
+    Logs time-to-first-token and total generation time per request.
+    """
+    prompt = build_cover_letter_prompt(resume_text, jd_text, user_name)
+    params = COVER_LETTER_PARAMS
+    cache_key = make_cache_key(LLAMA_MODEL, COVER_LETTER_SYSTEM_PROMPT, prompt, **params)
+    if use_cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    else:
+        llm_cache.record_bypass()
+
+    start = time.perf_counter()
+    first_token_at = None
+    parts = []
     try:
-        response = openai_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
+        stream = get_openai_client().chat.completions.create(
+            model=LLAMA_MODEL,
             messages=[
-                {"role": "system", "content": "You are an expert career coach that writes professional cover letters."},
+                {"role": "system", "content": COVER_LETTER_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
-            temperature=0.8,
-            max_tokens=1000
+            stream=True,
+            **params,
         )
-        return response.choices[0].message.content.strip()
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(delta)
+            yield delta
     except Exception as e:
-        print(f"Error calling Llama for Cover Letter: {e}")
-        return "Sorry, an error occurred while generating the cover letter."
\ No newline at end of file
+        print(f"Error streaming Llama Cover Letter: {e}")
+        if not parts:
+            yield "Sorry, an error occurred while generating the cover letter."
+        return
+    finally:
+        total = time.perf_counter() - start
+        ttft_text = f"{first_token_at - start:.3f}s" if first_token_at is not None else "n/a"
+        print(f"Cover letter stream: ttft={ttft_text} total={total:.3f}s chunks={len(parts)}")
+
+    cover_letter = "".join(parts).strip()
+    if use_cache and cover_letter:
+        llm_cache.set(cache_key, cover_letter)
\ No newline at end of file